@@ -6,12 +6,13 @@ Parses v2 markdown files (sprints, tasks, stories) and populates the v3 graph.
 After migration, deletes v2 markdown files that are now stored in the graph.
 
 Usage:
-    migrate-v2-to-v3.py [--dry-run] [--verbose] [--no-cleanup]
+    migrate-v2-to-v3.py [--dry-run] [--verbose] [--no-cleanup] [--jobs N]
 
 Options:
     --dry-run     Show what would be migrated without making changes
     --verbose     Show detailed parsing information
     --no-cleanup  Don't delete v2 files after migration (keeps docs/04-plan/, etc.)
+    --jobs N      Parse files in N worker processes (default: CPU count)
 """
 
 import argparse
@@ -19,10 +20,16 @@ import json
 import os
 import re
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
+# Files are parsed in a process pool once there are enough to pay for starting it
+PARALLEL_MIN_FILES = 32
+PROGRESS_INTERVAL = 0.5  # seconds between progress updates
+
 
 class MigrationError(Exception):
     pass
@@ -315,6 +322,59 @@ class V2Parser:
         return None
 
 
+PARSE_METHODS = {
+    "stories": "parse_stories_md",
+    "sprint": "parse_sprint_md",
+    "task": "parse_task_file",
+}
+
+
+def parse_v2_file(job: tuple):
+    """Parse one (kind, path, verbose) job. Runs in a worker process."""
+    kind, path, verbose = job
+    return getattr(V2Parser(verbose=verbose), PARSE_METHODS[kind])(path)
+
+
+def _parse_in_pool(jobs: list, workers: int):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Hand out files in chunks so thousands of small files don't cost a round trip each
+        chunksize = max(1, len(jobs) // (workers * 8))
+        yield from executor.map(parse_v2_file, jobs, chunksize=chunksize)
+
+
+def parse_v2_files(jobs: list, workers: int, verbose: bool = False) -> list:
+    """
+    Parse (kind, path) jobs, one file per job, returning results in job order.
+
+    Jobs are spread over a process pool of `workers` processes unless there
+    are fewer than PARALLEL_MIN_FILES files. Progress is shown on a
+    terminal and a throughput summary is printed at the end.
+    """
+    total_bytes = sum(os.path.getsize(path) for _, path in jobs)
+    workers = max(1, min(workers, len(jobs))) if len(jobs) >= PARALLEL_MIN_FILES else 1
+    print(f"Parsing {len(jobs)} files ({total_bytes / 1024:.0f} KB) with {workers} "
+          f"worker{'s' if workers != 1 else ''}...")
+
+    parse_jobs = [(kind, path, verbose) for kind, path in jobs]
+    parsed = _parse_in_pool(parse_jobs, workers) if workers > 1 else map(parse_v2_file, parse_jobs)
+    show_progress = sys.stdout.isatty() and not verbose
+    results = []
+    start = last_update = time.perf_counter()
+    for result in parsed:
+        results.append(result)
+        now = time.perf_counter()
+        if show_progress and now - last_update >= PROGRESS_INTERVAL:
+            print(f"\r  {len(results)}/{len(jobs)} files ({len(results) / (now - start):.0f} files/s)",
+                  end="", flush=True)
+            last_update = now
+    elapsed = max(time.perf_counter() - start, 1e-6)
+    if show_progress and last_update > start:
+        print()
+    print(f"  Parsed {len(jobs)} files in {elapsed:.2f}s "
+          f"({len(jobs) / elapsed:.0f} files/s, {total_bytes / 1048576 / elapsed:.1f} MB/s)")
+    return results
+
+
 class V3GraphBuilder:
     """Build v3 graph from parsed v2 data."""
 
@@ -537,10 +597,11 @@ def cleanup_v2_files(dry_run: bool = False, verbose: bool = False) -> list:
     return deleted
 
 
-def migrate(dry_run: bool = False, verbose: bool = False, cleanup: bool = True) -> dict:
+def migrate(dry_run: bool = False, verbose: bool = False, cleanup: bool = True, workers: int = None) -> dict:
     """Perform the migration."""
     parser = V2Parser(verbose=verbose)
     builder = V3GraphBuilder(verbose=verbose)
+    workers = workers or os.cpu_count() or 1
 
     state_path = ".peachflow-state.json"
     base_path = "."
@@ -583,45 +644,49 @@ def migrate(dry_run: bool = False, verbose: bool = False, cleanup: bool = True)
     print(f"Found quarters: {', '.join(quarter_names) if quarters else 'none'}")
     print()
 
-    all_stories = []
-    all_tasks = []
-
+    # One job per file, in the order the files are merged below
+    jobs = []
     for quarter_id, folder_name in quarters:
         q_path = os.path.join(base_path, "docs", "04-plan", "quarters", folder_name)
 
-        # Parse stories
         stories_path = os.path.join(q_path, "stories.md")
         if os.path.exists(stories_path):
-            print(f"Parsing {quarter_id} stories ({folder_name}/stories.md)...")
-            stories = parser.parse_stories_md(stories_path)
-            print(f"  Found {len(stories)} stories")
-            all_stories.extend(stories)
+            jobs.append((quarter_id, "stories", stories_path))
 
-        # Parse sprint files (optional - may not exist yet)
+        # Sprint files are optional - may not exist yet
         sprint_files = sorted(Path(q_path).glob("sprint*.md"))
-        if sprint_files:
-            for sprint_file in sprint_files:
-                print(f"Parsing {sprint_file.name}...")
-                tasks = parser.parse_sprint_md(str(sprint_file))
-                print(f"  Found {len(tasks)} tasks")
-                all_tasks.extend(tasks)
-        else:
+        if not sprint_files:
             print(f"  No sprint files found in {folder_name}/ (this is OK)")
+        jobs.extend((quarter_id, "sprint", str(sprint_file)) for sprint_file in sprint_files)
 
-        # Parse individual task files if they exist
         tasks_dir = os.path.join(q_path, "tasks")
         if os.path.isdir(tasks_dir):
-            print(f"Parsing {quarter_id} task files...")
-            task_files = list(Path(tasks_dir).glob("T-*.md"))
-            for task_file in task_files:
-                task = parser.parse_task_file(str(task_file))
-                if task:
-                    # Check if we already have this task from sprint files
-                    existing = [t for t in all_tasks if t["id"] == task["id"]]
-                    if not existing:
-                        all_tasks.append(task)
-            print(f"  Found {len(task_files)} task files")
+            jobs.extend((quarter_id, "task", str(task_file)) for task_file in sorted(Path(tasks_dir).glob("T-*.md")))
 
+    results = parse_v2_files([(kind, path) for _, kind, path in jobs], workers, verbose)
+    print()
+
+    # Merge through an ID index: a later sprint entry replaces an earlier one,
+    # and a task file only adds tasks no sprint file (or earlier task file) had
+    all_stories = []
+    tasks_by_id = {}
+    found = {quarter_id: {"stories": 0, "sprint": 0, "task": 0} for quarter_id, _ in quarters}
+    for (quarter_id, kind, _), result in zip(jobs, results):
+        if kind == "stories":
+            all_stories.extend(result)
+            found[quarter_id]["stories"] += len(result)
+        elif kind == "sprint":
+            for task in result:
+                tasks_by_id[task["id"]] = task
+            found[quarter_id]["sprint"] += len(result)
+        elif result:
+            tasks_by_id.setdefault(result["id"], result)
+            found[quarter_id]["task"] += 1
+    all_tasks = list(tasks_by_id.values())
+
+    for quarter_id, counts in found.items():
+        print(f"  {quarter_id}: {counts['stories']} stories, {counts['sprint']} sprint tasks, "
+              f"{counts['task']} task files")
     print()
 
     # Try to infer story-task relationships if not explicit
@@ -727,11 +792,12 @@ def main():
     parser.add_argument("--dry-run", action="store_true", help="Show what would be migrated")
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
     parser.add_argument("--no-cleanup", action="store_true", help="Don't delete v2 files after migration")
+    parser.add_argument("--jobs", "-j", type=int, help="Worker processes for parsing (default: CPU count)")
 
     args = parser.parse_args()
 
     try:
-        migrate(dry_run=args.dry_run, verbose=args.verbose, cleanup=not args.no_cleanup)
+        migrate(dry_run=args.dry_run, verbose=args.verbose, cleanup=not args.no_cleanup, workers=args.jobs)
     except MigrationError as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
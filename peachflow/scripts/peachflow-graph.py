@@ -20,32 +20,77 @@ Commands:
     chain <id>              Get full chain (task->story->epic->quarter)
     descendants <type> <id> Get all children of entity
     stats                   Show statistics
-    sprint-create           Auto-create sprint from ready tasks
+    schedule                Critical path over task estimates
+    forecast                Monte Carlo completion dates from task history
+    sprint-create           Auto-create sprint from ready tasks within
+                            per-tag capacity and estimate budget
     sprint-active           Get current active sprint
     sprint-complete <id>    Complete a sprint
+    sprint-waves <id>       Split a sprint into waves of parallel tasks
     next-id <type>          Get next available ID
-    export                  Export graph
+    batch                   Run command lines from stdin in one transaction
+    apply [file]            Apply JSONL operations in one process, one save
+    daemon                  Keep the graph in memory and serve commands over
+                            a Unix socket; other invocations forward to it
+    verify-aggregates       Rebuild status counters and report drift
+    compact                 Fold the journal into the graph snapshot
+    import <file>           Import a JSON graph document into the current backend
+    export                  Export graph (json, markdown, csv, parquet,
+                            graphml, dot), optionally one quarter/epic/sprint
     serve                   Start visualization server
+
+Environment:
+    PEACHFLOW_GRAPH_PATH    Graph file (default: .peachflow-graph.json); a .db
+                            path selects the SQLite backend
+    PEACHFLOW_GRAPH_JOURNAL Set to 1 to append mutations to <graph>.wal
+                            instead of rewriting the whole file
+    PEACHFLOW_GRAPH_SOCKET  Daemon socket (default: <graph>.sock)
+    PEACHFLOW_NO_DAEMON     Set to bypass a running daemon
+    PEACHFLOW_NO_COLOR      Disable colored output
 """
 
 import argparse
+import csv
+import hashlib
+import io
 import json
+import math
 import os
+import random
+import re
+import shlex
+import socket
 import sys
-from datetime import datetime, timezone
+from bisect import bisect_right
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from datetime import datetime, timedelta, timezone
+from heapq import heapify, heappop, heappush
+from itertools import islice
 from pathlib import Path
 from typing import Any, Optional
-import http.server
-import socketserver
-import webbrowser
 import threading
 
 
 # === Constants ===
 
 DEFAULT_GRAPH_PATH = ".peachflow-graph.json"
+STATE_FILE = ".peachflow-state.json"
+DEFAULT_MAX_PARALLEL = 3
+
+# Monte Carlo forecasts: simulations per run, and how many are vectorized at once
+FORECAST_SIMULATIONS = 10000
+FORECAST_CHUNK = 1000
+FORECAST_PERCENTILES = (50, 85, 95)
 VERSION = "3.0.0"
 
+# Journaled storage: mutations are appended to <graph>.wal and folded back
+# into the snapshot once the log grows past either threshold.
+JOURNAL_MAX_RECORDS = 500
+JOURNAL_MAX_BYTES = 4 * 1024 * 1024
+
+# Scheduling: tasks without an estimate count as one unit of work
+DEFAULT_TASK_ESTIMATE = 1
+
 ENTITY_TYPES = ["epic", "story", "task", "clarification", "adr", "sprint", "quarter"]
 TASK_TAGS = ["FE", "BE", "DevOps", "Full"]
 ENTITY_STATUSES = {
@@ -58,6 +103,98 @@ ENTITY_STATUSES = {
     "sprint": ["planned", "active", "completed"],
 }
 
+# Hierarchy filters only apply to the entity types they were defined for;
+# status/tag/sprint filters apply to every type.
+FILTER_TYPES = {
+    "quarter": {"epic", "story", "task", "sprint"},
+    "epic": {"story", "task"},
+    "story": {"task"},
+    "entity": {"clarification", "adr"},
+}
+
+# Persisted status counters: aggregate name -> (child collection, parent index field)
+AGGREGATES = {
+    "story_tasks": ("tasks", "story"),
+    "epic_stories": ("stories", "epic"),
+    "quarter_epics": ("epics", "quarter"),
+}
+
+# Status cascade: child type -> (parent reference field, parent collection, parent type)
+CASCADE_PARENTS = {
+    "task": ("storyId", "stories", "story"),
+    "story": ("epicId", "epics", "epic"),
+    "epic": ("quarter", "quarters", "quarter"),
+}
+
+# Cascade recomputation order, bottom-up: (collection, status method)
+CASCADE_ORDER = [
+    ("stories", "_compute_story_status"),
+    ("epics", "_compute_epic_status"),
+    ("quarters", "_compute_quarter_status"),
+    ("sprints", "_compute_sprint_status"),
+]
+
+# Fields `update` may change (CLI flag / apply key -> entity field); relationship
+# fields such as quarter, storyId or sprintId have their own commands
+UPDATE_FIELDS = {
+    "status": "status",
+    "title": "title",
+    "description": "description",
+    "priority": "priority",
+    "estimate": "estimate",
+    "answer": "answer",
+    "worktree": "worktreePath",
+}
+
+ENTITY_COLLECTIONS = {
+    "quarter": "quarters",
+    "epic": "epics",
+    "story": "stories",
+    "task": "tasks",
+    "clarification": "clarifications",
+    "adr": "adrs",
+    "sprint": "sprints",
+}
+
+# Visualization server: graph file poll interval, SSE keepalive, queued events per
+# client, encoded responses kept per revision
+SERVE_POLL_SECONDS = 0.5
+SERVE_KEEPALIVE_SECONDS = 15
+SERVE_EVENT_BACKLOG = 64
+SERVE_BODY_CACHE = 64
+
+# Server-side visualization layout: column per level, row height; pages switch to
+# cluster (level-of-detail) mode above LOD_TASK_LIMIT tasks
+LAYOUT_LEVELS = {"quarter": 0, "epic": 1, "story": 2, "task": 3}
+LAYOUT_LEVEL_SEPARATION = 250
+LAYOUT_NODE_SPACING = 60
+LOD_TASK_LIMIT = 1500
+
+# Derived results cached next to the graph, keyed by its content hash
+CACHE_DIR = ".peachflow-cache"
+CACHE_MAX_ENTRIES = 256
+
+# Change feed: each save that touches entities bumps the graph revision and logs
+# which entities it created, updated or deleted; the newest revisions are kept
+CHANGELOG_MAX_REVISIONS = 256
+CHANGE_OPS = ("created", "updated", "deleted")
+
+# Exports: tabular formats write one table per file, EXPORT_BATCH_ROWS rows at a time
+EXPORT_FORMATS = ["json", "markdown", "csv", "parquet", "graphml", "dot"]
+TABLE_EXPORT_FORMATS = ("csv", "parquet")
+EXPORT_TABLES = {
+    "epics": [("id", "string"), ("title", "string"), ("status", "string"), ("quarter", "string"),
+              ("priority", "int"), ("createdAt", "string"), ("updatedAt", "string")],
+    "stories": [("id", "string"), ("title", "string"), ("status", "string"), ("epicId", "string"),
+                ("createdAt", "string"), ("updatedAt", "string")],
+    "tasks": [("id", "string"), ("title", "string"), ("status", "string"), ("tag", "string"),
+              ("storyId", "string"), ("epicId", "string"), ("quarter", "string"), ("sprintId", "string"),
+              ("estimate", "float"), ("createdAt", "string"), ("updatedAt", "string"),
+              ("completedAt", "string")],
+    "edges": [("source", "string"), ("target", "string"), ("type", "string")],
+}
+EXPORT_BATCH_ROWS = 1000
+
 ID_PATTERNS = {
     "quarter": "Q",
     "epic": "E-",
@@ -82,37 +219,929 @@ class Colors:
     CYAN = "\033[36m"
     GRAY = "\033[90m"
 
+    _CODES = {
+        "RESET": RESET, "BOLD": BOLD, "RED": RED, "GREEN": GREEN, "YELLOW": YELLOW,
+        "BLUE": BLUE, "MAGENTA": MAGENTA, "CYAN": CYAN, "GRAY": GRAY,
+    }
+
     @classmethod
     def disable(cls):
-        for attr in dir(cls):
-            if not attr.startswith("_") and attr != "disable":
-                setattr(cls, attr, "")
+        for attr in cls._CODES:
+            setattr(cls, attr, "")
+
+    @classmethod
+    def enable(cls):
+        for attr, code in cls._CODES.items():
+            setattr(cls, attr, code)
 
 
 if os.environ.get("PEACHFLOW_NO_COLOR") or not sys.stdout.isatty():
     Colors.disable()
 
 
+def natural_id_key(entity_id: str) -> tuple:
+    """Sort key that orders IDs numerically within a prefix (T-999 < T-1000)."""
+    match = re.match(r"^(.*?)(\d+)$", entity_id or "")
+    if match:
+        return (match.group(1), int(match.group(2)))
+    return (entity_id or "", -1)
+
+
+def strongly_connected_components(nodes: set, edges: dict) -> dict:
+    """Map each node to its component number (Tarjan's algorithm, iterative).
+
+    edges maps a node to its successors; successors outside nodes are ignored.
+    """
+    index, low, component = {}, {}, {}
+    stack, on_stack = [], set()
+    count = 0
+    for root in nodes:
+        if root in index:
+            continue
+        work = [(root, iter(edges.get(root, ())))]
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, successors = work[-1]
+            for succ in successors:
+                if succ not in nodes:
+                    continue
+                if succ not in index:
+                    index[succ] = low[succ] = len(index)
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(edges.get(succ, ()))))
+                    break
+                if succ in on_stack:
+                    low[node] = min(low[node], index[succ])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component[member] = count
+                        if member == node:
+                            break
+                    count += 1
+    return component
+
+
+# === Storage Backends ===
+
+def _apply_path_op(data: dict, path: list, value: Any = None, delete: bool = False):
+    """Set (or delete) the value at a key path inside the graph document."""
+    node = data
+    for key in path[:-1]:
+        node = node.setdefault(key, {})
+    if delete:
+        node.pop(path[-1], None)
+    else:
+        node[path[-1]] = value
+
+
+def _fold_change(previous: Optional[str], op: Optional[str]) -> Optional[str]:
+    """Net change to an entity after two changes in a row (None when they cancel out)."""
+    if previous is None or op is None:
+        return previous or op
+    existed = previous != "created"
+    exists = op != "deleted"
+    if existed:
+        return "updated" if exists else "deleted"
+    return "created" if exists else None
+
+
+def _hash_files(paths: list) -> Optional[str]:
+    """Content hash over the files that make up a stored graph (None if absent)."""
+    digest = hashlib.blake2b(digest_size=16)
+    found = False
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                found = True
+                digest.update(path.name.encode())
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        except FileNotFoundError:
+            continue
+    return digest.hexdigest() if found else None
+
+
+def _resolve_path(data: dict, path: tuple) -> tuple:
+    """Return (found, value) for a key path inside the graph document."""
+    node = data
+    for key in path[:-1]:
+        node = node.get(key, {})
+    if path[-1] in node:
+        return True, node[path[-1]]
+    return False, None
+
+
+class JsonStorage:
+    """Single JSON snapshot file, optionally fronted by an append-only journal."""
+
+    name = "json"
+    queryable = False
+
+    def __init__(self, path: Path, journal: bool = False):
+        self.path = path
+        self.wal_path = path.with_suffix(".wal")
+        self.journal = journal
+        self._wal_records = 0
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def content_hash(self) -> Optional[str]:
+        return _hash_files([self.path, self.wal_path])
+
+    def load(self) -> Optional[dict]:
+        """Load the snapshot and replay journal records written since."""
+        if not self.path.exists():
+            return None
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        self._replay_journal(data)
+        return data
+
+    def _replay_journal(self, data: dict):
+        """Apply journal records: [path, value] sets, [path] deletes."""
+        self._wal_records = 0
+        if not self.wal_path.exists():
+            return
+        with open(self.wal_path, "r") as f:
+            for line_no, line in enumerate(f, 1):
+                try:
+                    ops = json.loads(line)
+                except json.JSONDecodeError:
+                    # Only the damaged record is lost; the next append truncates a torn tail
+                    reason = "incomplete record from an interrupted write" if not line.endswith("\n") else "corrupt record"
+                    print(f"peachflow: skipped {reason} at {self.wal_path.name}:{line_no}", file=sys.stderr)
+                    continue
+                for op in ops:
+                    _apply_path_op(data, op[0], op[1] if len(op) > 1 else None, delete=len(op) == 1)
+                self._wal_records += 1
+
+    def save(self, data: dict, dirty: set):
+        if self.journal and self.path.exists():
+            self._append_journal(data, dirty)
+        else:
+            self.write_snapshot(data)
+
+    def _append_journal(self, data: dict, dirty: set):
+        """Append dirty values to the journal, compacting when it grows too large."""
+        if not dirty:
+            return
+        ops = []
+        for path in sorted(dirty):
+            found, value = _resolve_path(data, path)
+            ops.append([list(path), value] if found else [list(path)])
+
+        with open(self.wal_path, "a+b") as f:
+            self._truncate_torn_tail(f)
+            f.write((json.dumps(ops, separators=(",", ":")) + "\n").encode())
+        self._wal_records += 1
+
+        if (self._wal_records >= JOURNAL_MAX_RECORDS
+                or self.wal_path.stat().st_size >= JOURNAL_MAX_BYTES):
+            self.write_snapshot(data)
+
+    def _truncate_torn_tail(self, f):
+        """Cut a partial last record (interrupted append) so the next one starts on its own line."""
+        size = f.seek(0, os.SEEK_END)
+        if not size:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        f.seek(0)
+        keep = f.read().rfind(b"\n") + 1
+        f.truncate(keep)
+        print(f"peachflow: dropped incomplete record at the end of {self.wal_path.name} "
+              f"({size - keep} bytes from an interrupted write)", file=sys.stderr)
+
+    def write_snapshot(self, data: dict):
+        """Write the full graph atomically and drop the folded-in journal."""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+        if self.wal_path.exists():
+            self.wal_path.unlink()
+        self._wal_records = 0
+
+    def compact(self, data: dict) -> int:
+        records = self._wal_records
+        self.write_snapshot(data)
+        return records
+
+
+class SqliteStorage:
+    """
+    SQLite database with one row per entity and per relationship key.
+
+    Entity rows carry denormalized status/tag/sprint/story/epic/quarter
+    columns so reads can be answered by indexed queries without loading
+    the whole graph. Everything outside entities/relationships (version,
+    counters, ...) is kept as a skeleton document plus per-path overrides.
+    """
+
+    name = "sqlite"
+    queryable = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS documents (
+            path TEXT PRIMARY KEY,
+            value TEXT,
+            deleted INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS entities (
+            collection TEXT NOT NULL,
+            id TEXT NOT NULL,
+            status TEXT,
+            tag TEXT,
+            sprint_id TEXT,
+            story_id TEXT,
+            epic_id TEXT,
+            quarter TEXT,
+            entity_id TEXT,
+            body TEXT NOT NULL,
+            PRIMARY KEY (collection, id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_entities_status ON entities (collection, status);
+        CREATE INDEX IF NOT EXISTS idx_entities_tag ON entities (collection, tag);
+        CREATE INDEX IF NOT EXISTS idx_entities_sprint ON entities (collection, sprint_id);
+        CREATE INDEX IF NOT EXISTS idx_entities_story ON entities (collection, story_id);
+        CREATE INDEX IF NOT EXISTS idx_entities_epic ON entities (collection, epic_id);
+        CREATE INDEX IF NOT EXISTS idx_entities_quarter ON entities (collection, quarter);
+        CREATE INDEX IF NOT EXISTS idx_entities_entity ON entities (collection, entity_id);
+        CREATE TABLE IF NOT EXISTS relationships (
+            name TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (name, key)
+        );
+        CREATE TABLE IF NOT EXISTS dependencies (
+            task_id TEXT NOT NULL,
+            depends_on TEXT NOT NULL,
+            PRIMARY KEY (task_id, depends_on)
+        );
+        CREATE INDEX IF NOT EXISTS idx_dependencies_on ON dependencies (depends_on);
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            import sqlite3
+            self._conn = sqlite3.connect(str(self.path))
+            self._conn.executescript(self.SCHEMA)
+        return self._conn
+
+    def exists(self) -> bool:
+        if not self.path.exists():
+            return False
+        row = self._connect().execute("SELECT 1 FROM meta WHERE key = 'skeleton'").fetchone()
+        return row is not None
+
+    def content_hash(self) -> Optional[str]:
+        return _hash_files([self.path, self.path.with_name(self.path.name + "-wal")])
+
+    def load(self) -> Optional[dict]:
+        if not self.exists():
+            return None
+        conn = self._connect()
+        data = self._skeleton()
+        for path, value, deleted in conn.execute("SELECT path, value, deleted FROM documents ORDER BY rowid"):
+            _apply_path_op(data, json.loads(path), json.loads(value), delete=bool(deleted))
+        entities = data.setdefault("entities", {})
+        for collection, entity_id, body in conn.execute(
+                "SELECT collection, id, body FROM entities ORDER BY rowid"):
+            entities.setdefault(collection, {})[entity_id] = json.loads(body)
+        relationships = data.setdefault("relationships", {})
+        for name, key, value in conn.execute(
+                "SELECT name, key, value FROM relationships ORDER BY rowid"):
+            relationships.setdefault(name, {})[key] = json.loads(value)
+        return data
+
+    def _skeleton(self) -> dict:
+        return json.loads(self._connect().execute("SELECT value FROM meta WHERE key = 'skeleton'").fetchone()[0])
+
+    def _in_base(self, conn, path: list) -> bool:
+        """Whether a deleted path could be resurrected by the skeleton or an ancestor document row."""
+        if _resolve_path(self._skeleton(), tuple(path))[0]:
+            return True
+        ancestors = [json.dumps(path[:i]) for i in range(1, len(path))]
+        if not ancestors:
+            return False
+        return conn.execute(
+            f"SELECT 1 FROM documents WHERE deleted = 0 AND path IN ({','.join('?' * len(ancestors))})",
+            ancestors).fetchone() is not None
+
+    def _entity_columns(self, data: dict, collection: str, entity: dict) -> tuple:
+        """Derive indexed columns for an entity from its position in the graph."""
+        story_id = epic_id = quarter = None
+        if collection == "tasks":
+            story_id = entity.get("storyId")
+            story = data["entities"]["stories"].get(story_id) or {}
+            epic_id = story.get("epicId")
+        elif collection == "stories":
+            epic_id = entity.get("epicId")
+        elif collection == "epics":
+            epic_id = entity.get("id")
+        if epic_id:
+            quarter = (data["entities"]["epics"].get(epic_id) or {}).get("quarter")
+        if collection == "sprints":
+            quarter = entity.get("quarterId")
+        return (entity.get("status"), entity.get("tag"), entity.get("sprintId"),
+                story_id, epic_id, quarter, entity.get("entityId"))
+
+    def _write_entity(self, conn, data: dict, collection: str, entity_id: str, entity: Optional[dict]):
+        if entity is None:
+            conn.execute("DELETE FROM entities WHERE collection = ? AND id = ?", (collection, entity_id))
+            return
+        conn.execute(
+            "INSERT INTO entities (collection, id, status, tag, sprint_id, story_id, epic_id, quarter, entity_id, body) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (collection, id) DO UPDATE SET status = excluded.status, tag = excluded.tag, "
+            "sprint_id = excluded.sprint_id, story_id = excluded.story_id, epic_id = excluded.epic_id, "
+            "quarter = excluded.quarter, entity_id = excluded.entity_id, body = excluded.body",
+            (collection, entity_id) + self._entity_columns(data, collection, entity)
+            + (json.dumps(entity, separators=(",", ":")),))
+
+    def _write_relationship(self, conn, name: str, key: str, value: Optional[list]):
+        if value is None:
+            conn.execute("DELETE FROM relationships WHERE name = ? AND key = ?", (name, key))
+        else:
+            conn.execute(
+                "INSERT INTO relationships (name, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (name, key) DO UPDATE SET value = excluded.value",
+                (name, key, json.dumps(value, separators=(",", ":"))))
+        if name == "task_dependencies":
+            conn.execute("DELETE FROM dependencies WHERE task_id = ?", (key,))
+            conn.executemany("INSERT OR IGNORE INTO dependencies (task_id, depends_on) VALUES (?, ?)",
+                             [(key, dep) for dep in value or []])
+
+    def save(self, data: dict, dirty: set):
+        if not self.exists():
+            self.write_snapshot(data)
+            return
+        conn = self._connect()
+        with conn:
+            for path in sorted(dirty):
+                found, value = _resolve_path(data, path)
+                if len(path) == 3 and path[0] == "entities":
+                    self._write_entity(conn, data, path[1], path[2], value if found else None)
+                elif len(path) == 3 and path[0] == "relationships":
+                    self._write_relationship(conn, path[1], path[2], value if found else None)
+                else:
+                    self._write_document(conn, list(path), value, deleted=not found)
+
+    def _write_document(self, conn, path: list, value: Any, deleted: bool):
+        """Record a set/delete of a document path, superseding rows nested under it."""
+        key = json.dumps(path)
+        prefix = key[:-1] + ", "
+        conn.execute("DELETE FROM documents WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+        if deleted and not self._in_base(conn, path):
+            # Nothing underneath to mask, so no tombstone (keeps trimmed changelog rows from piling up)
+            conn.execute("DELETE FROM documents WHERE path = ?", (key,))
+            return
+        # REPLACE gives the row a fresh rowid, so load replays it after older rows
+        conn.execute("INSERT OR REPLACE INTO documents (path, value, deleted) VALUES (?, ?, ?)",
+                     (key, json.dumps(value), int(deleted)))
+
+    def write_snapshot(self, data: dict):
+        """Replace the whole database contents with the given document."""
+        conn = self._connect()
+        skeleton = {key: ({name: {} for name in value} if key in ("entities", "relationships") else value)
+                    for key, value in data.items()}
+        with conn:
+            for table in ("meta", "documents", "entities", "relationships", "dependencies"):
+                conn.execute(f"DELETE FROM {table}")
+            conn.execute("INSERT INTO meta (key, value) VALUES ('skeleton', ?)", (json.dumps(skeleton),))
+            for collection, entities in data.get("entities", {}).items():
+                for entity_id, entity in entities.items():
+                    self._write_entity(conn, data, collection, entity_id, entity)
+            for name, mapping in data.get("relationships", {}).items():
+                for key, value in mapping.items():
+                    self._write_relationship(conn, name, key, value)
+
+    def compact(self, data: dict) -> int:
+        self._connect().execute("VACUUM")
+        return 0
+
+    # --- Indexed queries ---
+
+    def query_entity(self, collection: str, entity_id: str) -> Optional[dict]:
+        row = self._connect().execute(
+            "SELECT body FROM entities WHERE collection = ? AND id = ?", (collection, entity_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query_entities_by_ids(self, collection: str, entity_ids: list) -> list:
+        """Fetch entities by primary key, preserving the order of entity_ids."""
+        found = {}
+        for start in range(0, len(entity_ids), 500):
+            chunk = entity_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for entity_id, body in self._connect().execute(
+                    f"SELECT id, body FROM entities WHERE collection = ? AND id IN ({placeholders})",
+                    [collection] + chunk):
+                found[entity_id] = json.loads(body)
+        return [found[eid] for eid in entity_ids if eid in found]
+
+    def query_dependents(self, task_id: str) -> list:
+        return [row[0] for row in self._connect().execute(
+            "SELECT task_id FROM dependencies WHERE depends_on = ? ORDER BY rowid", (task_id,))]
+
+    def query_relationship(self, name: str, key: str) -> list:
+        row = self._connect().execute(
+            "SELECT value FROM relationships WHERE name = ? AND key = ?", (name, key)).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def query_entities(self, collection: str, lookups: list, limit: int = None) -> list:
+        """Run a filtered list query from (field, value) lookups; None matches unset."""
+        where = ["e.collection = ?"]
+        params = [collection]
+        columns = {
+            "status": "status", "tag": "tag", "sprint": "sprint_id", "story": "story_id",
+            "epic": "epic_id", "quarter": "quarter", "entity": "entity_id",
+        }
+        for field, value in lookups:
+            if value is None:
+                where.append(f"(e.{columns[field]} IS NULL OR e.{columns[field]} = '')")
+            else:
+                where.append(f"e.{columns[field]} = ?")
+                params.append(value)
+        sql = f"SELECT e.id, e.body FROM entities e WHERE {' AND '.join(where)}"
+        # IDs sort as strings in SQL (T-1000 < T-999); order them like the in-memory indexes
+        rows = sorted(self._connect().execute(sql, params), key=lambda row: natural_id_key(row[0]))
+        return [json.loads(body) for _, body in rows[:limit]]
+
+
+def open_storage(path: Path, backend: str = None, journal: bool = False):
+    """Pick a storage backend from an explicit name or the graph file suffix."""
+    backend = backend or ("sqlite" if path.suffix == ".db" else "json")
+    if backend == "sqlite":
+        return SqliteStorage(path)
+    if backend == "json":
+        return JsonStorage(path, journal=journal)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def resolve_graph_path(path: str = None, backend: str = None) -> Path:
+    """Resolve the graph file from an explicit path, the environment or the default."""
+    graph_path = Path(path or os.environ.get("PEACHFLOW_GRAPH_PATH", DEFAULT_GRAPH_PATH))
+    if backend == "sqlite" and graph_path.suffix != ".db":
+        graph_path = graph_path.with_suffix(".db")
+    return graph_path
+
+
+# === Disk Cache ===
+
+class DiskCache:
+    """
+    JSON values on disk under .peachflow-cache/<namespace>/, next to the graph.
+
+    Keys should include the graph content hash the value was derived from,
+    so a changed graph simply misses. Writes are atomic, failures to write
+    are ignored, and each namespace keeps its newest CACHE_MAX_ENTRIES.
+    """
+
+    def __init__(self, graph_path: Path, namespace: str):
+        self.root = graph_path.parent / CACHE_DIR
+        self.dir = self.root / namespace
+
+    def _file(self, key: str) -> Path:
+        return self.dir / (hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + ".json")
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with open(self._file(key), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, value: Any):
+        try:
+            if not self.dir.exists():
+                self.dir.mkdir(parents=True, exist_ok=True)
+                # Keep the cache out of `git add -A` in the project
+                (self.root / ".gitignore").write_text("*\n")
+            path = self._file(key)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+            entries = list(self.dir.glob("*.json"))
+            if len(entries) > CACHE_MAX_ENTRIES:
+                entries.sort(key=lambda entry: entry.stat().st_mtime)
+                for entry in entries[:len(entries) - CACHE_MAX_ENTRIES]:
+                    entry.unlink()
+        except OSError:
+            pass
+
+
 # === Graph Class ===
 
 class PeachflowGraph:
-    def __init__(self, path: str = None):
-        self.path = Path(path or os.environ.get("PEACHFLOW_GRAPH_PATH", DEFAULT_GRAPH_PATH))
-        self.data = None
-        self._load()
+    def __init__(self, path: str = None, journal: bool = None, backend: str = None):
+        self.path = resolve_graph_path(path, backend)
+        if journal is None:
+            journal = os.environ.get("PEACHFLOW_GRAPH_JOURNAL", "") not in ("", "0", "false")
+        self.storage = open_storage(self.path, backend, journal)
+        self._data = None
+        self._loaded = False
+        self._dirty = set()
+        self._txn_depth = 0
+        self._pending_cascades = []
+        self._changes = {}
+        self._dependents = {}
+        self._parent = {}
+        self._index = {}
+        self._indexed = {}
+        self._order = {}
+        self._topo = None
+        self._topo_next = 0
+        self._topo_cycles = set()
+        self._ready = None
+        self._blocking = {}
+        self._tails = {}
+
+    @property
+    def data(self) -> Optional[dict]:
+        """The full graph document, loaded on first access."""
+        if not self._loaded:
+            self._load()
+        return self._data
+
+    @data.setter
+    def data(self, value: Optional[dict]):
+        self._data = value
+        self._loaded = True
+        self._rebuild_indexes()
+
+    def _rebuild_indexes(self):
+        """Derive in-memory indexes from the current document."""
+        self._dependents = {}
+        self._parent = {}
+        self._index = {}
+        self._indexed = {}
+        self._order = {}
+        self._topo = None
+        self._ready = None
+        self._blocking = {}
+        self._tails = {}
+        if self._data is None:
+            return
+        relationships = self._data["relationships"]
+        for task_id, deps in relationships["task_dependencies"].items():
+            for dep_id in deps:
+                self._index_dependency(task_id, dep_id)
+        for name in ("quarter_epics", "epic_stories", "story_tasks"):
+            for parent_id, child_ids in relationships[name].items():
+                for child_id in child_ids:
+                    self._parent[child_id] = parent_id
+        for collection, entities in self._data["entities"].items():
+            self._index[collection] = {}
+            self._indexed[collection] = {}
+            self._order[collection] = sorted(entities, key=natural_id_key)
+            for entity_id, entity in entities.items():
+                self._index_entity(collection, entity_id, entity)
+        if "aggregates" not in self._data:
+            # Graphs written before counters existed get them on first load
+            self._data["aggregates"] = self._compute_aggregates()
+            self._mark_dirty("aggregates")
+
+    def _compute_aggregates(self) -> dict:
+        """Count child statuses per parent from scratch, using the indexes."""
+        aggregates = {}
+        for name, (collection, field) in AGGREGATES.items():
+            counters = aggregates[name] = {}
+            for keys in self._indexed.get(collection, {}).values():
+                if keys.get(field):
+                    counts = counters.setdefault(keys[field], {})
+                    counts[keys["status"]] = counts.get(keys["status"], 0) + 1
+        return aggregates
+
+    def _update_aggregates(self, collection: str, old: Optional[dict], new: Optional[dict]):
+        """Move one child between (parent, status) counters after it changed."""
+        for name, (child_collection, field) in AGGREGATES.items():
+            if child_collection != collection:
+                continue
+            before = (old[field], old["status"]) if old and old.get(field) else None
+            after = (new[field], new["status"]) if new and new.get(field) else None
+            if before == after:
+                continue
+            counters = self._data["aggregates"][name]
+            if before:
+                counts = counters.get(before[0], {})
+                counts[before[1]] = counts.get(before[1], 0) - 1
+                if counts[before[1]] <= 0:
+                    del counts[before[1]]
+                if not counts:
+                    counters.pop(before[0], None)
+                self._mark_dirty("aggregates", name, before[0])
+            if after:
+                counts = counters.setdefault(after[0], {})
+                counts[after[1]] = counts.get(after[1], 0) + 1
+                self._mark_dirty("aggregates", name, after[0])
+
+    def verify_aggregates(self) -> dict:
+        """Rebuild the status counters from the entities and report any drift."""
+        self._ensure_in_memory()
+        actual = self._compute_aggregates()
+        stored = self.data.get("aggregates", {})
+        drift = []
+        for name in AGGREGATES:
+            for parent_id in sorted(set(stored.get(name, {})) | set(actual[name]), key=natural_id_key):
+                have = stored.get(name, {}).get(parent_id, {})
+                want = actual[name].get(parent_id, {})
+                if have != want:
+                    drift.append({"counter": name, "parent": parent_id, "stored": have, "actual": want})
+        if drift:
+            self.data["aggregates"] = actual
+            self._mark_dirty("aggregates")
+            self._save()
+        return {"drift": drift, "repaired": bool(drift)}
+
+    def _aggregate_counts(self, name: str, parent_id: str) -> dict:
+        """Status counts for a parent's children, read from the counters."""
+        if self._data is not None and "aggregates" in self._data:
+            return self._data["aggregates"][name].get(parent_id, {})
+        return {}
+
+    def _index_keys(self, collection: str, entity_id: str, entity: dict) -> dict:
+        """Indexed field values for an entity, including its ancestry."""
+        keys = {
+            "status": entity.get("status"),
+            "tag": entity.get("tag"),
+            "sprint": entity.get("sprintId") or None,
+        }
+        if collection == "tasks":
+            keys["story"] = self._parent.get(entity_id)
+            keys["epic"] = self._parent.get(keys["story"])
+            keys["quarter"] = self._parent.get(keys["epic"])
+        elif collection == "stories":
+            keys["epic"] = self._parent.get(entity_id)
+            keys["quarter"] = self._parent.get(keys["epic"])
+        elif collection == "epics":
+            keys["quarter"] = entity.get("quarter")
+        elif collection == "sprints":
+            keys["quarter"] = entity.get("quarterId")
+        elif collection in ("clarifications", "adrs"):
+            keys["entity"] = entity.get("entityId")
+        return keys
+
+    def _index_entity(self, collection: str, entity_id: str, entity: dict):
+        keys = self._index_keys(collection, entity_id, entity)
+        index = self._index[collection]
+        for field, value in keys.items():
+            index.setdefault(field, {}).setdefault(value, set()).add(entity_id)
+        self._indexed[collection][entity_id] = keys
+
+    def _reindex_entity(self, collection: str, entity_id: str):
+        """Bring the secondary indexes in line with an entity's current state."""
+        if self._data is None or collection not in self._index:
+            return
+        old = self._indexed[collection].pop(entity_id, None)
+        if old:
+            index = self._index[collection]
+            for field, value in old.items():
+                index[field][value].discard(entity_id)
+        entity = self._data["entities"][collection].get(entity_id)
+        new = None
+        if entity is not None:
+            self._index_entity(collection, entity_id, entity)
+            new = self._indexed[collection][entity_id]
+            if old is None:
+                order = self._order[collection]
+                if not order or natural_id_key(order[-1]) < natural_id_key(entity_id):
+                    order.append(entity_id)
+                else:
+                    keys = [natural_id_key(eid) for eid in order]
+                    order.insert(bisect_right(keys, natural_id_key(entity_id)), entity_id)
+        elif old is not None:
+            self._order[collection].remove(entity_id)
+        if collection == "tasks" and self._ready is not None:
+            self._update_ready(entity_id, old, new)
+        if collection == "tasks" and self._topo is not None:
+            if entity is None:
+                self._topo.pop(entity_id, None)
+            elif entity_id not in self._topo:
+                # A new task has no dependents yet, so it can go last
+                self._topo[entity_id] = self._topo_next
+                self._topo_next += 1
+        if "aggregates" in self._data:
+            self._update_aggregates(collection, old, new)
+
+    def _index_dependency(self, task_id: str, depends_on: str):
+        dependents = self._dependents.setdefault(depends_on, [])
+        if task_id not in dependents:
+            dependents.append(task_id)
+            self._track_blocker(task_id, depends_on, 1)
+
+    def _unindex_dependency(self, task_id: str, depends_on: str):
+        dependents = self._dependents.get(depends_on, [])
+        if task_id in dependents:
+            dependents.remove(task_id)
+            self._track_blocker(task_id, depends_on, -1)
+
+    def _ensure_ready(self):
+        """Build the ready set and per-task open-blocker counts on first use."""
+        if self._ready is not None:
+            return
+        tasks = self.data["entities"]["tasks"]
+        self._blocking = {tid: self._count_blockers(tid) for tid in tasks}
+        self._ready = set()
+        for tid in tasks:
+            self._refresh_ready(tid)
+
+    def _unresolved(self, keys: Optional[dict]) -> bool:
+        """True when an indexed task still blocks its dependents."""
+        return keys is not None and keys["status"] not in ["completed", "skipped"]
+
+    def _count_blockers(self, task_id: str) -> int:
+        indexed = self._indexed["tasks"]
+        deps = self.data["relationships"]["task_dependencies"].get(task_id, [])
+        return sum(1 for dep_id in set(deps) if self._unresolved(indexed.get(dep_id)))
+
+    def _refresh_ready(self, task_id: str):
+        keys = self._indexed["tasks"].get(task_id)
+        if (keys and keys["status"] == "pending" and keys["sprint"] is None
+                and not self._blocking.get(task_id)):
+            self._ready.add(task_id)
+        else:
+            self._ready.discard(task_id)
+
+    def _track_blocker(self, task_id: str, depends_on: str, delta: int):
+        """Adjust the open-blocker count after an edge was added or removed."""
+        if self._ready is None or task_id not in self._blocking:
+            return
+        if self._unresolved(self._indexed["tasks"].get(depends_on)):
+            self._blocking[task_id] += delta
+            self._refresh_ready(task_id)
+
+    def _update_ready(self, task_id: str, old: Optional[dict], new: Optional[dict]):
+        """Propagate a task's status/sprint change to the ready set."""
+        was, now = self._unresolved(old), self._unresolved(new)
+        if was != now:
+            for child in self._dependents.get(task_id, []):
+                if child in self._blocking:
+                    self._blocking[child] += 1 if now else -1
+                    self._refresh_ready(child)
+        if new is None:
+            self._blocking.pop(task_id, None)
+            self._ready.discard(task_id)
+            return
+        if old is None:
+            self._blocking[task_id] = self._count_blockers(task_id)
+        self._refresh_ready(task_id)
 
     def _load(self):
-        """Load graph from file or create empty."""
-        if self.path.exists():
-            with open(self.path, "r") as f:
-                self.data = json.load(f)
+        """Load graph from storage or create empty."""
+        self._dirty = set()
+        self._changes = {}
+        self.data = self.storage.load()
+
+    def content_hash(self) -> Optional[str]:
+        """Hash of the stored graph; None while unsaved changes are pending."""
+        if self._dirty or self._txn_depth:
+            return None
+        return self.storage.content_hash()
+
+    def cache(self, namespace: str) -> DiskCache:
+        """Disk cache for results derived from this graph."""
+        return DiskCache(self.path, namespace)
+
+    def _deferred(self) -> bool:
+        """True when reads can be answered by the backend without a full load."""
+        return not self._loaded and self.storage.queryable
+
+    def _mark_dirty(self, *path: str):
+        """Record that the value at path changed since the last save."""
+        self._dirty.add(path)
+        if path[:2] in (("entities", "tasks"), ("relationships", "task_dependencies")):
+            self._tails = {}
+        if path[0] == "entities":
+            existed = path[2] in self._indexed.get(path[1], {})
+            self._reindex_entity(path[1], path[2])
+            self._record_change(path[1], path[2], existed)
+        elif path[:2] == ("relationships", "task_dependencies"):
+            exists = path[2] in self._data["entities"]["tasks"]
+            self._record_change("tasks", path[2], exists)
+
+    def _record_change(self, collection: str, entity_id: str, existed: bool):
+        """Fold an entity change into the changes pending for the next revision."""
+        exists = entity_id in self._data["entities"].get(collection, {})
+        op = {(False, True): "created", (True, True): "updated", (True, False): "deleted"}.get((existed, exists))
+        key = (collection, entity_id)
+        op = _fold_change(self._changes.get(key), op)
+        if op:
+            self._changes[key] = op
         else:
-            self.data = None
+            self._changes.pop(key, None)
+
+    def _log_revision(self):
+        """Bump the revision and log the pending entity changes under it."""
+        revision = self._data.get("revision", 0) + 1
+        entry = {"at": self._now()}
+        for (collection, entity_id), op in self._changes.items():
+            entry.setdefault(op, {}).setdefault(collection, []).append(entity_id)
+        changelog = self._data.setdefault("changelog", {})
+        changelog[str(revision)] = entry
+        self._data["revision"] = revision
+        self._dirty.add(("revision",))
+        self._dirty.add(("changelog", str(revision)))
+        for key in [key for key in changelog if int(key) <= revision - CHANGELOG_MAX_REVISIONS]:
+            del changelog[key]
+            self._dirty.add(("changelog", key))
+        self._changes = {}
 
     def _save(self):
-        """Save graph to file."""
-        with open(self.path, "w") as f:
-            json.dump(self.data, f, indent=2)
+        """Save graph to storage (deferred while a transaction is open)."""
+        if self._txn_depth:
+            return
+        if self._changes:
+            self._log_revision()
+        self.storage.save(self.data, self._dirty)
+        self._dirty = set()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group mutations under a single save and a single cascade pass.
+
+        Saves and status cascades are deferred until the outermost block
+        exits. If the block or the commit raises, the graph is reloaded
+        from storage, discarding every change made inside it. Nested
+        blocks join the outer transaction. Yields a dict whose "cascaded" entry holds the
+        cascade changes once the transaction commits.
+        """
+        self._ensure_in_memory()
+        if self._dirty:
+            self._save()
+        txn = {"cascaded": {}}
+        self._txn_depth += 1
+        try:
+            yield txn
+        except BaseException:
+            self._txn_depth -= 1
+            if not self._txn_depth:
+                self._pending_cascades = []
+                self._load()
+            raise
+        self._txn_depth -= 1
+        if not self._txn_depth:
+            try:
+                self._commit(txn)
+            except BaseException:
+                self._pending_cascades = []
+                self._load()
+                raise
+
+    def _commit(self, txn: dict):
+        """Run the deferred cascade as one batch and persist once."""
+        pending, self._pending_cascades = self._pending_cascades, []
+        self._txn_depth += 1
+        try:
+            if pending:
+                txn["cascaded"].update(self.propagate_status(pending))
+        finally:
+            self._txn_depth -= 1
+        self._save()
+
+    def compact(self) -> dict:
+        """Fold the journal into a fresh snapshot."""
+        self._ensure_in_memory()
+        records = self.storage.compact(self.data)
+        return {"compacted": records, "path": str(self.path)}
+
+    def import_document(self, document: dict) -> dict:
+        """Replace the stored graph with a full JSON graph document."""
+        for key in ("entities", "relationships", "counters"):
+            if key not in document:
+                raise ValueError(f"Not a peachflow graph document: missing '{key}'")
+        # A new revision with an empty changelog sends change-feed readers to a snapshot
+        revision = max((self.data or {}).get("revision", 0), document.get("revision", 0)) + 1
+        self.data = {**document, "revision": revision, "changelog": {}}
+        self.storage.write_snapshot(self.data)
+        self._dirty = set()
+        self._changes = {}
+        return {
+            "imported": sum(len(v) for v in document["entities"].values()),
+            "path": str(self.path),
+            "backend": self.storage.name,
+        }
 
     def _now(self) -> str:
         """Get current ISO timestamp."""
@@ -152,22 +1181,35 @@ class PeachflowGraph:
                 "adr": 0,
                 "sprint": 0,
             },
+            "aggregates": {name: {} for name in AGGREGATES},
+            "revision": 0,
+            "changelog": {},
         }
-        self._save()
+        self.storage.write_snapshot(self.data)
+        self._dirty = set()
         return {"status": "initialized", "path": str(self.path)}
 
     def _ensure_loaded(self):
-        """Ensure graph is loaded."""
-        if self.data is None:
+        """Ensure graph is loaded (queryable backends answer reads without a full load)."""
+        if not self._loaded and not self.storage.queryable:
+            self._load()
+        if self._data is None and not (self._deferred() and self.storage.exists()):
             raise ValueError("Graph not initialized. Run 'peachflow-graph init' first.")
 
+    def _ensure_in_memory(self):
+        """Ensure the full graph and its indexes are in memory (needed for mutations)."""
+        if not self._loaded:
+            self._load()
+        self._ensure_loaded()
+
     def next_id(self, entity_type: str) -> str:
         """Generate next ID for entity type."""
-        self._ensure_loaded()
+        self._ensure_in_memory()
         if entity_type not in self.data["counters"]:
             raise ValueError(f"Unknown entity type: {entity_type}")
 
         self.data["counters"][entity_type] += 1
+        self._mark_dirty("counters")
         counter = self.data["counters"][entity_type]
         prefix = ID_PATTERNS.get(entity_type, "")
 
@@ -181,7 +1223,7 @@ class PeachflowGraph:
     def create_epic(self, title: str, quarter: str, priority: int = 5,
                     description: str = "", deliverables: list = None) -> dict:
         """Create a new epic."""
-        self._ensure_loaded()
+        self._ensure_in_memory()
         if quarter not in ["Q1", "Q2", "Q3", "Q4"]:
             raise ValueError(f"Invalid quarter: {quarter}")
 
@@ -200,14 +1242,18 @@ class PeachflowGraph:
 
         self.data["entities"]["epics"][epic_id] = epic
         self.data["relationships"]["quarter_epics"][quarter].append(epic_id)
+        self._parent[epic_id] = quarter
         self.data["relationships"]["epic_stories"][epic_id] = []
+        self._mark_dirty("entities", "epics", epic_id)
+        self._mark_dirty("relationships", "quarter_epics", quarter)
+        self._mark_dirty("relationships", "epic_stories", epic_id)
         self._save()
         return epic
 
     def create_story(self, epic_id: str, title: str, description: str = "",
                      acceptance_criteria: list = None) -> dict:
         """Create a new user story under an epic."""
-        self._ensure_loaded()
+        self._ensure_in_memory()
         if epic_id not in self.data["entities"]["epics"]:
             raise ValueError(f"Epic not found: {epic_id}")
 
@@ -225,18 +1271,28 @@ class PeachflowGraph:
 
         self.data["entities"]["stories"][story_id] = story
         self.data["relationships"]["epic_stories"][epic_id].append(story_id)
+        self._parent[story_id] = epic_id
         self.data["relationships"]["story_tasks"][story_id] = []
+        self._mark_dirty("entities", "stories", story_id)
+        self._mark_dirty("relationships", "epic_stories", epic_id)
+        self._mark_dirty("relationships", "story_tasks", story_id)
         self._save()
         return story
 
     def create_task(self, story_id: str, title: str, tag: str,
-                    description: str = "", depends_on: list = None) -> dict:
+                    description: str = "", depends_on: list = None, estimate: float = None) -> dict:
         """Create a new task under a story."""
-        self._ensure_loaded()
+        self._ensure_in_memory()
         if story_id not in self.data["entities"]["stories"]:
             raise ValueError(f"Story not found: {story_id}")
         if tag not in TASK_TAGS:
             raise ValueError(f"Invalid tag: {tag}. Must be one of {TASK_TAGS}")
+        if estimate is not None:
+            estimate = self._validate_estimate(estimate)
+
+        for dep_id in depends_on or []:
+            if dep_id not in self.data["entities"]["tasks"]:
+                raise ValueError(f"Dependency task not found: {dep_id}")
 
         task_id = self.next_id("task")
         task = {
@@ -246,6 +1302,7 @@ class PeachflowGraph:
             "status": "pending",
             "storyId": story_id,
             "tag": tag,
+            "estimate": estimate,
             "sprintId": None,
             "createdAt": self._now(),
             "updatedAt": self._now(),
@@ -254,14 +1311,20 @@ class PeachflowGraph:
 
         self.data["entities"]["tasks"][task_id] = task
         self.data["relationships"]["story_tasks"][story_id].append(task_id)
+        self._parent[task_id] = story_id
         self.data["relationships"]["task_dependencies"][task_id] = depends_on or []
+        for dep_id in depends_on or []:
+            self._index_dependency(task_id, dep_id)
+        self._mark_dirty("entities", "tasks", task_id)
+        self._mark_dirty("relationships", "story_tasks", story_id)
+        self._mark_dirty("relationships", "task_dependencies", task_id)
         self._save()
         return task
 
     def create_clarification(self, entity_id: str, question: str,
                              entity_type: str = "general") -> dict:
         """Create a clarification request for an entity."""
-        self._ensure_loaded()
+        self._ensure_in_memory()
         cl_id = self.next_id("clarification")
         clarification = {
             "id": cl_id,
@@ -278,13 +1341,15 @@ class PeachflowGraph:
         if entity_id not in self.data["relationships"]["entity_clarifications"]:
             self.data["relationships"]["entity_clarifications"][entity_id] = []
         self.data["relationships"]["entity_clarifications"][entity_id].append(cl_id)
+        self._mark_dirty("entities", "clarifications", cl_id)
+        self._mark_dirty("relationships", "entity_clarifications", entity_id)
         self._save()
         return clarification
 
     def create_adr(self, title: str, context: str = "", decision: str = "",
                    consequences: str = "", entity_id: str = None) -> dict:
         """Create an Architecture Decision Record."""
-        self._ensure_loaded()
+        self._ensure_in_memory()
         adr_id = self.next_id("adr")
         adr = {
             "id": adr_id,
@@ -304,12 +1369,14 @@ class PeachflowGraph:
             if entity_id not in self.data["relationships"]["entity_adrs"]:
                 self.data["relationships"]["entity_adrs"][entity_id] = []
             self.data["relationships"]["entity_adrs"][entity_id].append(adr_id)
+            self._mark_dirty("relationships", "entity_adrs", entity_id)
+        self._mark_dirty("entities", "adrs", adr_id)
         self._save()
         return adr
 
     def create_sprint(self, quarter: str, task_ids: list = None, name: str = "") -> dict:
         """Create a new sprint."""
-        self._ensure_loaded()
+        self._ensure_in_memory()
         if quarter not in ["Q1", "Q2", "Q3", "Q4"]:
             raise ValueError(f"Invalid quarter: {quarter}")
 
@@ -330,8 +1397,10 @@ class PeachflowGraph:
         for task_id in task_ids or []:
             if task_id in self.data["entities"]["tasks"]:
                 self.data["entities"]["tasks"][task_id]["sprintId"] = sprint_id
+                self._mark_dirty("entities", "tasks", task_id)
 
         self.data["entities"]["sprints"][sprint_id] = sprint
+        self._mark_dirty("entities", "sprints", sprint_id)
         self._save()
         return sprint
 
@@ -353,7 +1422,10 @@ class PeachflowGraph:
         if not collection:
             raise ValueError(f"Unknown entity type: {entity_type}")
 
-        entity = self.data["entities"][collection].get(entity_id)
+        if self._deferred():
+            entity = self.storage.query_entity(collection, entity_id)
+        else:
+            entity = self.data["entities"][collection].get(entity_id)
         if not entity:
             raise ValueError(f"{entity_type} not found: {entity_id}")
         return entity
@@ -362,7 +1434,7 @@ class PeachflowGraph:
 
     def update(self, entity_type: str, entity_id: str, cascade: bool = True, **kwargs) -> dict:
         """Update entity fields. Optionally cascade status changes to parents."""
-        self._ensure_loaded()
+        self._ensure_in_memory()
         entity = self.get(entity_type, entity_id)
 
         # Validate status if provided
@@ -371,12 +1443,23 @@ class PeachflowGraph:
             if valid_statuses and kwargs["status"] not in valid_statuses:
                 raise ValueError(f"Invalid status: {kwargs['status']}. Must be one of {valid_statuses}")
 
+        if entity_type == "task" and kwargs.get("estimate") is not None:
+            kwargs["estimate"] = self._validate_estimate(kwargs["estimate"])
+
         # Track if status changed
         status_changed = "status" in kwargs and entity.get("status") != kwargs["status"]
-
-        # Update fields
+        if cascade and status_changed and not self._txn_depth:
+            # Save the update and the statuses it cascades to together
+            with self.transaction() as txn:
+                self.update(entity_type, entity_id, cascade, **kwargs)
+            result = entity.copy()
+            if txn["cascaded"]:
+                result["_cascaded"] = txn["cascaded"]
+            return result
+
+        # Update fields (tasks created before estimates existed lack the key)
         for key, value in kwargs.items():
-            if key in entity:
+            if key in entity or (entity_type == "task" and key == "estimate"):
                 entity[key] = value
 
         entity["updatedAt"] = self._now()
@@ -389,43 +1472,117 @@ class PeachflowGraph:
         if entity_type == "clarification" and kwargs.get("status") == "clarified":
             entity["clarifiedAt"] = self._now()
 
+        self._mark_dirty("entities", ENTITY_COLLECTIONS[entity_type], entity_id)
         self._save()
 
-        # Cascade status check if status changed and cascade is enabled
-        cascade_changes = {}
+        # Cascade status changes when the transaction commits
         if cascade and status_changed:
-            cascade_changes = self.cascade_status_check(entity_type, entity_id)
-
-        # Return entity with cascade info
-        result = entity.copy()
-        if cascade_changes:
-            result["_cascaded"] = cascade_changes
-
-        return result
+            self._pending_cascades.append((entity_type, entity_id))
+        return entity.copy()
 
     # === Delete Operations ===
 
     def delete(self, entity_type: str, entity_id: str) -> dict:
-        """Soft delete an entity (marks as deleted/skipped)."""
-        self._ensure_loaded()
+        """
+        Delete an entity. Tasks are soft-deleted (marked skipped).
+
+        Stories and epics are removed together with everything under them,
+        and every relationship pointing at a removed entity is dropped.
+        Deleting a sprint returns its tasks to the unassigned pool. Parent,
+        sprint and dependent-task statuses are then re-derived in one batch.
+        """
+        self._ensure_in_memory()
         if entity_type == "task":
             return self.update("task", entity_id, status="skipped")
-        else:
-            # For other types, actually remove
-            entity = self.get(entity_type, entity_id)
-            type_map = {
-                "epic": "epics",
-                "story": "stories",
-                "clarification": "clarifications",
-                "adr": "adrs",
-                "sprint": "sprints",
-            }
-            collection = type_map.get(entity_type)
-            if collection:
-                del self.data["entities"][collection][entity_id]
-                self._save()
+
+        entity = self.get(entity_type, entity_id)
+        collection = ENTITY_COLLECTIONS.get(entity_type)
+        if entity_type == "quarter":
             return {"deleted": entity_id}
 
+        dirty = {name: set() for name, _ in CASCADE_ORDER}
+        freed, removed = set(), []
+        relationships = self.data["relationships"]
+        self._mark_ancestors(entity_type, entity, dirty)
+        if entity_type == "epic":
+            for story_id in list(relationships["epic_stories"].get(entity_id, [])):
+                removed.extend(self._remove_story(story_id, dirty, freed))
+            relationships["epic_stories"].pop(entity_id, None)
+            self._mark_dirty("relationships", "epic_stories", entity_id)
+            self._detach_child("quarter_epics", entity.get("quarter"), entity_id)
+        elif entity_type == "story":
+            removed.extend(self._remove_story(entity_id, dirty, freed)[1:])
+        elif entity_type == "sprint":
+            for task_id in entity.get("taskIds", []):
+                task = self.data["entities"]["tasks"].get(task_id)
+                if task and task.get("sprintId") == entity_id:
+                    task["sprintId"] = None
+                    task["updatedAt"] = self._now()
+                    self._mark_dirty("entities", "tasks", task_id)
+
+        if entity_id in self.data["entities"][collection]:
+            del self.data["entities"][collection][entity_id]
+            self._parent.pop(entity_id, None)
+            self._mark_dirty("entities", collection, entity_id)
+        cascaded = self._propagate(dirty, freed - set(removed))
+        self._save()
+
+        result = {"deleted": entity_id}
+        if removed:
+            result["removed"] = removed
+        if cascaded:
+            result["_cascaded"] = cascaded
+        return result
+
+    def _detach_child(self, relationship: str, parent_id: Optional[str], child_id: str):
+        """Drop child_id from a parent's child list."""
+        children = self.data["relationships"][relationship].get(parent_id)
+        if children and child_id in children:
+            children.remove(child_id)
+            self._mark_dirty("relationships", relationship, parent_id)
+
+    def _remove_story(self, story_id: str, dirty: dict, freed: set) -> list:
+        """Remove a story and its tasks; returns the removed IDs (story first)."""
+        relationships = self.data["relationships"]
+        removed = [story_id]
+        for task_id in list(relationships["story_tasks"].get(story_id, [])):
+            self._remove_task(task_id, dirty, freed)
+            removed.append(task_id)
+        relationships["story_tasks"].pop(story_id, None)
+        self._mark_dirty("relationships", "story_tasks", story_id)
+        story = self.data["entities"]["stories"].pop(story_id, None)
+        if story:
+            self._detach_child("epic_stories", story.get("epicId"), story_id)
+        self._parent.pop(story_id, None)
+        self._mark_dirty("entities", "stories", story_id)
+        return removed
+
+    def _remove_task(self, task_id: str, dirty: dict, freed: set):
+        """Hard-remove a task with its dependency edges and sprint membership."""
+        tasks = self.data["entities"]["tasks"]
+        deps = self.data["relationships"]["task_dependencies"]
+        task = tasks.get(task_id)
+        # Drop edges before the task itself so blocker counts stay balanced
+        for dep_id in deps.pop(task_id, []):
+            self._unindex_dependency(task_id, dep_id)
+        self._mark_dirty("relationships", "task_dependencies", task_id)
+        for dependent in list(self._dependents.get(task_id, [])):
+            remaining = deps.get(dependent, [])
+            while task_id in remaining:
+                remaining.remove(task_id)
+            self._unindex_dependency(dependent, task_id)
+            self._mark_dirty("relationships", "task_dependencies", dependent)
+            freed.add(dependent)
+        if task and task.get("sprintId"):
+            sprint = self.data["entities"]["sprints"].get(task["sprintId"])
+            if sprint and task_id in sprint.get("taskIds", []):
+                sprint["taskIds"].remove(task_id)
+                self._mark_dirty("entities", "sprints", sprint["id"])
+                dirty["sprints"].add(sprint["id"])
+        tasks.pop(task_id, None)
+        self._parent.pop(task_id, None)
+        self._mark_dirty("entities", "tasks", task_id)
+
     # === List Operations ===
 
     def list_entities(self, entity_type: str, **filters) -> list:
@@ -444,106 +1601,285 @@ class PeachflowGraph:
         if not collection:
             raise ValueError(f"Unknown entity type: {entity_type}")
 
-        entities = list(self.data["entities"][collection].values())
-
-        # Apply filters
-        if "quarter" in filters and filters["quarter"]:
-            if entity_type == "epic":
-                entities = [e for e in entities if e.get("quarter") == filters["quarter"]]
-            elif entity_type == "story":
-                # Get stories via epics in quarter
-                epic_ids = self.data["relationships"]["quarter_epics"].get(filters["quarter"], [])
-                story_ids = []
-                for epic_id in epic_ids:
-                    story_ids.extend(self.data["relationships"]["epic_stories"].get(epic_id, []))
-                entities = [e for e in entities if e["id"] in story_ids]
-            elif entity_type == "task":
-                # Get tasks via stories via epics in quarter
-                epic_ids = self.data["relationships"]["quarter_epics"].get(filters["quarter"], [])
-                task_ids = []
-                for epic_id in epic_ids:
-                    for story_id in self.data["relationships"]["epic_stories"].get(epic_id, []):
-                        task_ids.extend(self.data["relationships"]["story_tasks"].get(story_id, []))
-                entities = [e for e in entities if e["id"] in task_ids]
-            elif entity_type == "sprint":
-                entities = [e for e in entities if e.get("quarterId") == filters["quarter"]]
-
-        if "epic" in filters and filters["epic"]:
-            if entity_type == "story":
-                entities = [e for e in entities if e.get("epicId") == filters["epic"]]
-            elif entity_type == "task":
-                story_ids = self.data["relationships"]["epic_stories"].get(filters["epic"], [])
-                task_ids = []
-                for story_id in story_ids:
-                    task_ids.extend(self.data["relationships"]["story_tasks"].get(story_id, []))
-                entities = [e for e in entities if e["id"] in task_ids]
-
-        if "story" in filters and filters["story"]:
-            if entity_type == "task":
-                entities = [e for e in entities if e.get("storyId") == filters["story"]]
+        lookups = self._filter_lookups(entity_type, filters)
+        if self._deferred():
+            entities = self.storage.query_entities(collection, lookups)
+        else:
+            ids = self._query_index(collection, lookups)
+            entities_by_id = self.data["entities"][collection]
+            entities = [entities_by_id[eid] for eid in ids]
 
-        if "status" in filters and filters["status"]:
-            entities = [e for e in entities if e.get("status") == filters["status"]]
+        # Sort by priority for epics, by natural ID order otherwise
+        if entity_type == "epic":
+            entities.sort(key=lambda x: (x.get("priority", 99), natural_id_key(x["id"])))
 
-        if "tag" in filters and filters["tag"]:
-            entities = [e for e in entities if e.get("tag") == filters["tag"]]
+        return entities
 
-        if "sprint" in filters and filters["sprint"]:
-            entities = [e for e in entities if e.get("sprintId") == filters["sprint"]]
+    def _filter_lookups(self, entity_type: str, filters: dict) -> list:
+        """Translate filters into (index field, value) lookups.
 
+        Filters that don't apply to this entity type are ignored.
+        """
+        lookups = []
+        for name in ("quarter", "epic", "story", "entity", "status", "tag", "sprint"):
+            if filters.get(name) and (name not in FILTER_TYPES or entity_type in FILTER_TYPES[name]):
+                lookups.append((name, filters[name]))
         if filters.get("unassigned"):
-            entities = [e for e in entities if not e.get("sprintId")]
-
+            lookups.append(("sprint", None))
         if filters.get("pending"):
-            entities = [e for e in entities if e.get("status") == "pending"]
+            lookups.append(("status", "pending"))
+        return lookups
 
-        if "entity" in filters and filters["entity"]:
-            # For clarifications/ADRs linked to specific entity
-            if entity_type == "clarification":
-                entities = [e for e in entities if e.get("entityId") == filters["entity"]]
-            elif entity_type == "adr":
-                entities = [e for e in entities if e.get("entityId") == filters["entity"]]
+    def find_entities(self, entity_type: str, where: str = None, order_by: str = None,
+                      limit: int = None, offset: int = 0, **filters) -> list:
+        """List entities matching filters and a --where expression."""
+        return list(self.iter_entities(entity_type, where, order_by, limit, offset, **filters))
 
-        # Sort by priority for epics, by ID otherwise
-        if entity_type == "epic":
-            entities.sort(key=lambda x: (x.get("priority", 99), x["id"]))
-        else:
-            entities.sort(key=lambda x: x["id"])
+    def iter_entities(self, entity_type: str, where: str = None, order_by: str = None,
+                      limit: int = None, offset: int = 0, **filters):
+        """
+        Yield entities matching filters and a --where expression.
 
-        return entities
+        Equality and 'in' tests on indexed fields (status, tag, sprint, story,
+        epic, quarter, entity) that are ANDed at the top level are answered
+        from the indexes. The rest of the expression is compiled once and
+        checked against the remaining candidates only. Without --order-by,
+        matches are produced lazily so callers can stream them.
+        """
+        stop = offset + limit if limit else None
+        if not where and not order_by:
+            yield from self.list_entities(entity_type, **filters)[offset:stop]
+            return
+
+        collection = ENTITY_COLLECTIONS.get(entity_type)
+        if not collection:
+            raise ValueError(f"Unknown entity type: {entity_type}")
+        self._ensure_in_memory()
+        index = self._index[collection]
+        indexed = self._indexed[collection]
+
+        sets = [index.get(field, {}).get(value, set())
+                for field, value in self._filter_lookups(entity_type, filters)]
+        residual = []
+        tree = parse_where(where) if where else ("and", [])
+        for node in (tree[1] if tree[0] == "and" else [tree]):
+            field = WHERE_INDEX_FIELDS.get(node[1]) if node[0] in ("cmp", "in") else None
+            if field in index and node[0] == "cmp" and node[2] == "=":
+                sets.append(index[field].get(node[3], set()))
+            elif field in index and node[0] == "in" and not node[3]:
+                sets.append(set().union(*(index[field].get(value, set()) for value in node[2])))
+            else:
+                residual.append(node)
+
+        def lookup(entity, name):
+            field = WHERE_INDEX_FIELDS.get(name)
+            if field in index:
+                return indexed[entity["id"]].get(field)
+            return entity.get(name)
+
+        matches = compile_where(("and", residual), lookup)
+        entities_by_id = self.data["entities"][collection]
+        entities = (entities_by_id[eid] for eid in self._ids_in_order(collection, sets))
+        if residual:
+            entities = filter(matches, entities)
+        if not order_by and entity_type != "epic":
+            yield from islice(entities, offset, stop)
+            return
+
+        entities = list(entities)
+        if order_by:
+            for name, descending in reversed(parse_order_by(order_by)):
+                entities.sort(key=lambda entity: _sort_key(lookup(entity, name)), reverse=descending)
+                # Missing values sort last in both directions
+                entities.sort(key=lambda entity: lookup(entity, name) is None)
+        elif entity_type == "epic":
+            entities.sort(key=lambda x: (x.get("priority", 99), natural_id_key(x["id"])))
+        yield from entities[offset:stop]
+
+    def _query_index(self, collection: str, lookups: list) -> list:
+        """Intersect index sets for the lookups; returns IDs in natural order."""
+        index = self._index[collection]
+        return self._ids_in_order(collection, [index.get(field, {}).get(value, set()) for field, value in lookups])
+
+    def _ids_in_order(self, collection: str, sets: list) -> list:
+        """Intersect ID sets (smallest first); returns IDs in natural order."""
+        if not sets:
+            return list(self._order[collection])
+
+        sets = sorted(sets, key=len)
+        matched = sets[0].intersection(*sets[1:]) if len(sets) > 1 else sets[0]
+        if not matched:
+            return []
+
+        order = self._order[collection]
+        # Small results are cheaper to sort than to find in the ordered list
+        if len(matched) * 8 < len(order):
+            return sorted(matched, key=natural_id_key)
+        return [eid for eid in order if eid in matched]
 
     # === Dependency Operations ===
 
     def add_dependency(self, task_id: str, depends_on: str) -> dict:
         """Add a dependency: task_id depends on depends_on."""
-        self._ensure_loaded()
+        self._ensure_in_memory()
         if task_id not in self.data["entities"]["tasks"]:
             raise ValueError(f"Task not found: {task_id}")
         if depends_on not in self.data["entities"]["tasks"]:
             raise ValueError(f"Dependency task not found: {depends_on}")
+        if task_id == depends_on:
+            raise ValueError(f"Task cannot depend on itself: {task_id}")
 
         deps = self.data["relationships"]["task_dependencies"].get(task_id, [])
         if depends_on not in deps:
+            cycle = self._topo_insert(task_id, depends_on)
+            if cycle:
+                raise ValueError(f"Dependency would create a cycle: {' -> '.join(cycle)}")
             deps.append(depends_on)
             self.data["relationships"]["task_dependencies"][task_id] = deps
+            self._index_dependency(task_id, depends_on)
+            self._mark_dirty("relationships", "task_dependencies", task_id)
             self._save()
         return {"task": task_id, "depends_on": deps}
 
     def remove_dependency(self, task_id: str, depends_on: str) -> dict:
         """Remove a dependency."""
-        self._ensure_loaded()
+        self._ensure_in_memory()
         deps = self.data["relationships"]["task_dependencies"].get(task_id, [])
         if depends_on in deps:
             deps.remove(depends_on)
             self.data["relationships"]["task_dependencies"][task_id] = deps
+            self._unindex_dependency(task_id, depends_on)
+            if self._topo_cycles:
+                # Removing an edge may break an existing cycle; re-derive lazily
+                self._topo = None
+            self._mark_dirty("relationships", "task_dependencies", task_id)
             self._save()
         return {"task": task_id, "depends_on": deps}
 
+    def _ensure_topo(self):
+        """Assign every task a topological position (Kahn's algorithm, natural-ID tie-break)."""
+        if self._topo is not None:
+            return
+        tasks = self.data["entities"]["tasks"]
+        deps = self.data["relationships"]["task_dependencies"]
+        indegree = {tid: len(set(deps.get(tid, [])) & tasks.keys()) for tid in tasks}
+        heap = [(natural_id_key(tid), tid) for tid, n in indegree.items() if n == 0]
+        heapify(heap)
+        self._topo = {}
+        while heap:
+            _, tid = heappop(heap)
+            self._topo[tid] = len(self._topo)
+            for child in self._dependents.get(tid, []):
+                if child in indegree:
+                    indegree[child] -= 1
+                    if indegree[child] == 0:
+                        heappush(heap, (natural_id_key(child), child))
+        # Graphs saved before cycles were rejected may still contain some.
+        # Ignore the edges inside each cycle and finish Kahn's algorithm on
+        # the rest, so tasks downstream of a cycle still follow their deps.
+        leftover = set(tasks) - set(self._topo)
+        component = strongly_connected_components(leftover, deps)
+        sizes = {}
+        for number in component.values():
+            sizes[number] = sizes.get(number, 0) + 1
+        self._topo_cycles = {tid for tid in leftover
+                             if sizes[component[tid]] > 1 or tid in deps.get(tid, [])}
+        indegree = {tid: sum(1 for dep_id in set(deps.get(tid, []))
+                             if dep_id in leftover and component[dep_id] != component[tid])
+                    for tid in leftover}
+        heap = [(natural_id_key(tid), tid) for tid, n in indegree.items() if n == 0]
+        heapify(heap)
+        while heap:
+            _, tid = heappop(heap)
+            self._topo[tid] = len(self._topo)
+            for child in self._dependents.get(tid, []):
+                if child in indegree and component[child] != component[tid]:
+                    indegree[child] -= 1
+                    if indegree[child] == 0:
+                        heappush(heap, (natural_id_key(child), child))
+        self._topo_next = len(self._topo)
+
+    def _topo_insert(self, task_id: str, depends_on: str) -> Optional[list]:
+        """Keep the topological order valid for a new edge (Pearce-Kelly).
+
+        Only tasks positioned between the two endpoints are visited. Returns
+        the dependency cycle the edge would close, or None after reordering.
+        """
+        self._ensure_topo()
+        position = self._topo
+        lower, upper = position[task_id], position[depends_on]
+        exact = not self._topo_cycles
+        if exact and upper < lower:
+            return None
+        bound = upper
+        if not exact:
+            bound = self._topo_next
+
+        # Forward: tasks that (transitively) depend on task_id
+        forward, stack, reached_from = {task_id}, [task_id], {}
+        while stack:
+            node = stack.pop()
+            for child in self._dependents.get(node, []):
+                if child not in position or child in forward or position[child] > bound:
+                    continue
+                reached_from[child] = node
+                if child == depends_on:
+                    cycle = [depends_on]
+                    while cycle[-1] != task_id:
+                        cycle.append(reached_from[cycle[-1]])
+                    return cycle + [depends_on]
+                forward.add(child)
+                stack.append(child)
+        if upper < lower:
+            return None
+        forward = {node for node in forward if position[node] <= upper}
+
+        # Backward: tasks depends_on (transitively) depends on
+        deps = self.data["relationships"]["task_dependencies"]
+        backward, stack = {depends_on}, [depends_on]
+        while stack:
+            node = stack.pop()
+            for dep_id in deps.get(node, []):
+                if dep_id in position and dep_id not in backward and position[dep_id] > lower:
+                    backward.add(dep_id)
+                    stack.append(dep_id)
+
+        # Reuse the affected slots: backward set first, then forward set
+        moved = sorted(backward, key=position.get) + sorted(forward, key=position.get)
+        for node, slot in zip(moved, sorted(position[node] for node in moved)):
+            position[node] = slot
+        return None
+
+    def topological_order(self, quarter: str = None, epic: str = None, sprint: str = None) -> list:
+        """Tasks in dependency order, each annotated with its unresolved blockers."""
+        self._ensure_loaded()
+        self._ensure_topo()
+        tasks = self.list_entities("task", quarter=quarter, epic=epic, sprint=sprint)
+        cyclic = sorted(self._topo_cycles & {task["id"] for task in tasks}, key=natural_id_key)
+        if cyclic:
+            raise ValueError(f"Dependency cycle among tasks: {', '.join(cyclic)}")
+        tasks.sort(key=lambda task: self._topo[task["id"]])
+        entities = self.data["entities"]["tasks"]
+        ordered = []
+        for task in tasks:
+            deps = self.data["relationships"]["task_dependencies"].get(task["id"], [])
+            blocked_by = [dep_id for dep_id in deps
+                          if dep_id in entities and entities[dep_id]["status"] not in ["completed", "skipped"]]
+            ordered.append({**task, "dependsOn": list(deps), "blockedBy": blocked_by})
+        return ordered
+
     def get_dependencies(self, task_id: str) -> list:
         """Get tasks that task_id depends on."""
         self._ensure_loaded()
         return self.data["relationships"]["task_dependencies"].get(task_id, [])
 
+    def get_dependents(self, task_id: str) -> list:
+        """Get tasks that depend on task_id."""
+        self._ensure_loaded()
+        if self._deferred():
+            return self.storage.query_dependents(task_id)
+        return list(self._dependents.get(task_id, []))
+
     def get_blockers(self, task_id: str) -> list:
         """Get unresolved blocking tasks."""
         self._ensure_loaded()
@@ -558,17 +1894,54 @@ class PeachflowGraph:
     # === Traversal Operations ===
 
     def get_ready_tasks(self, quarter: str = None, epic: str = None, limit: int = None) -> list:
-        """Find tasks ready for work (pending + no blockers)."""
+        """Find tasks ready for work (pending, unassigned, no blockers), highest value first.
+
+        Tasks are ordered by epic priority, then by the length of the
+        dependency chain they gate, then by age.
+        """
         self._ensure_loaded()
-        tasks = self.list_entities("task", quarter=quarter, epic=epic, status="pending", unassigned=True)
-        ready = []
-        for task in tasks:
-            blockers = self.get_blockers(task["id"])
-            if not blockers:
-                ready.append(task)
-                if limit and len(ready) >= limit:
-                    break
-        return ready
+        self._ensure_ready()
+        candidates = self._ready
+        index = self._index["tasks"]
+        for field, value in (("quarter", quarter), ("epic", epic)):
+            if value:
+                candidates = candidates & index.get(field, {}).get(value, set())
+        heap = [(self._ready_priority(tid), tid) for tid in candidates]
+        heapify(heap)
+        count = min(limit, len(heap)) if limit else len(heap)
+        tasks = self.data["entities"]["tasks"]
+        return [tasks[heappop(heap)[1]] for _ in range(count)]
+
+    def _ready_priority(self, task_id: str) -> tuple:
+        """Heap key for a ready task; smaller sorts first."""
+        task = self.data["entities"]["tasks"][task_id]
+        epic = self.data["entities"]["epics"].get(self._indexed["tasks"][task_id].get("epic")) or {}
+        return (epic.get("priority", 99), -self._tail_length(task_id),
+                task.get("createdAt") or "", natural_id_key(task_id))
+
+    def _tail_length(self, task_id: str) -> float:
+        """Remaining work on the longest dependency chain that starts at task_id.
+
+        Memoized until the next task or dependency change.
+        """
+        tails = self._tails
+        tasks = self.data["entities"]["tasks"]
+        stack, visiting = [task_id], set()
+        while stack:
+            tid = stack[-1]
+            if tid in tails:
+                stack.pop()
+                continue
+            visiting.add(tid)
+            children = [child for child in self._dependents.get(tid, []) if child in tasks]
+            waiting = [child for child in children if child not in tails and child not in visiting]
+            if waiting:
+                stack.extend(waiting)
+                continue
+            stack.pop()
+            tails[tid] = self._remaining_work(tasks[tid]) + max(
+                (tails.get(child, 0) for child in children), default=0)
+        return tails[task_id]
 
     def get_chain(self, task_id: str) -> dict:
         """Get full chain: task -> story -> epic -> quarter."""
@@ -585,9 +1958,109 @@ class PeachflowGraph:
             "path": f"{epic['quarter']}/{epic['id']}/{story['id']}/{task['id']}",
         }
 
+    def get_context(self, task_ids: list) -> list:
+        """
+        Everything needed to implement each task, in one document per task.
+
+        Bundles the task, its chain, dependencies, blockers and dependents,
+        clarifications and ADRs linked to the task, story or epic, and the
+        story's acceptance progress. Cached on disk against the graph content
+        hash, so a repeat call on an unchanged graph skips loading it.
+        """
+        digest = self.content_hash()
+        key = f"{self.path.name}:{digest}:{','.join(task_ids)}"
+        cache = self.cache("context")
+        if digest:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        self._ensure_in_memory()
+        result = [self._task_context(task_id) for task_id in task_ids]
+        if digest:
+            cache.put(key, result)
+        return result
+
+    def _task_context(self, task_id: str) -> dict:
+        chain = self.get_chain(task_id)
+        entities = self.data["entities"]
+        relationships = self.data["relationships"]
+        tasks = entities["tasks"]
+
+        def brief(task: dict) -> dict:
+            return {"id": task["id"], "title": task["title"], "status": task["status"], "tag": task.get("tag")}
+
+        linked = [task_id, chain["story"]["id"], chain["epic"]["id"]]
+        return {
+            "task": chain["task"],
+            "path": chain["path"],
+            "quarter": chain["quarter"],
+            "epic": chain["epic"],
+            "story": chain["story"],
+            "acceptance": self.get_acceptance_progress(chain["story"]["id"]),
+            "dependencies": [brief(tasks[dep]) for dep in self.get_dependencies(task_id) if dep in tasks],
+            "blockers": [brief(task) for task in self.get_blockers(task_id)],
+            "dependents": [brief(tasks[dep]) for dep in sorted(self.get_dependents(task_id), key=natural_id_key)
+                           if dep in tasks],
+            "clarifications": [entities["clarifications"][cl_id] for entity_id in linked
+                               for cl_id in relationships["entity_clarifications"].get(entity_id, [])
+                               if cl_id in entities["clarifications"]],
+            "adrs": [entities["adrs"][adr_id] for entity_id in linked
+                     for adr_id in relationships["entity_adrs"].get(entity_id, [])
+                     if adr_id in entities["adrs"]],
+        }
+
+    def get_changes(self, since: int) -> dict:
+        """
+        Entities created, updated or deleted after revision `since`.
+
+        Changes are folded per entity across the logged revisions and carry
+        the entity's current state. When `since` has aged out of the
+        changelog (or is ahead of the graph), the result is a full snapshot
+        of entities and relationships instead.
+        """
+        self._ensure_in_memory()
+        revision = self.data.get("revision", 0)
+        changelog = self.data.get("changelog", {})
+        if since != revision and (since > revision or str(since + 1) not in changelog):
+            return {
+                "revision": revision,
+                "since": since,
+                "snapshot": True,
+                "entities": self.data["entities"],
+                "relationships": self.data["relationships"],
+            }
+
+        changes = {}
+        for number in range(since + 1, revision + 1):
+            entry = changelog[str(number)]
+            for op in CHANGE_OPS:
+                for collection, entity_ids in entry.get(op, {}).items():
+                    for entity_id in entity_ids:
+                        key = (collection, entity_id)
+                        folded = _fold_change(changes.get(key), op)
+                        if folded:
+                            changes[key] = folded
+                        else:
+                            changes.pop(key, None)
+
+        singular = {collection: name for name, collection in ENTITY_COLLECTIONS.items()}
+        result = {"revision": revision, "since": since, "snapshot": False}
+        result.update({op: [] for op in CHANGE_OPS})
+        for (collection, entity_id), op in changes.items():
+            record = {"type": singular.get(collection, collection), "id": entity_id}
+            if op != "deleted":
+                record["entity"] = self.data["entities"][collection][entity_id]
+                if collection == "tasks":
+                    record["dependsOn"] = self.get_dependencies(entity_id)
+            result[op].append(record)
+        return result
+
     def get_descendants(self, entity_type: str, entity_id: str) -> dict:
         """Get all children of an entity."""
         self._ensure_loaded()
+        if self._deferred():
+            return self._query_descendants(entity_type, entity_id)
         result = {"epics": [], "stories": [], "tasks": []}
 
         if entity_type == "quarter":
@@ -616,53 +2089,67 @@ class PeachflowGraph:
 
         return result
 
+    def _query_descendants(self, entity_type: str, entity_id: str) -> dict:
+        """get_descendants answered from relationship rows and primary-key lookups."""
+        result = {"epics": [], "stories": [], "tasks": []}
+        epic_ids, story_ids, task_ids = [], [], []
+
+        if entity_type == "quarter":
+            epic_ids = self.storage.query_relationship("quarter_epics", entity_id)
+            result["epics"] = self.storage.query_entities_by_ids("epics", epic_ids)
+        elif entity_type == "epic":
+            epic_ids = [entity_id]
+        elif entity_type == "story":
+            story_ids = [entity_id]
+
+        if epic_ids:
+            for epic_id in epic_ids:
+                story_ids.extend(self.storage.query_relationship("epic_stories", epic_id))
+            result["stories"] = self.storage.query_entities_by_ids("stories", story_ids)
+
+        for story_id in story_ids:
+            task_ids.extend(self.storage.query_relationship("story_tasks", story_id))
+        result["tasks"] = self.storage.query_entities_by_ids("tasks", task_ids)
+        return result
+
     # -------------------------------------------------------------------------
     # Status Aggregation Helpers
     # -------------------------------------------------------------------------
 
     def _get_story_tasks_status(self, story_id: str) -> dict:
         """Get aggregated status counts for all tasks in a story."""
-        task_ids = self.data["relationships"]["story_tasks"].get(story_id, [])
-        tasks = [self.data["entities"]["tasks"].get(tid) for tid in task_ids
-                 if self.data["entities"]["tasks"].get(tid)]
-
+        counts = self._aggregate_counts("story_tasks", story_id)
         return {
-            "total": len(tasks),
-            "completed": sum(1 for t in tasks if t["status"] == "completed"),
-            "skipped": sum(1 for t in tasks if t["status"] == "skipped"),
-            "in_progress": sum(1 for t in tasks if t["status"] == "in_progress"),
-            "blocked": sum(1 for t in tasks if t["status"] == "blocked"),
-            "pending": sum(1 for t in tasks if t["status"] == "pending"),
+            "total": sum(counts.values()),
+            "completed": counts.get("completed", 0),
+            "skipped": counts.get("skipped", 0),
+            "in_progress": counts.get("in_progress", 0),
+            "blocked": counts.get("blocked", 0),
+            "pending": counts.get("pending", 0),
         }
 
     def _get_epic_stories_status(self, epic_id: str) -> dict:
         """Get aggregated status counts for all stories in an epic."""
-        story_ids = self.data["relationships"]["epic_stories"].get(epic_id, [])
-        stories = [self.data["entities"]["stories"].get(sid) for sid in story_ids
-                   if self.data["entities"]["stories"].get(sid)]
-
+        counts = self._aggregate_counts("epic_stories", epic_id)
         return {
-            "total": len(stories),
-            "completed": sum(1 for s in stories if s["status"] == "completed"),
-            "in_progress": sum(1 for s in stories if s["status"] == "in_progress"),
-            "blocked": sum(1 for s in stories if s["status"] == "blocked"),
-            "ready": sum(1 for s in stories if s["status"] == "ready"),
-            "draft": sum(1 for s in stories if s["status"] == "draft"),
+            "total": sum(counts.values()),
+            "completed": counts.get("completed", 0),
+            "in_progress": counts.get("in_progress", 0),
+            "blocked": counts.get("blocked", 0),
+            "ready": counts.get("ready", 0),
+            "draft": counts.get("draft", 0),
         }
 
     def _get_quarter_epics_status(self, quarter_id: str) -> dict:
         """Get aggregated status counts for all epics in a quarter."""
-        epic_ids = self.data["relationships"]["quarter_epics"].get(quarter_id, [])
-        epics = [self.data["entities"]["epics"].get(eid) for eid in epic_ids
-                 if self.data["entities"]["epics"].get(eid)]
-
+        counts = self._aggregate_counts("quarter_epics", quarter_id)
         return {
-            "total": len(epics),
-            "completed": sum(1 for e in epics if e["status"] == "completed"),
-            "in_progress": sum(1 for e in epics if e["status"] == "in_progress"),
-            "blocked": sum(1 for e in epics if e["status"] == "blocked"),
-            "ready": sum(1 for e in epics if e["status"] == "ready"),
-            "draft": sum(1 for e in epics if e["status"] == "draft"),
+            "total": sum(counts.values()),
+            "completed": counts.get("completed", 0),
+            "in_progress": counts.get("in_progress", 0),
+            "blocked": counts.get("blocked", 0),
+            "ready": counts.get("ready", 0),
+            "draft": counts.get("draft", 0),
         }
 
     # -------------------------------------------------------------------------
@@ -752,145 +2239,92 @@ class PeachflowGraph:
     # Cascade Status Methods
     # -------------------------------------------------------------------------
 
-    def _unblock_dependents(self, task_id: str) -> list:
-        """Re-evaluate tasks that depend on the completed task."""
+    def _unblock_tasks(self, task_ids: set, now: str) -> list:
+        """Move blocked tasks whose dependencies are all resolved back to pending."""
         unblocked = []
-
-        # Find tasks that depend on this one
-        for tid, deps in self.data["relationships"]["task_dependencies"].items():
-            if task_id in deps:
-                task = self.data["entities"]["tasks"].get(tid)
-                if task and task["status"] == "blocked":
-                    # Check if all dependencies are now resolved
-                    blockers = self.get_blockers(tid)
-                    if not blockers:
-                        task["status"] = "pending"
-                        task["updatedAt"] = self._now()
-                        unblocked.append(tid)
-
+        for tid in sorted(task_ids, key=natural_id_key):
+            task = self.data["entities"]["tasks"].get(tid)
+            if task and task["status"] == "blocked" and not self.get_blockers(tid):
+                task["status"] = "pending"
+                task["updatedAt"] = now
+                self._mark_dirty("entities", "tasks", tid)
+                unblocked.append(tid)
         return unblocked
 
+    def _mark_ancestors(self, entity_type: str, entity: dict, dirty: dict):
+        """Add every ancestor of an entity (story, epic, quarter) to the dirty sets."""
+        entities = self.data["entities"]
+        while entity_type in CASCADE_PARENTS:
+            field, collection, parent_type = CASCADE_PARENTS[entity_type]
+            parent_id = entity.get(field)
+            if not parent_id:
+                return
+            dirty[collection].add(parent_id)
+            entity = entities[collection].get(parent_id)
+            if entity is None:
+                return
+            entity_type = parent_type
+
     def cascade_status_check(self, entity_type: str, entity_id: str) -> dict:
         """
         Check and update parent statuses after an entity status change.
 
         Returns dict of all status changes made: {entity_id: new_status}
         """
-        self._ensure_loaded()
-        changes = {}
+        return self.propagate_status([(entity_type, entity_id)])
 
-        if entity_type == "task":
-            task = self.data["entities"]["tasks"].get(entity_id)
-            if not task:
-                return changes
-
-            # If task is completed, unblock any dependents
-            if task["status"] == "completed":
-                unblocked = self._unblock_dependents(entity_id)
-                for uid in unblocked:
-                    changes[uid] = "pending (unblocked)"
-
-            # Get task's story
-            story_id = task.get("storyId")
-            if story_id:
-                # Check story status
-                new_story_status = self._compute_story_status(story_id)
-                if new_story_status:
-                    story = self.data["entities"]["stories"].get(story_id)
-                    if story and story["status"] != new_story_status:
-                        story["status"] = new_story_status
-                        story["updatedAt"] = self._now()
-                        if new_story_status == "completed":
-                            story["completedAt"] = self._now()
-                        changes[story_id] = new_story_status
-
-                # Get story's epic
-                story = self.data["entities"]["stories"].get(story_id)
-                if story:
-                    epic_id = story.get("epicId")
-                    if epic_id:
-                        # Check epic status
-                        new_epic_status = self._compute_epic_status(epic_id)
-                        if new_epic_status:
-                            epic = self.data["entities"]["epics"].get(epic_id)
-                            if epic and epic["status"] != new_epic_status:
-                                epic["status"] = new_epic_status
-                                epic["updatedAt"] = self._now()
-                                if new_epic_status == "completed":
-                                    epic["completedAt"] = self._now()
-                                changes[epic_id] = new_epic_status
-
-                        # Get epic's quarter
-                        epic = self.data["entities"]["epics"].get(epic_id)
-                        if epic:
-                            quarter_id = epic.get("quarter")
-                            if quarter_id:
-                                new_quarter_status = self._compute_quarter_status(quarter_id)
-                                if new_quarter_status:
-                                    quarter = self.data["entities"]["quarters"].get(quarter_id)
-                                    if quarter and quarter["status"] != new_quarter_status:
-                                        quarter["status"] = new_quarter_status
-                                        quarter["updatedAt"] = self._now()
-                                        if new_quarter_status == "completed":
-                                            quarter["completedAt"] = self._now()
-                                        changes[quarter_id] = new_quarter_status
-
-            # Check sprint status if task is in a sprint
-            sprint_id = task.get("sprintId")
-            if sprint_id:
-                new_sprint_status = self._compute_sprint_status(sprint_id)
-                if new_sprint_status:
-                    sprint = self.data["entities"]["sprints"].get(sprint_id)
-                    if sprint and sprint["status"] != new_sprint_status:
-                        sprint["status"] = new_sprint_status
-                        sprint["completedAt"] = self._now()
-                        sprint["updatedAt"] = self._now()
-                        changes[sprint_id] = new_sprint_status
+    def propagate_status(self, changed: list) -> dict:
+        """
+        Re-derive statuses after a batch of (entity_type, entity_id) changes.
 
-        elif entity_type == "story":
-            # Cascade up from story
-            story = self.data["entities"]["stories"].get(entity_id)
-            if story:
-                epic_id = story.get("epicId")
-                if epic_id:
-                    new_epic_status = self._compute_epic_status(epic_id)
-                    if new_epic_status:
-                        epic = self.data["entities"]["epics"].get(epic_id)
-                        if epic and epic["status"] != new_epic_status:
-                            epic["status"] = new_epic_status
-                            epic["updatedAt"] = self._now()
-                            if new_epic_status == "completed":
-                                epic["completedAt"] = self._now()
-                            changes[epic_id] = new_epic_status
-
-                    epic = self.data["entities"]["epics"].get(epic_id)
-                    if epic:
-                        quarter_id = epic.get("quarter")
-                        if quarter_id:
-                            new_quarter_status = self._compute_quarter_status(quarter_id)
-                            if new_quarter_status:
-                                quarter = self.data["entities"]["quarters"].get(quarter_id)
-                                if quarter and quarter["status"] != new_quarter_status:
-                                    quarter["status"] = new_quarter_status
-                                    quarter["updatedAt"] = self._now()
-                                    if new_quarter_status == "completed":
-                                        quarter["completedAt"] = self._now()
-                                    changes[quarter_id] = new_quarter_status
+        Completed tasks unblock their dependents. The ancestors and sprints of
+        every changed entity are collected first, then each is recomputed
+        once, bottom-up, and the graph is saved once.
 
-        elif entity_type == "epic":
-            epic = self.data["entities"]["epics"].get(entity_id)
-            if epic:
-                quarter_id = epic.get("quarter")
-                if quarter_id:
-                    new_quarter_status = self._compute_quarter_status(quarter_id)
-                    if new_quarter_status:
-                        quarter = self.data["entities"]["quarters"].get(quarter_id)
-                        if quarter and quarter["status"] != new_quarter_status:
-                            quarter["status"] = new_quarter_status
-                            quarter["updatedAt"] = self._now()
-                            if new_quarter_status == "completed":
-                                quarter["completedAt"] = self._now()
-                            changes[quarter_id] = new_quarter_status
+        Returns dict of all status changes made: {entity_id: new_status}
+        """
+        self._ensure_in_memory()
+        entities = self.data["entities"]
+        dirty = {collection: set() for collection, _ in CASCADE_ORDER}
+        freed = set()
+        for entity_type, entity_id in dict.fromkeys(changed):
+            collection = ENTITY_COLLECTIONS.get(entity_type)
+            entity = entities.get(collection, {}).get(entity_id)
+            if entity is None:
+                continue
+            if entity_type == "sprint":
+                dirty["sprints"].add(entity_id)
+                continue
+            if entity_type == "task":
+                if entity["status"] == "completed":
+                    freed.update(self._dependents.get(entity_id, []))
+                if entity.get("sprintId"):
+                    dirty["sprints"].add(entity["sprintId"])
+            self._mark_ancestors(entity_type, entity, dirty)
+        return self._propagate(dirty, freed)
+
+    def _propagate(self, dirty: dict, freed: set) -> dict:
+        """Unblock freed tasks, then recompute dirty stories, epics, quarters and sprints."""
+        entities = self.data["entities"]
+        now = self._now()
+        changes = {}
+        for tid in self._unblock_tasks(freed, now):
+            changes[tid] = "pending (unblocked)"
+            self._mark_ancestors("task", entities["tasks"][tid], dirty)
+
+        for collection, method in CASCADE_ORDER:
+            compute = getattr(self, method)
+            for entity_id in sorted(dirty[collection], key=natural_id_key):
+                entity = entities[collection].get(entity_id)
+                new_status = compute(entity_id) if entity else None
+                if not new_status or entity["status"] == new_status:
+                    continue
+                entity["status"] = new_status
+                entity["updatedAt"] = now
+                if new_status == "completed":
+                    entity["completedAt"] = now
+                changes[entity_id] = new_status
+                self._mark_dirty("entities", collection, entity_id)
 
         if changes:
             self._save()
@@ -903,7 +2337,7 @@ class PeachflowGraph:
 
     def update_acceptance_criterion(self, story_id: str, criterion_index: int, done: bool) -> dict:
         """Update a specific acceptance criterion's done status."""
-        self._ensure_loaded()
+        self._ensure_in_memory()
         story = self.get("story", story_id)
 
         criteria = story.get("acceptanceCriteria", [])
@@ -918,6 +2352,7 @@ class PeachflowGraph:
 
         story["acceptanceCriteria"] = criteria
         story["updatedAt"] = self._now()
+        self._mark_dirty("entities", "stories", story_id)
         self._save()
 
         return story
@@ -942,45 +2377,61 @@ class PeachflowGraph:
 
     def get_stats(self, quarter: str = None, epic: str = None) -> dict:
         """Get statistics."""
-        self._ensure_loaded()
+        self._ensure_in_memory()
 
+        # Status breakdowns come from the persisted counters (scoped) or the
+        # status index (whole graph); only the scope's ID sets are touched.
         if epic:
-            stories = self.list_entities("story", epic=epic)
-            tasks = self.list_entities("task", epic=epic)
+            epic_ids = [self.get("epic", epic)["id"]]
         elif quarter:
-            stories = self.list_entities("story", quarter=quarter)
-            tasks = self.list_entities("task", quarter=quarter)
+            epic_ids = self._query_index("epics", [("quarter", quarter)])
         else:
-            stories = self.list_entities("story")
-            tasks = self.list_entities("task")
+            epic_ids = None
 
-        epics = self.list_entities("epic", quarter=quarter) if not epic else [self.get("epic", epic)]
-
-        completed_tasks = [t for t in tasks if t["status"] == "completed"]
-        pending_tasks = [t for t in tasks if t["status"] == "pending"]
-        blocked_tasks = [t for t in tasks if self.get_blockers(t["id"])]
+        if epic_ids is None:
+            epics_by_status = self._index_counts("epics")
+            stories_by_status = self._index_counts("stories")
+            tasks_by_status = self._index_counts("tasks")
+            task_ids = self._order["tasks"]
+        else:
+            epics_by_status = self._count_by_status([self.data["entities"]["epics"][e] for e in epic_ids])
+            story_ids = self._query_index("stories", [("epic" if epic else "quarter", epic or quarter)])
+            stories_by_status = self._sum_counts(self._aggregate_counts("epic_stories", e) for e in epic_ids)
+            tasks_by_status = self._sum_counts(self._aggregate_counts("story_tasks", s) for s in story_ids)
+            task_ids = self._query_index("tasks", [("epic" if epic else "quarter", epic or quarter)])
+
+        task_id_set = set(task_ids)
+        tag_index = self._index["tasks"].get("tag", {})
+        by_tag = {}
+        for tag, ids in tag_index.items():
+            count = len(ids) if epic_ids is None else len(ids & task_id_set)
+            if count:
+                by_tag[tag] = count
+
+        total_tasks = sum(tasks_by_status.values())
+        completed = tasks_by_status.get("completed", 0)
 
         return {
             "epics": {
-                "total": len(epics),
-                "by_status": self._count_by_status(epics),
+                "total": sum(epics_by_status.values()),
+                "by_status": epics_by_status,
             },
             "stories": {
-                "total": len(stories),
-                "by_status": self._count_by_status(stories),
+                "total": sum(stories_by_status.values()),
+                "by_status": stories_by_status,
             },
             "tasks": {
-                "total": len(tasks),
-                "completed": len(completed_tasks),
-                "pending": len(pending_tasks),
-                "blocked": len(blocked_tasks),
-                "by_tag": self._count_by_field(tasks, "tag"),
-                "by_status": self._count_by_status(tasks),
+                "total": total_tasks,
+                "completed": completed,
+                "pending": tasks_by_status.get("pending", 0),
+                "blocked": self._count_blocked(task_id_set),
+                "by_tag": by_tag,
+                "by_status": tasks_by_status,
             },
-            "progress": len(completed_tasks) / len(tasks) if tasks else 0,
+            "progress": completed / total_tasks if total_tasks else 0,
             "clarifications": {
-                "pending": len(self.list_entities("clarification", pending=True)),
-                "total": len(self.list_entities("clarification")),
+                "pending": len(self._index["clarifications"].get("status", {}).get("pending", ())),
+                "total": len(self._order["clarifications"]),
             },
         }
 
@@ -991,26 +2442,397 @@ class PeachflowGraph:
             counts[status] = counts.get(status, 0) + 1
         return counts
 
-    def _count_by_field(self, entities: list, field: str) -> dict:
-        counts = {}
-        for e in entities:
-            value = e.get(field, "unknown")
-            counts[value] = counts.get(value, 0) + 1
-        return counts
+    def _index_counts(self, collection: str) -> dict:
+        """Entity counts per status for a whole collection, from the status index."""
+        return {status: len(ids) for status, ids in self._index[collection].get("status", {}).items() if ids}
+
+    def _sum_counts(self, counters) -> dict:
+        total = {}
+        for counts in counters:
+            for status, count in counts.items():
+                total[status] = total.get(status, 0) + count
+        return total
+
+    def _count_blocked(self, task_ids: set) -> int:
+        """Count tasks in task_ids that have at least one unresolved dependency."""
+        tasks = self.data["entities"]["tasks"]
+        blocked = 0
+        for task_id, deps in self.data["relationships"]["task_dependencies"].items():
+            if task_id in task_ids and any(
+                    dep in tasks and tasks[dep]["status"] not in ("completed", "skipped") for dep in deps):
+                blocked += 1
+        return blocked
+
+    # === Scheduling ===
+
+    def _validate_estimate(self, estimate) -> float:
+        """Check an estimate is a finite, non-negative number; integral values stay ints."""
+        try:
+            value = float(estimate)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid estimate: {estimate}. Must be a finite non-negative number")
+        if not math.isfinite(value) or value < 0:
+            raise ValueError(f"Invalid estimate: {estimate}. Must be a finite non-negative number")
+        return int(value) if value.is_integer() else value
+
+    def _remaining_work(self, task: dict) -> float:
+        """Work left on a task: its estimate, or nothing once completed or skipped."""
+        if task["status"] in ["completed", "skipped"]:
+            return 0
+        estimate = task.get("estimate")
+        return DEFAULT_TASK_ESTIMATE if estimate is None else estimate
+
+    def _critical_path(self, order: list, start: dict, finish: dict) -> tuple:
+        """Backward pass over tasks in topological order.
+
+        Returns latest starts, the finish time of the group and its critical
+        chain (zero-slack tasks linked finish-to-start, in execution order).
+        """
+        members = set(order)
+        end = max((finish[tid] for tid in order), default=0)
+        latest = {}
+        for tid in reversed(order):
+            latest_finish = min((latest[child] for child in self._dependents.get(tid, []) if child in members),
+                                default=end)
+            latest[tid] = latest_finish - (finish[tid] - start[tid])
+
+        def critical(tid):
+            return abs(latest[tid] - start[tid]) < 1e-9
+
+        deps = self.data["relationships"]["task_dependencies"]
+        chain = []
+        tail = [tid for tid in order if critical(tid) and abs(finish[tid] - end) < 1e-9]
+        current = tail[-1] if tail else None
+        while current:
+            chain.append(current)
+            current = next((dep_id for dep_id in deps.get(current, [])
+                            if dep_id in members and critical(dep_id)
+                            and abs(finish[dep_id] - start[current]) < 1e-9), None)
+        chain.reverse()
+        return latest, end, chain
+
+    def get_schedule(self, quarter: str = None, epic: str = None) -> dict:
+        """Critical-path schedule for the tasks in scope.
+
+        Earliest starts come from a forward pass over everything the scoped
+        tasks depend on, so outside work still delays them. Latest starts and
+        slack come from a backward pass within the scope. Completed and
+        skipped tasks count as no remaining work.
+        """
+        self._ensure_loaded()
+        self._ensure_topo()
+        if self._topo_cycles:
+            cyclic = sorted(self._topo_cycles, key=natural_id_key)
+            raise ValueError(f"Dependency cycle among tasks: {', '.join(cyclic)}")
+        tasks = self.data["entities"]["tasks"]
+        deps = self.data["relationships"]["task_dependencies"]
+        scope = self.list_entities("task", quarter=quarter, epic=epic)
+        order = sorted((task["id"] for task in scope), key=self._topo.get)
+
+        # Forward pass: memoized post-order walk over the scope's ancestors
+        start, finish = {}, {}
+        for root in order:
+            stack = [root]
+            while stack:
+                tid = stack[-1]
+                if tid in finish:
+                    stack.pop()
+                    continue
+                waiting = [dep_id for dep_id in deps.get(tid, []) if dep_id in tasks and dep_id not in finish]
+                if waiting:
+                    stack.extend(waiting)
+                    continue
+                stack.pop()
+                start[tid] = max((finish[dep_id] for dep_id in deps.get(tid, []) if dep_id in tasks), default=0)
+                finish[tid] = start[tid] + self._remaining_work(tasks[tid])
+
+        latest, end, chain = self._critical_path(order, start, finish)
+        result = {
+            "finish": round(end, 6),
+            "criticalChain": chain,
+            "tasks": [],
+            "quarters": {},
+            "epics": {},
+        }
+        for tid in order:
+            task = tasks[tid]
+            slack = latest[tid] - start[tid]
+            result["tasks"].append({
+                "id": tid,
+                "title": task["title"],
+                "tag": task["tag"],
+                "status": task["status"],
+                "duration": self._remaining_work(task),
+                "earliestStart": round(start[tid], 6),
+                "earliestFinish": round(finish[tid], 6),
+                "latestStart": round(latest[tid], 6),
+                "slack": round(slack, 6),
+                "critical": abs(slack) < 1e-9,
+            })
+
+        # Per-group chains reuse the forward pass; each group gets its own backward pass
+        for field, key in (("quarter", "quarters"), ("epic", "epics")):
+            groups = {}
+            for tid in order:
+                groups.setdefault(self._indexed["tasks"][tid].get(field), []).append(tid)
+            for group_id in sorted((g for g in groups if g), key=natural_id_key):
+                _, group_end, group_chain = self._critical_path(groups[group_id], start, finish)
+                result[key][group_id] = {"finish": round(group_end, 6), "criticalChain": group_chain}
+        return result
+
+    # === Forecasting ===
+
+    def _cycle_times(self) -> dict:
+        """Days from creation to completion of finished tasks, per tag."""
+        samples = {}
+        for task in self.data["entities"]["tasks"].values():
+            if task["status"] != "completed" or not task.get("completedAt") or not task.get("createdAt"):
+                continue
+            try:
+                days = (_parse_time(task["completedAt"]) - _parse_time(task["createdAt"])).total_seconds() / 86400
+            except ValueError:
+                continue
+            samples.setdefault(task["tag"], []).append(max(days, 0.0))
+        return samples
+
+    def forecast(self, sprint: str = None, epic: str = None, quarter: str = None,
+                 simulations: int = FORECAST_SIMULATIONS, workers: int = DEFAULT_MAX_PARALLEL,
+                 seed: int = None) -> dict:
+        """Monte Carlo completion forecast for the open tasks in scope.
+
+        Each simulation draws a cycle time for every open task from the
+        completed tasks with the same tag (or from all completed tasks when a
+        tag has no history). Finish is the later of the dependency critical
+        path and the total work spread over the given number of workers.
+        Open blockers outside the scope are simulated too. NumPy is used when
+        available; otherwise a pure-Python loop gives the same model.
+        """
+        if simulations < 1 or workers < 1:
+            raise ValueError("simulations and workers must be at least 1")
+        self._ensure_loaded()
+        self._ensure_topo()
+        tasks = self.data["entities"]["tasks"]
+        deps = self.data["relationships"]["task_dependencies"]
+        indexed = self._indexed["tasks"]
+        if sprint:
+            self.get("sprint", sprint)
+        scope = [task["id"] for task in self.list_entities("task", sprint=sprint, epic=epic, quarter=quarter)
+                 if self._unresolved(indexed[task["id"]])]
+
+        # Open tasks in scope plus every open task they (transitively) wait on
+        included, stack = set(scope), list(scope)
+        while stack:
+            for dep_id in deps.get(stack.pop(), []):
+                if dep_id not in included and self._unresolved(indexed.get(dep_id)):
+                    included.add(dep_id)
+                    stack.append(dep_id)
+        cyclic = sorted(self._topo_cycles & included, key=natural_id_key)
+        if cyclic:
+            raise ValueError(f"Dependency cycle among tasks: {', '.join(cyclic)}")
+
+        history = self._cycle_times()
+        everything = [days for samples in history.values() for days in samples]
+        if included and not everything:
+            raise ValueError("No completed tasks with timestamps to forecast from")
+        order = sorted(included, key=self._topo.get)
+        position = {tid: i for i, tid in enumerate(order)}
+        pools = [history.get(tasks[tid]["tag"]) or everything for tid in order]
+        parents = [[position[dep_id] for dep_id in set(deps.get(tid, [])) if dep_id in position]
+                   for tid in order]
+        targets = [position[tid] for tid in scope]
+
+        np = _import_numpy()
+        if not order:
+            days = [0.0] * simulations
+        elif np is not None:
+            days = _simulate_numpy(np, pools, parents, targets, simulations, workers, seed)
+        else:
+            days = _simulate_python(pools, parents, targets, simulations, workers, seed)
+
+        days = sorted(days)
+        now = datetime.now(timezone.utc)
+        result = {
+            "scope": {key: value for key, value in (("sprint", sprint), ("epic", epic), ("quarter", quarter))
+                      if value},
+            "openTasks": len(scope),
+            "simulatedTasks": len(order),
+            "simulations": simulations,
+            "workers": workers,
+            "engine": "numpy" if np is not None else "python",
+            "history": {tag: len(samples) for tag, samples in sorted(history.items())},
+            "days": {},
+            "dates": {},
+        }
+        for pct in FORECAST_PERCENTILES:
+            value = days[min(len(days) - 1, int(len(days) * pct / 100))]
+            result["days"][f"p{pct}"] = round(value, 2)
+            result["dates"][f"p{pct}"] = (now + timedelta(days=value)).date().isoformat()
+        return result
 
     # === Sprint Operations ===
 
-    def auto_create_sprint(self, quarter: str, max_tasks: int = 10, name: str = "") -> dict:
-        """Auto-create sprint from ready tasks."""
+    def pack_sprint(self, quarter: str, max_tasks: int = 10, capacity: dict = None,
+                    budget: float = None) -> dict:
+        """Choose sprint tasks greedily by ready priority under capacity limits.
+
+        capacity caps the number of tasks per tag; budget caps the summed
+        estimates. A pending task becomes a candidate once every open blocker
+        has been picked, so short dependency chains can finish inside the
+        sprint. Every pending, unassigned task in the quarter gets an
+        explanation of why it was picked or left out.
+        """
+        self._ensure_loaded()
+        self._ensure_ready()
+        capacity = capacity or {}
+        tasks = self.data["entities"]["tasks"]
+        index = self._index["tasks"]
+        pool = (index.get("quarter", {}).get(quarter, set())
+                & index.get("status", {}).get("pending", set())
+                & index.get("sprint", {}).get(None, set()))
+
+        waiting = {tid: self._blocking[tid] for tid in pool if self._blocking.get(tid)}
+        heap = [(self._ready_priority(tid), tid) for tid in pool if tid not in waiting]
+        heapify(heap)
+        picked, used, spent = [], {}, 0
+        explanation, unblocked_by = {}, {}
+        while heap:
+            _, tid = heappop(heap)
+            tag, work = tasks[tid]["tag"], self._remaining_work(tasks[tid])
+            if len(picked) >= max_tasks:
+                reason = f"sprint full ({max_tasks} tasks)"
+            elif tag in capacity and used.get(tag, 0) >= capacity[tag]:
+                reason = f"{tag} capacity reached ({capacity[tag]})"
+            elif budget is not None and spent + work > budget:
+                reason = f"over estimate budget ({spent:g} + {work:g} > {budget:g})"
+            else:
+                reason = None
+            if reason:
+                explanation[tid] = {"id": tid, "picked": False, "reason": reason}
+                continue
+
+            picked.append(tid)
+            used[tag] = used.get(tag, 0) + 1
+            spent += work
+            if tid in unblocked_by:
+                reason = f"unblocked by {', '.join(unblocked_by[tid])} in this sprint"
+            else:
+                reason = "ready"
+            explanation[tid] = {"id": tid, "picked": True, "reason": reason}
+            for child in self._dependents.get(tid, []):
+                if child in waiting:
+                    waiting[child] -= 1
+                    unblocked_by.setdefault(child, []).append(tid)
+                    if not waiting[child]:
+                        del waiting[child]
+                        heappush(heap, (self._ready_priority(child), child))
+
+        deps = self.data["relationships"]["task_dependencies"]
+        chosen = set(picked)
+        for tid in sorted(waiting, key=natural_id_key):
+            blockers = [dep_id for dep_id in deps.get(tid, [])
+                        if dep_id not in chosen and self._unresolved(self._indexed["tasks"].get(dep_id))]
+            explanation[tid] = {"id": tid, "picked": False,
+                                "reason": f"waiting on {', '.join(blockers)} outside this sprint"}
+
+        return {
+            "tasks": [tasks[tid] for tid in picked],
+            "explanation": [explanation[tid] for tid in picked]
+                           + [entry for entry in explanation.values() if not entry["picked"]],
+            "usage": {"tags": used, "capacity": capacity, "estimate": spent, "budget": budget},
+        }
+
+    def auto_create_sprint(self, quarter: str, max_tasks: int = 10, name: str = "",
+                           capacity: dict = None, budget: float = None, dry_run: bool = False) -> dict:
+        """Auto-create sprint from the highest-value work that fits its capacity."""
         self._ensure_loaded()
-        ready_tasks = self.get_ready_tasks(quarter=quarter, limit=max_tasks)
+        packed = self.pack_sprint(quarter, max_tasks, capacity, budget)
 
-        if not ready_tasks:
-            return {"error": "No ready tasks found", "sprint": None}
+        if not packed["tasks"]:
+            return {"error": "No ready tasks found", "sprint": None, **packed}
+        if dry_run:
+            return {"sprint": None, **packed}
 
-        task_ids = [t["id"] for t in ready_tasks]
+        task_ids = [t["id"] for t in packed["tasks"]]
         sprint = self.create_sprint(quarter, task_ids, name)
-        return {"sprint": sprint, "tasks": ready_tasks}
+        return {"sprint": sprint, **packed}
+
+    def get_sprint_waves(self, sprint_id: str, max_parallel: int = DEFAULT_MAX_PARALLEL) -> dict:
+        """Split a sprint's open tasks into ordered waves that can run concurrently.
+
+        A task joins a wave once its in-sprint dependencies are in earlier
+        waves. Each wave holds at most max_parallel tasks, taken round-robin
+        across tags, longest dependency chain first. Full-stack tasks run
+        alone. Tasks waiting on open work outside the sprint are reported
+        separately.
+        """
+        if max_parallel < 1:
+            raise ValueError(f"Invalid max parallel: {max_parallel}. Must be at least 1")
+        sprint = self.get("sprint", sprint_id)
+        self._ensure_loaded()
+        tasks = self.data["entities"]["tasks"]
+        deps = self.data["relationships"]["task_dependencies"]
+        indexed = self._indexed["tasks"]
+        open_ids = [tid for tid in sprint.get("taskIds", [])
+                    if tid in tasks and self._unresolved(indexed.get(tid))]
+        members = set(open_ids)
+
+        # Open blockers inside the sprint gate waves; outside ones block outright
+        pending, blocked = {}, []
+        for tid in open_ids:
+            open_deps = {dep_id for dep_id in deps.get(tid, []) if self._unresolved(indexed.get(dep_id))}
+            outside = sorted(open_deps - members, key=natural_id_key)
+            if outside:
+                blocked.append({**tasks[tid], "waitingOn": outside})
+            pending[tid] = open_deps & members
+        for entry in blocked:
+            del pending[entry["id"]]
+        stuck = {entry["id"] for entry in blocked}
+
+        def rank(tid):
+            return (-self._tail_length(tid), natural_id_key(tid))
+
+        waves = []
+        available = [tid for tid, open_deps in pending.items() if not open_deps]
+        for tid in available:
+            del pending[tid]
+        while available:
+            available.sort(key=rank)
+            if tasks[available[0]]["tag"] == "Full":
+                wave = [available[0]]
+            else:
+                by_tag = {}
+                for tid in available:
+                    if tasks[tid]["tag"] != "Full":
+                        by_tag.setdefault(tasks[tid]["tag"], []).append(tid)
+                wave, queues = [], list(by_tag.values())
+                while queues and len(wave) < max_parallel:
+                    for queue in queues:
+                        if len(wave) < max_parallel:
+                            wave.append(queue.pop(0))
+                    queues = [queue for queue in queues if queue]
+            waves.append(wave)
+            done = set(wave)
+            available = [tid for tid in available if tid not in done]
+            for tid in wave:
+                for child in self._dependents.get(tid, []):
+                    if child in pending:
+                        pending[child].discard(tid)
+                        if not pending[child]:
+                            del pending[child]
+                            available.append(child)
+
+        # Whatever is left waits on a blocked task or sits in a cycle
+        for tid in sorted(pending, key=natural_id_key):
+            waiting = sorted(pending[tid] | (stuck & set(deps.get(tid, []))), key=natural_id_key)
+            blocked.append({**tasks[tid], "waitingOn": waiting})
+
+        return {
+            "sprint": sprint_id,
+            "maxParallel": max_parallel,
+            "waves": [{"wave": number, "tasks": [tasks[tid] for tid in wave]}
+                      for number, wave in enumerate(waves, 1)],
+            "blocked": blocked,
+        }
 
     def get_active_sprint(self) -> Optional[dict]:
         """Get current active sprint."""
@@ -1022,166 +2844,913 @@ class PeachflowGraph:
         """Complete a sprint."""
         return self.update("sprint", sprint_id, status="completed", completedAt=self._now())
 
-    # === Export ===
-
-    def export(self, format: str = "json") -> str:
-        """Export graph in specified format."""
-        self._ensure_loaded()
-        if format == "json":
-            return json.dumps(self.data, indent=2)
-        elif format == "markdown":
-            return self._export_markdown()
-        else:
-            raise ValueError(f"Unknown format: {format}")
+    # === Operation Streams ===
 
-    def _export_markdown(self) -> str:
-        """Export as markdown overview."""
-        self._ensure_loaded()
-        lines = ["# Peachflow Project Overview\n"]
+    def apply_operation(self, op: dict, bindings: dict) -> dict:
+        """
+        Execute one operation from an `apply` stream.
 
-        for quarter in ["Q1", "Q2", "Q3", "Q4"]:
-            q_data = self.data["entities"]["quarters"].get(quarter, {})
-            epic_ids = self.data["relationships"]["quarter_epics"].get(quarter, [])
-            if not epic_ids:
-                continue
+        Operations are flat objects keyed like the CLI flags, e.g.
+        {"op": "create", "type": "task", "as": "$t1", "story": "$s1",
+        "title": "...", "tag": "BE"}. String values of the form "$name" are
+        replaced by IDs bound earlier in the stream with "as".
+        """
+        def resolve(value):
+            if isinstance(value, list):
+                return [resolve(v) for v in value]
+            if isinstance(value, str) and value.startswith("$"):
+                if value[1:] not in bindings:
+                    raise ValueError(f"Unbound placeholder: {value}")
+                return bindings[value[1:]]
+            return value
+
+        if not isinstance(op, dict):
+            raise ValueError("Operation must be a JSON object")
+        args = {k: resolve(v) for k, v in op.items() if k not in ("op", "type", "as", "action")}
+        kind = op.get("op")
+
+        if kind == "create":
+            entity_type = op.get("type")
+            if entity_type == "epic":
+                result = self.create_epic(args["title"], args["quarter"], args.get("priority", 5),
+                                          args.get("description", ""), args.get("deliverables"))
+            elif entity_type == "story":
+                result = self.create_story(args["epic"], args["title"], args.get("description", ""),
+                                           args.get("acceptance"))
+            elif entity_type == "task":
+                result = self.create_task(args["story"], args["title"], args["tag"],
+                                          args.get("description", ""), args.get("dependsOn"),
+                                          args.get("estimate"))
+            elif entity_type == "clarification":
+                result = self.create_clarification(args["entity"], args["question"],
+                                                   args.get("entityType", "general"))
+            elif entity_type == "adr":
+                result = self.create_adr(args["title"], args.get("context", ""), args.get("decision", ""),
+                                         args.get("consequences", ""), args.get("entity"))
+            elif entity_type == "sprint":
+                result = self.create_sprint(args["quarter"], args.get("tasks"), args.get("name", ""))
+            else:
+                raise ValueError(f"Unknown entity type: {entity_type}")
+            if op.get("as"):
+                bindings[op["as"].lstrip("$")] = result["id"]
+
+        elif kind == "update":
+            entity_id = args.pop("id")
+            cascade = args.pop("cascade", True)
+            unknown = sorted(set(args) - set(UPDATE_FIELDS))
+            if unknown:
+                raise ValueError(f"Cannot update {', '.join(unknown)}. Updatable fields: {list(UPDATE_FIELDS)}")
+            updates = {UPDATE_FIELDS[key]: value for key, value in args.items()}
+            result = self.update(op.get("type"), entity_id, cascade=cascade, **updates)
+
+        elif kind == "depends":
+            action = op.get("action", "add")
+            if action == "add":
+                result = self.add_dependency(args["task"], args["on"])
+            elif action == "remove":
+                result = self.remove_dependency(args["task"], args["on"])
+            else:
+                raise ValueError(f"Unknown depends action: {action}")
+
+        elif kind == "acceptance":
+            result = self.update_acceptance_criterion(args["story"], args["index"], args.get("done", True))
+
+        else:
+            raise ValueError(f"Unknown operation: {kind}")
+
+        return result
+
+    # === Export ===
+
+    def export(self, format: str = "json", **subgraph) -> str:
+        """Export graph in specified format."""
+        return "".join(self.iter_export(format, **subgraph))
+
+    def iter_export(self, format: str = "json", table: str = None, quarter: str = None,
+                    epic: str = None, sprint: str = None):
+        """
+        Yield the export in pieces, so it can be written as it is produced.
+
+        csv yields one table (tasks unless `table` is given), graphml and dot
+        the whole graph. Those formats can be limited to one quarter, epic
+        or sprint; json and markdown always cover the whole graph.
+        """
+        self._ensure_loaded()
+        if format in ("json", "markdown") and (quarter or epic or sprint):
+            raise ValueError("--quarter, --epic and --sprint apply to csv, parquet, graphml and dot exports")
+        if format == "json":
+            yield from json.JSONEncoder(indent=2).iterencode(self.data)
+            yield "\n"
+        elif format == "markdown":
+            yield from self._export_markdown()
+            yield "\n"
+        elif format == "parquet":
+            raise ValueError("parquet exports are written as files: pass --out DIR")
+        elif format in ("csv", "graphml", "dot"):
+            selection = self._export_selection(quarter, epic, sprint)
+            if format == "csv":
+                yield from self._export_csv(table or "tasks", selection)
+            elif format == "graphml":
+                yield from self._export_graphml(selection)
+            else:
+                yield from self._export_dot(selection)
+        else:
+            raise ValueError(f"Unknown format: {format}")
+
+    def export_tables(self, format: str, directory: str, tables: list = None, quarter: str = None,
+                      epic: str = None, sprint: str = None) -> dict:
+        """Write each table of the (selected) graph to <directory>/<table>.<format>."""
+        if format not in TABLE_EXPORT_FORMATS:
+            raise ValueError(f"Not a table format: {format}")
+        if not directory:
+            raise ValueError(f"{format} tables are written as files: pass --out DIR")
+        if format == "parquet" and _import_pyarrow() is None:
+            raise ValueError("parquet export needs pyarrow (pip install pyarrow); use --format csv without it")
+        self._ensure_loaded()
+        selection = self._export_selection(quarter, epic, sprint)
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        written = []
+        for table in tables or EXPORT_TABLES:
+            path = directory / f"{table}.{format}"
+            if format == "csv":
+                write_export(path, self._export_csv(table, selection))
+            else:
+                write_parquet(path, EXPORT_TABLES[table], self._export_rows(table, selection))
+            written.append(str(path))
+        return {"format": format, "path": str(directory), "tables": written}
+
+    def _export_selection(self, quarter: str = None, epic: str = None, sprint: str = None) -> dict:
+        """Quarter, epic, story and task IDs in the exported subgraph, parents first."""
+        self._ensure_in_memory()
+        relationships = self.data["relationships"]
+        if not (quarter or epic or sprint):
+            return {collection: list(self._order[collection])
+                    for collection in ("quarters", "epics", "stories", "tasks")}
+
+        selection = {"quarters": [], "epics": [], "stories": [], "tasks": []}
+        if sprint:
+            tasks = self.data["entities"]["tasks"]
+            selection["tasks"] = [task_id for task_id in self.get("sprint", sprint).get("taskIds", [])
+                                  if task_id in tasks]
+            # Parents of the sprint's tasks, each once, in first-seen order
+            for collection, children in (("stories", "tasks"), ("epics", "stories"), ("quarters", "epics")):
+                parents = (self._parent.get(child_id) for child_id in selection[children])
+                selection[collection] = [parent_id for parent_id in dict.fromkeys(parents) if parent_id]
+            return selection
+
+        if epic:
+            selection["epics"] = [self.get("epic", epic)["id"]]
+            selection["quarters"] = [quarter_id for quarter_id in [self._parent.get(epic)] if quarter_id]
+        else:
+            selection["quarters"] = [quarter]
+            selection["epics"] = list(relationships["quarter_epics"].get(quarter, []))
+        for epic_id in selection["epics"]:
+            for story_id in relationships["epic_stories"].get(epic_id, []):
+                selection["stories"].append(story_id)
+                selection["tasks"].extend(relationships["story_tasks"].get(story_id, []))
+        return selection
+
+    def _export_rows(self, table: str, selection: dict):
+        """Yield one table of the selected subgraph as tuples in EXPORT_TABLES column order."""
+        if table == "edges":
+            yield from self._export_edges(selection)
+            return
+        columns = [name for name, _ in EXPORT_TABLES[table]]
+        entities = self.data["entities"][table]
+        for entity_id in selection[table]:
+            entity = entities.get(entity_id)
+            if entity is None:
+                continue
+            if table == "tasks":
+                epic_id = self._parent.get(entity.get("storyId"))
+                entity = {**entity, "epicId": epic_id, "quarter": self._parent.get(epic_id)}
+            yield tuple(entity.get(column) for column in columns)
+
+    def _export_edges(self, selection: dict):
+        """Yield (source, target, type) for hierarchy and dependency edges inside the selection."""
+        relationships = self.data["relationships"]
+        selected = {entity_id for ids in selection.values() for entity_id in ids}
+        for collection, name in (("quarters", "quarter_epics"), ("epics", "epic_stories"), ("stories", "story_tasks")):
+            for parent_id in selection[collection]:
+                for child_id in relationships[name].get(parent_id, []):
+                    if child_id in selected:
+                        yield (parent_id, child_id, "contains")
+        for task_id in selection["tasks"]:
+            for dep_id in relationships["task_dependencies"].get(task_id, []):
+                if dep_id in selected:
+                    yield (task_id, dep_id, "depends_on")
+
+    def _export_nodes(self, selection: dict):
+        """Yield (type, id, label, entity) for each selected quarter, epic, story and task."""
+        entities = self.data["entities"]
+        for entity_type in ("quarter", "epic", "story", "task"):
+            collection = ENTITY_COLLECTIONS[entity_type]
+            for entity_id in selection[collection]:
+                entity = entities[collection].get(entity_id)
+                if entity is not None:
+                    label = entity.get("theme") if entity_type == "quarter" else entity.get("title")
+                    yield entity_type, entity_id, label or "", entity
+
+    def _export_csv(self, table: str, selection: dict):
+        """Yield a CSV table with a header row, EXPORT_BATCH_ROWS rows per piece."""
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"Unknown table: {table}. Must be one of {list(EXPORT_TABLES)}")
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow([name for name, _ in EXPORT_TABLES[table]])
+        rows = self._export_rows(table, selection)
+        while True:
+            batch = list(islice(rows, EXPORT_BATCH_ROWS))
+            writer.writerows(batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            if len(batch) < EXPORT_BATCH_ROWS:
+                return
+
+    def _export_graphml(self, selection: dict):
+        """Yield a GraphML document: one node per entity, one edge per relationship."""
+        # Imported here: xml.sax pulls in urllib and http.client, too slow for every CLI start
+        from xml.sax.saxutils import escape as xml_escape, quoteattr as xml_quoteattr
+        yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+               '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        for key in ("type", "label", "status", "tag", "sprint"):
+            yield f'  <key id="{key}" for="node" attr.name="{key}" attr.type="string"/>\n'
+        yield '  <key id="estimate" for="node" attr.name="estimate" attr.type="double"/>\n'
+        yield '  <key id="edge_type" for="edge" attr.name="type" attr.type="string"/>\n'
+        yield '  <graph id="peachflow" edgedefault="directed">\n'
+        for entity_type, entity_id, label, entity in self._export_nodes(selection):
+            values = {"type": entity_type, "label": label, "status": entity.get("status"),
+                      "tag": entity.get("tag"), "sprint": entity.get("sprintId"), "estimate": entity.get("estimate")}
+            data = "".join(f'<data key="{key}">{xml_escape(str(value))}</data>'
+                           for key, value in values.items() if value not in (None, ""))
+            yield f"    <node id={xml_quoteattr(entity_id)}>{data}</node>\n"
+        for source, target, edge_type in self._export_edges(selection):
+            yield (f"    <edge source={xml_quoteattr(source)} target={xml_quoteattr(target)}>"
+                   f'<data key="edge_type">{edge_type}</data></edge>\n')
+        yield "  </graph>\n</graphml>\n"
+
+    def _export_dot(self, selection: dict):
+        """Yield a Graphviz digraph; dependencies are dashed, like the visualization."""
+        yield "digraph peachflow {\n  rankdir=LR;\n  node [shape=box];\n"
+        for entity_type, entity_id, label, entity in self._export_nodes(selection):
+            text = f"{entity_id}\n{label}" if label else entity_id
+            yield (f"  {dot_quote(entity_id)} [label={dot_quote(text)}, type={dot_quote(entity_type)}, "
+                   f"status={dot_quote(entity.get('status') or '')}];\n")
+        for source, target, edge_type in self._export_edges(selection):
+            style = " [style=dashed]" if edge_type == "depends_on" else ""
+            yield f"  {dot_quote(source)} -> {dot_quote(target)}{style};\n"
+        yield "}\n"
+
+    def _export_markdown(self):
+        """
+        Export as markdown overview, one piece per quarter heading and epic.
+
+        Rendered epic sections are cached on disk under the graph revision
+        they were rendered at. The changelog since that revision names the
+        epics whose epic, story or task entries changed; only those are
+        rendered again.
+        """
+        self._ensure_loaded()
+        cache = self.cache("markdown")
+        key = f"{self.path.name}:by-revision"
+        stamp = self._revision_stamp()
+        cached = cache.get(key) if stamp else None
+        stale = self._epics_changed_since(cached["stamp"]) if cached else None
+        reuse = {} if stale is None else {epic_id: fragment for epic_id, fragment in cached["fragments"].items()
+                                          if epic_id not in stale}
+        fragments = {}
+        yield "# Peachflow Project Overview\n"
+
+        for quarter in ["Q1", "Q2", "Q3", "Q4"]:
+            q_data = self.data["entities"]["quarters"].get(quarter, {})
+            epic_ids = self.data["relationships"]["quarter_epics"].get(quarter, [])
+            if not epic_ids:
+                continue
 
-            lines.append(f"\n## {quarter}: {q_data.get('theme', 'Untitled')}\n")
+            yield f"\n\n## {quarter}: {q_data.get('theme', 'Untitled')}\n"
 
             for epic_id in epic_ids:
-                epic = self.data["entities"]["epics"].get(epic_id, {})
-                lines.append(f"\n### {epic_id}: {epic.get('title', 'Untitled')}")
-                lines.append(f"Status: {epic.get('status', 'unknown')} | Priority: {epic.get('priority', '-')}\n")
+                fragment = reuse.get(epic_id)
+                if fragment is None:
+                    fragment = self._render_epic_markdown(epic_id)
+                fragments[epic_id] = fragment
+                yield "\n" + fragment
+
+        if stamp and (not cached or cached["stamp"] != stamp or fragments.keys() != cached["fragments"].keys()):
+            cache.put(key, {"stamp": stamp, "fragments": fragments})
+
+    def _revision_stamp(self) -> Optional[list]:
+        """[revision, its changelog time] of the saved graph; None with unsaved changes."""
+        if self._dirty or self._txn_depth or self._changes:
+            return None
+        revision = self.data.get("revision", 0)
+        return [revision, self.data.get("changelog", {}).get(str(revision), {}).get("at")]
 
-                story_ids = self.data["relationships"]["epic_stories"].get(epic_id, [])
-                for story_id in story_ids:
-                    story = self.data["entities"]["stories"].get(story_id, {})
-                    lines.append(f"\n#### {story_id}: {story.get('title', 'Untitled')}")
+    def _epics_changed_since(self, stamp: list) -> Optional[set]:
+        """
+        Epics whose markdown section may differ from revision stamp[0].
 
-                    task_ids = self.data["relationships"]["story_tasks"].get(story_id, [])
-                    for task_id in task_ids:
-                        task = self.data["entities"]["tasks"].get(task_id, {})
-                        status_icon = "✅" if task.get("status") == "completed" else "⬜"
-                        lines.append(f"- {status_icon} [{task.get('tag', '?')}] {task_id}: {task.get('title', 'Untitled')}")
+        None when that can't be told from the changelog: the revision aged
+        out or belongs to a different history, or a deleted story or task
+        no longer says which epic it was in.
+        """
+        since, at = stamp
+        revision = self.data.get("revision", 0)
+        changelog = self.data.get("changelog", {})
+        if since > revision or changelog.get(str(since), {}).get("at") != at:
+            return None
+        epics = set()
+        for number in range(since + 1, revision + 1):
+            for op in CHANGE_OPS:
+                for collection, entity_ids in changelog[str(number)].get(op, {}).items():
+                    for entity_id in entity_ids:
+                        if collection == "epics":
+                            epics.add(entity_id)
+                        elif collection in ("stories", "tasks"):
+                            epic_id = self._parent.get(entity_id)
+                            if collection == "tasks":
+                                epic_id = self._parent.get(epic_id)
+                            if epic_id is None:
+                                return None
+                            epics.add(epic_id)
+        return epics
+
+    def _render_epic_markdown(self, epic_id: str) -> str:
+        """Markdown section for one epic, its stories and their tasks."""
+        epic = self.data["entities"]["epics"].get(epic_id, {})
+        lines = [f"\n### {epic_id}: {epic.get('title', 'Untitled')}"]
+        lines.append(f"Status: {epic.get('status', 'unknown')} | Priority: {epic.get('priority', '-')}\n")
+
+        story_ids = self.data["relationships"]["epic_stories"].get(epic_id, [])
+        for story_id in story_ids:
+            story = self.data["entities"]["stories"].get(story_id, {})
+            lines.append(f"\n#### {story_id}: {story.get('title', 'Untitled')}")
+
+            task_ids = self.data["relationships"]["story_tasks"].get(story_id, [])
+            for task_id in task_ids:
+                task = self.data["entities"]["tasks"].get(task_id, {})
+                status_icon = "✅" if task.get("status") == "completed" else "⬜"
+                lines.append(f"- {status_icon} [{task.get('tag', '?')}] {task_id}: {task.get('title', 'Untitled')}")
 
         return "\n".join(lines)
 
 
-# === Visualization Server ===
+# === Forecast Simulation ===
 
-def create_visualization_html(graph: PeachflowGraph) -> str:
-    """Create HTML visualization of the graph."""
-    data = graph.data
+def _parse_time(value: str) -> datetime:
+    """Parse the ISO timestamps written by _now()."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
 
-    # Build nodes and edges for visualization
-    nodes = []
-    edges = []
 
-    # Add quarters
-    for q_id, quarter in data["entities"]["quarters"].items():
-        nodes.append({
-            "id": q_id,
-            "label": q_id,
-            "type": "quarter",
-            "status": quarter.get("status", "planned"),
-            "theme": quarter.get("theme", ""),
-        })
+def _import_numpy():
+    """NumPy if installed; forecasts fall back to pure Python without it."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _simulate_numpy(np, pools: list, parents: list, targets: list, simulations: int,
+                    workers: int, seed: Optional[int]) -> list:
+    """Vectorized runs: one array row per task, one column per simulation."""
+    rng = np.random.default_rng(seed)
+    # Tasks sharing a history pool are sampled together
+    groups = {}
+    for i, pool in enumerate(pools):
+        groups.setdefault(id(pool), (np.asarray(pool, dtype=np.float64), []))[1].append(i)
+    days = []
+    for start in range(0, simulations, FORECAST_CHUNK):
+        width = min(FORECAST_CHUNK, simulations - start)
+        duration = np.empty((len(pools), width))
+        for samples, rows in groups.values():
+            duration[rows] = samples[rng.integers(0, len(samples), size=(len(rows), width))]
+        finish = np.empty_like(duration)
+        for i, deps in enumerate(parents):
+            if len(deps) == 1:
+                np.add(finish[deps[0]], duration[i], out=finish[i])
+            elif deps:
+                np.add(finish[deps].max(axis=0), duration[i], out=finish[i])
+            else:
+                finish[i] = duration[i]
+        makespan = np.maximum(finish[targets].max(axis=0), duration.sum(axis=0) / workers)
+        days.extend(makespan.tolist())
+    return days
+
+
+def _simulate_python(pools: list, parents: list, targets: list, simulations: int,
+                     workers: int, seed: Optional[int]) -> list:
+    """Same model as _simulate_numpy, one simulation at a time."""
+    rng = random.Random(seed)
+    days = []
+    for _ in range(simulations):
+        finish, total = [], 0.0
+        for pool, deps in zip(pools, parents):
+            duration = rng.choice(pool)
+            total += duration
+            finish.append(max((finish[d] for d in deps), default=0.0) + duration)
+        days.append(max(max(finish[t] for t in targets), total / workers))
+    return days
+
+
+# === Filter Expressions ===
+
+# --where fields answered from the indexes, and the index field they map to
+WHERE_INDEX_FIELDS = {
+    "status": "status", "tag": "tag",
+    "sprint": "sprint", "sprintId": "sprint",
+    "story": "story", "storyId": "story",
+    "epic": "epic", "epicId": "epic",
+    "quarter": "quarter", "quarterId": "quarter",
+    "entity": "entity", "entityId": "entity",
+}
 
-    # Add epics
-    for epic_id, epic in data["entities"]["epics"].items():
-        nodes.append({
-            "id": epic_id,
-            "label": f"{epic_id}\\n{epic.get('title', '')[:30]}",
-            "type": "epic",
+WHERE_TOKEN = re.compile(r"""\s*(?:(?P<op><=|>=|!=|==|=|<|>|~|\(|\)|,)|"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<word>[^\s=<>!~(),'"]+))""")
+
+
+def _tokenize_where(text: str) -> list:
+    tokens, pos = [], 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = WHERE_TOKEN.match(text, pos)
+        if not match:
+            raise ValueError(f"Invalid --where expression near: {text[pos:]!r}")
+        pos = match.end()
+        if match.group("op"):
+            tokens.append(("op", match.group("op")))
+        elif match.group("word") is not None:
+            tokens.append(("word", match.group("word")))
+        else:
+            tokens.append(("str", match.group("dq") if match.group("dq") is not None else match.group("sq")))
+    return tokens
+
+
+def parse_where(text: str) -> tuple:
+    """
+    Parse a --where expression into a tree.
+
+    Grammar: comparisons 'field OP value' with OP one of = != < <= > >= ~
+    (substring, case-insensitive), 'field [not] in (v1, v2)', combined with
+    and/or/not and parentheses. Values may be quoted; null matches missing.
+
+    Nodes: ("and", [nodes]), ("or", [nodes]), ("not", node),
+    ("cmp", field, op, value), ("in", field, values, negated).
+    """
+    tokens = _tokenize_where(text)
+    pos = 0
+
+    def peek_word(*words):
+        return pos < len(tokens) and tokens[pos][0] == "word" and tokens[pos][1].lower() in words
+
+    def expect(kind, value=None):
+        nonlocal pos
+        if pos >= len(tokens) or tokens[pos][0] != kind or (value and tokens[pos][1] != value):
+            found = tokens[pos][1] if pos < len(tokens) else "end of expression"
+            expected = value or {"op": "an operator", "word": "a field or value"}[kind]
+            raise ValueError(f"Invalid --where expression: expected {expected}, found {found!r}")
+        pos += 1
+        return tokens[pos - 1][1]
+
+    def literal():
+        nonlocal pos
+        if pos >= len(tokens) or tokens[pos][0] == "op":
+            expect("word")
+        kind, value = tokens[pos]
+        pos += 1
+        if kind == "word" and value.lower() in ("null", "none"):
+            return None
+        return value
+
+    def boolean(op, parse_operand):
+        nonlocal pos
+        nodes = [parse_operand()]
+        while peek_word(op):
+            pos += 1
+            nodes.append(parse_operand())
+        return nodes[0] if len(nodes) == 1 else (op, nodes)
+
+    def disjunction():
+        return boolean("or", conjunction)
+
+    def conjunction():
+        return boolean("and", negation)
+
+    def negation():
+        nonlocal pos
+        if peek_word("not"):
+            pos += 1
+            return ("not", negation())
+        if pos < len(tokens) and tokens[pos] == ("op", "("):
+            pos += 1
+            node = disjunction()
+            expect("op", ")")
+            return node
+        return comparison()
+
+    def comparison():
+        nonlocal pos
+        field = expect("word")
+        negated = peek_word("not")
+        if negated:
+            pos += 1
+        if peek_word("in"):
+            pos += 1
+            expect("op", "(")
+            values = [literal()]
+            while pos < len(tokens) and tokens[pos] == ("op", ","):
+                pos += 1
+                values.append(literal())
+            expect("op", ")")
+            return ("in", field, values, negated)
+        if negated:
+            expect("word", "in")
+        op = expect("op")
+        if op not in ("=", "==", "!=", "<", "<=", ">", ">=", "~"):
+            raise ValueError(f"Invalid --where operator: {op}")
+        return ("cmp", field, "=" if op == "==" else op, literal())
+
+    tree = disjunction()
+    if pos != len(tokens):
+        raise ValueError(f"Invalid --where expression: unexpected {tokens[pos][1]!r}")
+    return tree
+
+
+def _coerce(actual: Any, literal: Optional[str]) -> Any:
+    """Convert a literal to the type of the value it is compared with."""
+    if literal is None or actual is None:
+        return literal
+    if isinstance(actual, bool):
+        return literal.lower() in ("true", "1", "yes")
+    if isinstance(actual, (int, float)):
+        try:
+            return float(literal)
+        except ValueError:
+            return literal
+    return literal
+
+
+def _compare(actual: Any, op: str, literal: Optional[str]) -> bool:
+    if isinstance(actual, list):
+        contained = any(str(item) == literal for item in actual)
+        return contained if op in ("=", "~") else not contained if op == "!=" else False
+    if op == "~":
+        return actual is not None and literal is not None and literal.lower() in str(actual).lower()
+    value = _coerce(actual, literal)
+    if op == "=":
+        return actual == value
+    if op == "!=":
+        return actual != value
+    if actual is None or value is None:
+        return False
+    try:
+        if op == "<":
+            return actual < value
+        if op == "<=":
+            return actual <= value
+        if op == ">":
+            return actual > value
+        return actual >= value
+    except TypeError:
+        return str(actual) < str(value) if op == "<" else str(actual) <= str(value) if op == "<=" \
+            else str(actual) > str(value) if op == ">" else str(actual) >= str(value)
+
+
+def compile_where(tree: tuple, lookup) -> Any:
+    """Compile a parsed --where tree into a predicate over entities.
+
+    lookup(entity, field) resolves a field name to a value.
+    """
+    kind = tree[0]
+    if kind in ("and", "or"):
+        parts = [compile_where(node, lookup) for node in tree[1]]
+        if kind == "and":
+            return lambda entity: all(part(entity) for part in parts)
+        return lambda entity: any(part(entity) for part in parts)
+    if kind == "not":
+        inner = compile_where(tree[1], lookup)
+        return lambda entity: not inner(entity)
+    if kind == "in":
+        _, field, values, negated = tree
+        return lambda entity: any(_compare(lookup(entity, field), "=", value) for value in values) != negated
+    _, field, op, value = tree
+    return lambda entity: _compare(lookup(entity, field), op, value)
+
+
+def parse_order_by(text: str) -> list:
+    """Parse 'priority,-updatedAt' or 'title desc' into (field, descending) pairs."""
+    keys = []
+    for part in text.split(","):
+        words = part.split()
+        if not words or len(words) > 2 or (len(words) == 2 and words[1].lower() not in ("asc", "desc")):
+            raise ValueError(f"Invalid --order-by: {part.strip()!r}")
+        field = words[0]
+        descending = field.startswith("-") or (len(words) == 2 and words[1].lower() == "desc")
+        keys.append((field.lstrip("-"), descending))
+    return keys
+
+
+def _sort_key(value: Any) -> tuple:
+    """Sort numbers numerically, IDs naturally, and never compare across types."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value)
+    if isinstance(value, str):
+        return (1, natural_id_key(value))
+    return (2, str(value))
+
+
+# === Visualization Server ===
+
+def entity_type_of(entity_id: str) -> Optional[str]:
+    """Entity type for an ID, from its prefix (T-001 -> task)."""
+    for entity_type, prefix in sorted(ID_PATTERNS.items(), key=lambda item: -len(item[1])):
+        if entity_id.startswith(prefix) and entity_id[len(prefix):].isdigit():
+            return entity_type
+    return None
+
+
+def _view_node(entity_type: str, entity: dict) -> dict:
+    """Visualization node for one quarter, epic, story or task."""
+    entity_id = entity["id"]
+    if entity_type == "quarter":
+        return {"id": entity_id, "label": entity_id, "type": "quarter",
+                "status": entity.get("status", "planned"), "theme": entity.get("theme", "")}
+    if entity_type == "epic":
+        return {"id": entity_id, "label": f"{entity_id}\n{entity.get('title', '')[:30]}", "type": "epic",
+                "status": entity.get("status", "draft"), "priority": entity.get("priority", 5)}
+    if entity_type == "story":
+        return {"id": entity_id, "label": f"{entity_id}\n{entity.get('title', '')[:25]}", "type": "story",
+                "status": entity.get("status", "draft")}
+    return {"id": entity_id, "label": f"[{entity.get('tag', '?')}] {entity_id}", "type": "task",
+            "status": entity.get("status", "pending"), "tag": entity.get("tag", ""),
+            "title": entity.get("title", ""), "storyId": entity.get("storyId")}
+
+
+def _view_edges(entity_type: str, entity: dict, relationships: dict) -> list:
+    """Edges pointing at an entity: from its parent, and from tasks it depends on."""
+    parent = {"epic": "quarter", "story": "epicId", "task": "storyId"}.get(entity_type)
+    edges = [{"from": entity.get(parent), "to": entity["id"]}] if parent else []
+    if entity_type == "task":
+        edges.extend({"from": dep_id, "to": entity["id"], "type": "dependency"}
+                     for dep_id in relationships["task_dependencies"].get(entity["id"], []))
+    return edges
+
+
+def _epic_summaries(data: dict) -> list:
+    """Sidebar rows: epics by priority with story and task counts."""
+    entities = data["entities"]
+    relationships = data["relationships"]
+    epics = []
+    for epic in sorted(entities["epics"].values(), key=lambda e: (e.get("priority", 99), natural_id_key(e["id"]))):
+        story_ids = relationships["epic_stories"].get(epic["id"], [])
+        task_ids = [tid for sid in story_ids for tid in relationships["story_tasks"].get(sid, [])]
+        epics.append({
+            "id": epic["id"],
+            "title": epic.get("title", ""),
             "status": epic.get("status", "draft"),
             "priority": epic.get("priority", 5),
+            "stories": len(story_ids),
+            "tasks": len(task_ids),
+            "done": sum(1 for tid in task_ids if entities["tasks"].get(tid, {}).get("status") == "completed"),
         })
-        edges.append({"from": epic.get("quarter"), "to": epic_id})
+    return epics
 
-    # Add stories
-    for story_id, story in data["entities"]["stories"].items():
-        nodes.append({
-            "id": story_id,
-            "label": f"{story_id}\\n{story.get('title', '')[:25]}",
-            "type": "story",
-            "status": story.get("status", "draft"),
-        })
-        edges.append({"from": story.get("epicId"), "to": story_id})
 
-    # Add tasks
-    for task_id, task in data["entities"]["tasks"].items():
-        nodes.append({
-            "id": task_id,
-            "label": f"[{task.get('tag', '?')}] {task_id}",
-            "type": "task",
-            "status": task.get("status", "pending"),
-            "tag": task.get("tag", ""),
-        })
-        edges.append({"from": task.get("storyId"), "to": task_id})
+# Collections drawn in the visualization, parents first
+VIEW_COLLECTIONS = [("quarter", "quarters"), ("epic", "epics"), ("story", "stories"), ("task", "tasks")]
+
+
+def _complete_layout(data: dict, layout: dict) -> dict:
+    """The layout, or a fresh one if it misses any entity (e.g. cached for older data)."""
+    positions = layout["positions"]
+    for _, collection in VIEW_COLLECTIONS:
+        if not positions.keys() >= data["entities"][collection].keys():
+            return graph_layout(data)
+    return layout
+
 
-        # Add dependency edges
-        deps = data["relationships"]["task_dependencies"].get(task_id, [])
+def graph_view(graph: PeachflowGraph, layout: dict) -> dict:
+    """Nodes (placed by graph_layout), edges and sidebar summaries for the visualization."""
+    data = graph.data
+    positions = _complete_layout(data, layout)["positions"]
+    nodes = []
+    edges = []
+    for entity_type, collection in VIEW_COLLECTIONS:
+        for entity in data["entities"][collection].values():
+            node = _view_node(entity_type, entity)
+            node["x"], node["y"] = positions[entity["id"]]
+            nodes.append(node)
+            edges.extend(_view_edges(entity_type, entity, data["relationships"]))
+    return {"nodes": nodes, "edges": edges, "epics": _epic_summaries(data)}
+
+
+def graph_view_diff(old: dict, new: dict, layout: dict) -> dict:
+    """
+    Entity-level difference between two graph documents, as view updates.
+
+    Nodes whose entity (or, for tasks, dependency list) changed are sent
+    whole, placed by the new layout, along with every edge pointing at
+    them; the client replaces a node's incoming edges with the ones given.
+    """
+    layout = _complete_layout(new, layout)
+    changed, edges, removed = [], [], []
+    added = False
+    old_deps = old["relationships"]["task_dependencies"]
+    new_deps = new["relationships"]["task_dependencies"]
+    for entity_type, collection in VIEW_COLLECTIONS:
+        before = old["entities"][collection]
+        after = new["entities"][collection]
+        for entity_id, entity in after.items():
+            if before.get(entity_id) != entity or (
+                    entity_type == "task" and old_deps.get(entity_id) != new_deps.get(entity_id)):
+                node = _view_node(entity_type, entity)
+                node["x"], node["y"] = layout["positions"][entity_id]
+                changed.append(node)
+                added |= entity_id not in before
+                edges.extend(_view_edges(entity_type, entity, new["relationships"]))
+        removed.extend(entity_id for entity_id in before if entity_id not in after)
+    # Adding or removing nodes moves others in the layout; clients refetch
+    return {"nodes": changed, "edges": edges, "removed": removed, "structural": bool(added or removed),
+            "epics": _epic_summaries(new)}
+
+
+def _view_children(data: dict, entity_type: str, entity_id: str) -> list:
+    """(type, id) children of a quarter, epic or story, in drawing order."""
+    entities = data["entities"]
+    relationships = data["relationships"]
+    if entity_type == "quarter":
+        epics = [eid for eid in relationships["quarter_epics"].get(entity_id, []) if eid in entities["epics"]]
+        epics.sort(key=lambda eid: (entities["epics"][eid].get("priority", 99), natural_id_key(eid)))
+        return [("epic", eid) for eid in epics]
+    if entity_type == "epic":
+        return [("story", sid) for sid in relationships["epic_stories"].get(entity_id, [])
+                if sid in entities["stories"]]
+    if entity_type == "story":
+        return [("task", tid) for tid in relationships["story_tasks"].get(entity_id, [])
+                if tid in entities["tasks"]]
+    return []
+
+
+def _view_roots(data: dict) -> list:
+    """Quarters, then any epic, story or task no existing parent lists as a child."""
+    entities = data["entities"]
+    relationships = data["relationships"]
+    roots = [("quarter", qid) for qid in sorted(entities["quarters"], key=natural_id_key)]
+    parents = {"epic": ("quarter_epics", "quarters"), "story": ("epic_stories", "epics"),
+               "task": ("story_tasks", "stories")}
+    for entity_type, collection in VIEW_COLLECTIONS[1:]:
+        relationship, parent_collection = parents[entity_type]
+        listed = {child_id for parent_id, child_ids in relationships[relationship].items()
+                  if parent_id in entities[parent_collection] for child_id in child_ids}
+        roots.extend((entity_type, entity_id) for entity_id in entities[collection] if entity_id not in listed)
+    return roots
+
+
+def graph_layout(data: dict) -> dict:
+    """
+    Left-to-right tree layout of quarters, epics, stories and tasks.
+
+    Each level is a column LAYOUT_LEVEL_SEPARATION apart. Leaves take the
+    next row in depth-first order and parents sit midway between their
+    first and last child, so a collapsed cluster lands where its subtree
+    would be. Also returns task status counts for every non-task node.
+    """
+    entities = data["entities"]
+    positions = {}
+    counts = {}
+    row = 0
+    stack = [(entity_type, entity_id, False) for entity_type, entity_id in reversed(_view_roots(data))]
+    while stack:
+        entity_type, entity_id, done = stack.pop()
+        children = _view_children(data, entity_type, entity_id)
+        if not done and children:
+            stack.append((entity_type, entity_id, True))
+            stack.extend((child_type, child_id, False) for child_type, child_id in reversed(children))
+            continue
+        x = LAYOUT_LEVELS[entity_type] * LAYOUT_LEVEL_SEPARATION
+        if children:
+            y = (positions[children[0][1]][1] + positions[children[-1][1]][1]) / 2
+            total = {}
+            for child_type, child_id in children:
+                if child_type == "task":
+                    status = entities["tasks"][child_id].get("status", "pending")
+                    total[status] = total.get(status, 0) + 1
+                else:
+                    for status, count in counts[child_id].items():
+                        total[status] = total.get(status, 0) + count
+            counts[entity_id] = total
+        else:
+            y = row * LAYOUT_NODE_SPACING
+            row += 1
+            if entity_type != "task":
+                counts[entity_id] = {}
+        positions[entity_id] = [x, y]
+    return {"positions": positions, "counts": counts}
+
+
+def cluster_view(graph: PeachflowGraph, layout: dict, expanded: set) -> dict:
+    """
+    Level-of-detail view: quarters, epics and stories not in `expanded`
+    are drawn as one cluster node carrying the task status counts of its
+    subtree. Dependency edges between tasks are folded onto the visible
+    nodes that contain them, with a count.
+    """
+    data = graph.data
+    layout = _complete_layout(data, layout)
+    positions = layout["positions"]
+    nodes, edges = [], []
+    visible = {}  # task ID -> ID of the visible node standing for it
+    stack = [(entity_type, entity_id, None) for entity_type, entity_id in reversed(_view_roots(data))]
+    while stack:
+        entity_type, entity_id, parent = stack.pop()
+        entity = data["entities"][ENTITY_COLLECTIONS[entity_type]][entity_id]
+        node = _view_node(entity_type, entity)
+        node["x"], node["y"] = positions[entity_id]
+        if parent:
+            edges.append({"from": parent, "to": entity_id})
+        children = _view_children(data, entity_type, entity_id)
+        if entity_type == "task":
+            visible[entity_id] = entity_id
+        elif entity_id in expanded or not children:
+            node["expanded"] = bool(children)
+            stack.extend((child_type, child_id, entity_id) for child_type, child_id in reversed(children))
+        else:
+            counts = layout["counts"][entity_id]
+            node["cluster"] = True
+            node["counts"] = counts
+            node["size"] = sum(counts.values())
+            node["label"] += f"\n{counts.get('completed', 0)}/{node['size']} done"
+            pending = list(children)
+            while pending:
+                child_type, child_id = pending.pop()
+                if child_type == "task":
+                    visible[child_id] = entity_id
+                else:
+                    pending.extend(_view_children(data, child_type, child_id))
+        nodes.append(node)
+
+    folded = {}
+    for task_id, deps in data["relationships"]["task_dependencies"].items():
         for dep_id in deps:
-            edges.append({"from": dep_id, "to": task_id, "type": "dependency"})
+            source, target = visible.get(dep_id), visible.get(task_id)
+            if source and target and source != target:
+                folded[(source, target)] = folded.get((source, target), 0) + 1
+    edges.extend({"from": source, "to": target, "type": "dependency", "count": count}
+                 for (source, target), count in folded.items())
+    return {"nodes": nodes, "edges": edges, "epics": _epic_summaries(data), "expanded": sorted(expanded)}
+
 
-    html = f"""<!DOCTYPE html>
+def create_visualization_html() -> str:
+    """HTML shell for the visualization; the data comes from the JSON API."""
+    return """<!DOCTYPE html>
 <html>
 <head>
     <title>Peachflow Graph Visualization</title>
     <script src="https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.6/vis-network.min.js"></script>
     <style>
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; background: #1a1a2e; color: #eee; }}
-        #header {{ padding: 16px 24px; background: #16213e; border-bottom: 1px solid #0f3460; display: flex; justify-content: space-between; align-items: center; }}
-        #header h1 {{ font-size: 20px; font-weight: 500; }}
-        #stats {{ display: flex; gap: 24px; }}
-        .stat {{ text-align: center; }}
-        .stat-value {{ font-size: 24px; font-weight: 600; color: #e94560; }}
-        .stat-label {{ font-size: 11px; color: #888; text-transform: uppercase; }}
-        #container {{ display: flex; height: calc(100vh - 60px); }}
-        #graph {{ flex: 1; background: #1a1a2e; }}
-        #sidebar {{ width: 320px; background: #16213e; border-left: 1px solid #0f3460; overflow-y: auto; }}
-        #sidebar h2 {{ padding: 16px; font-size: 14px; border-bottom: 1px solid #0f3460; }}
-        .entity-list {{ padding: 8px; }}
-        .entity-item {{ padding: 10px 12px; margin: 4px 0; background: #1a1a2e; border-radius: 6px; cursor: pointer; transition: all 0.2s; }}
-        .entity-item:hover {{ background: #0f3460; }}
-        .entity-id {{ font-weight: 600; color: #e94560; }}
-        .entity-title {{ font-size: 13px; color: #ccc; margin-top: 4px; }}
-        .entity-meta {{ font-size: 11px; color: #666; margin-top: 4px; }}
-        .status-badge {{ display: inline-block; padding: 2px 8px; border-radius: 10px; font-size: 10px; text-transform: uppercase; }}
-        .status-completed {{ background: #10b981; color: #fff; }}
-        .status-in_progress {{ background: #f59e0b; color: #000; }}
-        .status-pending, .status-draft, .status-planned {{ background: #6b7280; color: #fff; }}
-        .status-blocked {{ background: #ef4444; color: #fff; }}
-        .legend {{ padding: 16px; border-top: 1px solid #0f3460; }}
-        .legend-item {{ display: flex; align-items: center; gap: 8px; margin: 6px 0; font-size: 12px; }}
-        .legend-color {{ width: 16px; height: 16px; border-radius: 4px; }}
-        .tab-buttons {{ display: flex; border-bottom: 1px solid #0f3460; }}
-        .tab-btn {{ flex: 1; padding: 12px; background: none; border: none; color: #888; cursor: pointer; font-size: 12px; text-transform: uppercase; }}
-        .tab-btn.active {{ color: #e94560; border-bottom: 2px solid #e94560; }}
-        .tab-content {{ display: none; }}
-        .tab-content.active {{ display: block; }}
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; background: #1a1a2e; color: #eee; }
+        #header { padding: 16px 24px; background: #16213e; border-bottom: 1px solid #0f3460; display: flex; justify-content: space-between; align-items: center; }
+        #header h1 { font-size: 20px; font-weight: 500; }
+        #stats { display: flex; gap: 24px; }
+        .stat { text-align: center; }
+        .stat-value { font-size: 24px; font-weight: 600; color: #e94560; }
+        .stat-label { font-size: 11px; color: #888; text-transform: uppercase; }
+        #container { display: flex; height: calc(100vh - 60px); }
+        #graph { flex: 1; background: #1a1a2e; }
+        #sidebar { width: 320px; background: #16213e; border-left: 1px solid #0f3460; overflow-y: auto; }
+        #sidebar h2 { padding: 16px; font-size: 14px; border-bottom: 1px solid #0f3460; }
+        .entity-list { padding: 8px; }
+        .entity-item { padding: 10px 12px; margin: 4px 0; background: #1a1a2e; border-radius: 6px; cursor: pointer; transition: all 0.2s; }
+        .entity-item:hover { background: #0f3460; }
+        .entity-id { font-weight: 600; color: #e94560; }
+        .entity-title { font-size: 13px; color: #ccc; margin-top: 4px; }
+        .entity-meta { font-size: 11px; color: #666; margin-top: 4px; }
+        #details { padding: 12px 16px; font-size: 12px; white-space: pre-wrap; color: #ccc; border-top: 1px solid #0f3460; }
+        .status-badge { display: inline-block; padding: 2px 8px; border-radius: 10px; font-size: 10px; text-transform: uppercase; }
+        .status-completed { background: #10b981; color: #fff; }
+        .status-in_progress { background: #f59e0b; color: #000; }
+        .status-pending, .status-draft, .status-planned { background: #6b7280; color: #fff; }
+        .status-blocked { background: #ef4444; color: #fff; }
+        .legend { padding: 16px; border-top: 1px solid #0f3460; }
+        .legend-item { display: flex; align-items: center; gap: 8px; margin: 6px 0; font-size: 12px; }
+        .legend-color { width: 16px; height: 16px; border-radius: 4px; }
+        .tab-buttons { display: flex; border-bottom: 1px solid #0f3460; }
+        .tab-btn { flex: 1; padding: 12px; background: none; border: none; color: #888; cursor: pointer; font-size: 12px; text-transform: uppercase; }
+        .tab-btn.active { color: #e94560; border-bottom: 2px solid #e94560; }
+        .tab-content { display: none; }
+        .tab-content.active { display: block; }
     </style>
 </head>
 <body>
     <div id="header">
         <h1>Peachflow Project Graph</h1>
         <div id="stats">
-            <div class="stat">
-                <div class="stat-value">{len(data['entities']['epics'])}</div>
-                <div class="stat-label">Epics</div>
-            </div>
-            <div class="stat">
-                <div class="stat-value">{len(data['entities']['stories'])}</div>
-                <div class="stat-label">Stories</div>
-            </div>
-            <div class="stat">
-                <div class="stat-value">{len(data['entities']['tasks'])}</div>
-                <div class="stat-label">Tasks</div>
-            </div>
-            <div class="stat">
-                <div class="stat-value">{len([t for t in data['entities']['tasks'].values() if t.get('status') == 'completed'])}</div>
-                <div class="stat-label">Done</div>
-            </div>
+            <div class="stat"><div class="stat-value" id="stat-epics">-</div><div class="stat-label">Epics</div></div>
+            <div class="stat"><div class="stat-value" id="stat-stories">-</div><div class="stat-label">Stories</div></div>
+            <div class="stat"><div class="stat-value" id="stat-tasks">-</div><div class="stat-label">Tasks</div></div>
+            <div class="stat"><div class="stat-value" id="stat-done">-</div><div class="stat-label">Done</div></div>
         </div>
     </div>
     <div id="container">
@@ -1212,129 +3781,417 @@ def create_visualization_html(graph: PeachflowGraph) -> str:
                     <div class="legend-item"><span style="color: #ef4444">⟶</span> Dependency</div>
                 </div>
             </div>
+            <div id="details"></div>
         </div>
     </div>
     <script>
-        const graphData = {json.dumps({"nodes": nodes, "edges": edges})};
-        const rawData = {json.dumps(data)};
-
-        const colorMap = {{
+        const colorMap = {
             quarter: '#e94560',
             epic: '#0f3460',
             story: '#533483',
             task: '#6b7280'
-        }};
-        const tagColors = {{
+        };
+        const tagColors = {
             FE: '#3498db',
             BE: '#2ecc71',
             DevOps: '#e67e22',
             Full: '#9b59b6'
-        }};
-
-        const nodes = new vis.DataSet(graphData.nodes.map(n => ({{
-            id: n.id,
-            label: n.label,
-            color: {{
-                background: n.type === 'task' ? (tagColors[n.tag] || colorMap.task) : colorMap[n.type],
-                border: n.status === 'completed' ? '#10b981' : (n.status === 'blocked' ? '#ef4444' : '#444'),
-                highlight: {{ background: '#e94560', border: '#fff' }}
-            }},
-            shape: n.type === 'quarter' ? 'diamond' : (n.type === 'epic' ? 'box' : (n.type === 'story' ? 'ellipse' : 'box')),
-            font: {{ color: '#fff', size: n.type === 'quarter' ? 14 : 11 }},
-            borderWidth: n.status === 'completed' ? 3 : 1,
-            size: n.type === 'quarter' ? 30 : (n.type === 'epic' ? 25 : (n.type === 'story' ? 20 : 15))
-        }})));
-
-        const edges = new vis.DataSet(graphData.edges.map((e, i) => ({{
-            id: i,
-            from: e.from,
-            to: e.to,
-            arrows: 'to',
-            color: {{ color: e.type === 'dependency' ? '#ef4444' : '#444', opacity: 0.6 }},
-            dashes: e.type === 'dependency',
-            smooth: {{ type: 'cubicBezier' }}
-        }})));
-
-        const container = document.getElementById('graph');
-        const network = new vis.Network(container, {{ nodes, edges }}, {{
-            layout: {{
-                hierarchical: {{
-                    direction: 'LR',
-                    sortMethod: 'directed',
-                    levelSeparation: 200,
-                    nodeSpacing: 80
-                }}
-            }},
+        };
+
+        const nodes = new vis.DataSet();
+        const edges = new vis.DataSet();
+        // Positions come from the server's cached layout
+        const network = new vis.Network(document.getElementById('graph'), { nodes, edges }, {
+            layout: { hierarchical: false },
             physics: false,
-            interaction: {{ hover: true, zoomView: true }}
-        }});
-
-        // Populate sidebar
-        const epicList = document.getElementById('epic-list');
-        Object.values(rawData.entities.epics).sort((a,b) => a.priority - b.priority).forEach(epic => {{
-            const stories = rawData.relationships.epic_stories[epic.id] || [];
-            let taskCount = 0, doneCount = 0;
-            stories.forEach(sId => {{
-                const tasks = rawData.relationships.story_tasks[sId] || [];
-                taskCount += tasks.length;
-                tasks.forEach(tId => {{
-                    if (rawData.entities.tasks[tId]?.status === 'completed') doneCount++;
-                }});
-            }});
-            epicList.innerHTML += `
-                <div class="entity-item" onclick="network.focus('${{epic.id}}', {{scale: 1.5, animation: true}})">
-                    <span class="entity-id">${{epic.id}}</span>
-                    <span class="status-badge status-${{epic.status}}">${{epic.status}}</span>
-                    <div class="entity-title">${{epic.title}}</div>
-                    <div class="entity-meta">${{stories.length}} stories · ${{doneCount}}/${{taskCount}} tasks</div>
+            interaction: { hover: true, zoomView: true }
+        });
+
+        function toVisNode(n) {
+            return {
+                id: n.id,
+                label: n.label,
+                x: n.x,
+                y: n.y,
+                shapeProperties: { borderDashes: n.cluster ? [4, 4] : false },
+                color: {
+                    background: n.type === 'task' ? (tagColors[n.tag] || colorMap.task) : colorMap[n.type],
+                    border: n.status === 'completed' ? '#10b981' : (n.status === 'blocked' ? '#ef4444' : '#444'),
+                    highlight: { background: '#e94560', border: '#fff' }
+                },
+                shape: n.type === 'quarter' ? 'diamond' : (n.type === 'epic' ? 'box' : (n.type === 'story' ? 'ellipse' : 'box')),
+                font: { color: '#fff', size: n.type === 'quarter' ? 14 : 11 },
+                borderWidth: n.status === 'completed' ? 3 : 1,
+                size: n.type === 'quarter' ? 30 : (n.type === 'epic' ? 25 : (n.type === 'story' ? 20 : 15))
+            };
+        }
+
+        function toVisEdge(e) {
+            return {
+                id: `${e.from}->${e.to}`,
+                from: e.from,
+                to: e.to,
+                arrows: 'to',
+                color: { color: e.type === 'dependency' ? '#ef4444' : '#444', opacity: 0.6 },
+                dashes: e.type === 'dependency',
+                width: e.count ? Math.min(1 + Math.log2(e.count), 6) : 1,
+                title: e.count ? `${e.count} dependencies` : undefined,
+                smooth: { type: 'cubicBezier' }
+            };
+        }
+
+        // Update a DataSet in place so unchanged nodes keep their place
+        function sync(dataSet, items) {
+            const keep = new Set(items.map(item => item.id));
+            dataSet.remove(dataSet.getIds().filter(id => !keep.has(id)));
+            dataSet.update(items);
+        }
+
+        // Latest server node per ID; the task list is drawn from it
+        const viewNodes = new Map();
+
+        function renderGraph(view) {
+            sync(nodes, view.nodes.map(toVisNode));
+            sync(edges, view.edges.map(toVisEdge));
+            viewNodes.clear();
+            view.nodes.forEach(n => viewNodes.set(n.id, n));
+            renderSidebar(view.epics);
+        }
+
+        function renderSidebar(epics) {
+            document.getElementById('epic-list').innerHTML = epics.map(epic => `
+                <div class="entity-item" onclick="focusEntity('${epic.id}', 1.5)">
+                    <span class="entity-id">${epic.id}</span>
+                    <span class="status-badge status-${epic.status}">${epic.status}</span>
+                    <div class="entity-title">${epic.title}</div>
+                    <div class="entity-meta">${epic.stories} stories · ${epic.done}/${epic.tasks} tasks</div>
                 </div>
-            `;
-        }});
-
-        const taskList = document.getElementById('task-list');
-        Object.values(rawData.entities.tasks).filter(t => t.status !== 'completed').forEach(task => {{
-            taskList.innerHTML += `
-                <div class="entity-item" onclick="network.focus('${{task.id}}', {{scale: 2, animation: true}})">
-                    <span class="entity-id">[${{task.tag}}] ${{task.id}}</span>
-                    <span class="status-badge status-${{task.status}}">${{task.status}}</span>
-                    <div class="entity-title">${{task.title}}</div>
-                    <div class="entity-meta">Story: ${{task.storyId}}</div>
+            `).join('');
+
+            document.getElementById('task-list').innerHTML = [...viewNodes.values()]
+                .filter(n => n.type === 'task' && n.status !== 'completed')
+                .map(task => `
+                <div class="entity-item" onclick="focusEntity('${task.id}', 2)">
+                    <span class="entity-id">[${task.tag}] ${task.id}</span>
+                    <span class="status-badge status-${task.status}">${task.status}</span>
+                    <div class="entity-title">${task.title}</div>
+                    <div class="entity-meta">Story: ${task.storyId}</div>
                 </div>
-            `;
-        }});
+            `).join('');
+        }
+
+        function renderStats(stats) {
+            document.getElementById('stat-epics').textContent = stats.epics.total;
+            document.getElementById('stat-stories').textContent = stats.stories.total;
+            document.getElementById('stat-tasks').textContent = stats.tasks.total;
+            document.getElementById('stat-done').textContent = stats.tasks.completed;
+        }
+
+        function showDetails(id) {
+            fetch(`/api/entity/${encodeURIComponent(id)}`, { cache: 'no-cache' })
+                .then(r => r.json())
+                .then(entity => { document.getElementById('details').textContent = JSON.stringify(entity, null, 2); });
+        }
+
+        function focusEntity(id, scale) {
+            if (nodes.get(id)) network.focus(id, { scale, animation: true });
+            showDetails(id);
+        }
 
-        function showTab(name) {{
+        network.on('click', params => { if (params.nodes.length) showDetails(params.nodes[0]); });
+
+        // Large graphs (or ?lod in the URL) start as quarter/epic/story clusters;
+        // double-click a cluster to expand it and an expanded node to collapse it
+        const LOD_TASK_LIMIT = __LOD_TASK_LIMIT__;
+        const expanded = new Set();
+        let lod = null;
+
+        network.on('doubleClick', params => {
+            if (!lod || !params.nodes.length) return;
+            const node = viewNodes.get(params.nodes[0]);
+            if (node.cluster) expanded.add(node.id);
+            else if (node.expanded) expanded.delete(node.id);
+            else return;
+            refresh();
+        });
+
+        // Full load, revalidated with the server's ETag; redraws only when the view changed
+        let revision = null;
+        let shown = null;
+        function refresh() {
+            return fetch('/api/stats', { cache: 'no-cache' }).then(r => r.json()).then(stats => {
+                renderStats(stats);
+                if (lod === null) {
+                    lod = new URLSearchParams(location.search).has('lod') || stats.tasks.total > LOD_TASK_LIMIT;
+                    if (lod) ['Q1', 'Q2', 'Q3', 'Q4'].forEach(q => expanded.add(q));
+                }
+                const url = lod ? `/api/clusters?expand=${encodeURIComponent([...expanded].join(','))}` : '/api/graph';
+                return fetch(url, { cache: 'no-cache' }).then(r => r.json()).then(view => {
+                    if (shown === url + view.revision) return;
+                    shown = url + view.revision;
+                    revision = view.revision;
+                    renderGraph(view);
+                });
+            });
+        }
+        refresh();
+
+        // Live updates: apply entity diffs pushed by the server
+        function applyDiff(diff) {
+            const gone = new Set(diff.removed);
+            diff.nodes.forEach(n => gone.add(n.id));
+            edges.remove(edges.getIds({ filter: e => gone.has(e.to) || diff.removed.includes(e.from) }));
+            nodes.remove(diff.removed);
+            nodes.update(diff.nodes.map(toVisNode));
+            edges.update(diff.edges.map(toVisEdge));
+            diff.removed.forEach(id => viewNodes.delete(id));
+            diff.nodes.forEach(n => viewNodes.set(n.id, n));
+            revision = diff.revision;
+            renderSidebar(diff.epics);
+            fetch('/api/stats', { cache: 'no-cache' }).then(r => r.json()).then(renderStats);
+        }
+
+        const events = new EventSource('/api/events');
+        events.addEventListener('hello', e => { if (revision && JSON.parse(e.data).revision !== revision) refresh(); });
+        events.addEventListener('diff', e => {
+            const diff = JSON.parse(e.data);
+            // Clusters and moved nodes are recomputed server-side; refetch the view
+            if (lod || diff.structural) refresh();
+            else applyDiff(diff);
+        });
+        events.addEventListener('reset', () => refresh());
+
+        function showTab(name) {
             document.querySelectorAll('.tab-btn').forEach(b => b.classList.remove('active'));
             document.querySelectorAll('.tab-content').forEach(c => c.classList.remove('active'));
-            document.querySelector(`[onclick="showTab('${{name}}')"]`).classList.add('active');
-            document.getElementById(`${{name}}-tab`).classList.add('active');
-        }}
+            document.querySelector(`[onclick="showTab('${name}')"]`).classList.add('active');
+            document.getElementById(`${name}-tab`).classList.add('active');
+        }
     </script>
 </body>
-</html>"""
-    return html
+</html>""".replace("__LOD_TASK_LIMIT__", str(LOD_TASK_LIMIT))
+
+
+def _accepts_gzip(header: str) -> bool:
+    """True if an Accept-Encoding header allows gzip."""
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
 
 
 def serve_visualization(graph: PeachflowGraph, port: int = 9876):
-    """Start visualization server."""
-    html_content = create_visualization_html(graph)
+    """
+    Start visualization server.
+
+    The page is a static shell; data comes from /api/graph, /api/stats and
+    /api/entity/<id>, answered from the in-memory graph. Responses carry a
+    strong ETag derived from the graph's content hash (so 304s survive
+    server restarts) and are gzip-compressed when the client accepts it.
+    Encoded bodies are kept per revision, so repeat requests don't
+    re-serialize the graph.
+
+    Requests are handled on threads over keep-alive connections. A watcher
+    polls the graph file and, when it changes, reloads the graph and pushes
+    an entity-level diff to every /api/events (Server-Sent Events) client.
+
+    Node positions come from graph_layout, computed once per revision and
+    kept in the disk cache. /api/clusters?expand=Q1,E-002 serves the
+    level-of-detail view used for large graphs.
+    """
+    import gzip
+    import http.server
+    import queue
+    import webbrowser
+    from urllib.parse import parse_qs, urlsplit
+
+    html_content = create_visualization_html().encode()
+    graph._ensure_in_memory()
+    lock = threading.Lock()
+    subscribers = set()
+    state = {"signature": _graph_file_signature(graph), "revision": graph.content_hash() or "empty",
+             "bodies": {}, "layout": None, "load_error": None}
+    layout_cache = graph.cache("layout")
+
+    def current_layout() -> dict:
+        """Layout for the current revision; call with lock held."""
+        if state["layout"] is None:
+            key = f"{graph.path.name}:{state['revision']}"
+            layout = layout_cache.get(key)
+            if layout is None:
+                layout = graph_layout(graph.data)
+                layout_cache.put(key, layout)
+            state["layout"] = layout
+        return state["layout"]
+
+    def current_revision() -> str:
+        """Reload the graph if its file changed and push the diff; call with lock held."""
+        signature = _graph_file_signature(graph)
+        if signature != state["signature"]:
+            old = graph.data
+            try:
+                graph._load()
+            except Exception as e:
+                # Likely caught mid-rewrite by another process: keep serving
+                # the previous graph and retry on the next poll
+                if state["load_error"] != str(e):
+                    state["load_error"] = str(e)
+                    print(f"{Colors.RED}Could not reload {graph.path}: {e}{Colors.RESET}", file=sys.stderr)
+                return state["revision"]
+            state["load_error"] = None
+            state["signature"] = signature
+            state["revision"] = graph.content_hash() or "empty"
+            state["bodies"] = {}
+            state["layout"] = None
+            event = {"revision": state["revision"], **graph_view_diff(old, graph.data, current_layout())}
+            for subscriber in list(subscribers):
+                try:
+                    subscriber.put_nowait(event)
+                except queue.Full:
+                    # Too far behind for diffs; tell the client to refetch
+                    with subscriber.mutex:
+                        subscriber.queue.clear()
+                    subscriber.put_nowait({"revision": state["revision"], "reset": True})
+        return state["revision"]
+
+    def api_payload(path: str, query: dict) -> tuple:
+        """(status, payload) for an API path."""
+        if path == "/api/graph":
+            return 200, {"revision": state["revision"], **graph_view(graph, current_layout())}
+        if path == "/api/clusters":
+            expanded = {entity_id for value in query.get("expand", []) for entity_id in value.split(",") if entity_id}
+            return 200, {"revision": state["revision"], **cluster_view(graph, current_layout(), expanded)}
+        if path == "/api/stats":
+            return 200, graph.get_stats()
+        if path == "/api/changes":
+            try:
+                since = int(query.get("since", ["0"])[0])
+            except ValueError:
+                return 400, {"error": "since must be a revision number"}
+            return 200, graph.get_changes(since)
+        if path.startswith("/api/entity/"):
+            entity_id = path[len("/api/entity/"):]
+            entity_type = entity_type_of(entity_id)
+            try:
+                return 200, {"type": entity_type, **graph.get(entity_type, entity_id)}
+            except ValueError:
+                return 404, {"error": f"Entity not found: {entity_id}"}
+        return 404, {"error": f"Unknown endpoint: {path}"}
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive; every response sets Content-Length
 
-    class Handler(http.server.SimpleHTTPRequestHandler):
         def do_GET(self):
+            url = urlsplit(self.path)
+            path = url.path
+            if path in ("/", "/index.html"):
+                self.send_body(200, html_content, "text/html; charset=utf-8", None)
+            elif path == "/api/events":
+                self.stream_events()
+            elif path.startswith("/api/"):
+                use_gzip = _accepts_gzip(self.headers.get("Accept-Encoding"))
+                key = (path, url.query, use_gzip)
+                with lock:
+                    revision = current_revision()
+                    if key not in state["bodies"]:
+                        if len(state["bodies"]) >= SERVE_BODY_CACHE:
+                            state["bodies"] = {}
+                        status, payload = api_payload(path, parse_qs(url.query))
+                        body = json.dumps(payload, separators=(",", ":")).encode()
+                        if use_gzip:
+                            body = gzip.compress(body, compresslevel=6)
+                        state["bodies"][key] = (status, body)
+                    status, body = state["bodies"][key]
+                # Strong validator: byte-identical per revision and encoding
+                etag = f'"{revision}{"-gz" if use_gzip else ""}"'
+                if status == 200 and self.etag_matches(etag):
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Vary", "Accept-Encoding")
+                    self.end_headers()
+                    return
+                self.send_body(status, body, "application/json", etag if status == 200 else None,
+                               "gzip" if use_gzip else None)
+            else:
+                self.send_body(404, b"Not found", "text/plain", None)
+
+        def stream_events(self):
+            """Send a 'diff' event per graph change until the client goes away."""
+            events = queue.Queue(maxsize=SERVE_EVENT_BACKLOG)
+            with lock:
+                subscribers.add(events)
+                revision = state["revision"]
             self.send_response(200)
-            self.send_header("Content-type", "text/html")
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
             self.end_headers()
-            self.wfile.write(html_content.encode())
+            self.close_connection = True
+            try:
+                self.wfile.write(f"event: hello\ndata: {json.dumps({'revision': revision})}\n\n".encode())
+                self.wfile.flush()
+                while not stopping.is_set():
+                    try:
+                        event = events.get(timeout=SERVE_KEEPALIVE_SECONDS)
+                    except queue.Empty:
+                        self.wfile.write(b": keepalive\n\n")
+                    else:
+                        name = "reset" if event.get("reset") else "diff"
+                        self.wfile.write(f"id: {event['revision']}\nevent: {name}\n"
+                                         f"data: {json.dumps(event, separators=(',', ':'))}\n\n".encode())
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                with lock:
+                    subscribers.discard(events)
+
+        def etag_matches(self, etag: str) -> bool:
+            header = self.headers.get("If-None-Match")
+            if not header:
+                return False
+            tags = [tag.strip() for tag in header.split(",")]
+            return "*" in tags or etag in tags
+
+        def send_body(self, status: int, body: bytes, content_type: str, etag: Optional[str],
+                      encoding: Optional[str] = None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-cache")
+            if etag:
+                self.send_header("ETag", etag)
+            if content_type == "application/json":
+                self.send_header("Vary", "Accept-Encoding")
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            self.end_headers()
+            self.wfile.write(body)
 
         def log_message(self, format, *args):
             pass  # Suppress logging
 
-    with socketserver.TCPServer(("", port), Handler) as httpd:
+    stopping = threading.Event()
+
+    def watch():
+        """Poll the graph file so changes reach event streams without a request."""
+        while not stopping.wait(SERVE_POLL_SECONDS):
+            with lock:
+                if subscribers:
+                    current_revision()
+
+    class Server(http.server.ThreadingHTTPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+    with Server(("", port), Handler) as httpd:
         url = f"http://localhost:{port}"
         print(f"{Colors.GREEN}Peachflow Graph Visualization{Colors.RESET}")
         print(f"Server running at: {Colors.CYAN}{url}{Colors.RESET}")
         print(f"Press {Colors.YELLOW}Ctrl+C{Colors.RESET} to stop\n")
 
+        threading.Thread(target=watch, daemon=True).start()
         # Open browser in background
         threading.Timer(0.5, lambda: webbrowser.open(url)).start()
 
@@ -1342,10 +4199,270 @@ def serve_visualization(graph: PeachflowGraph, port: int = 9876):
             httpd.serve_forever()
         except KeyboardInterrupt:
             print(f"\n{Colors.GRAY}Server stopped.{Colors.RESET}")
+        finally:
+            stopping.set()
+
+
+# === Graph Daemon ===
+
+# Commands that read stdin/local files or run their own loop stay in-process.
+DAEMON_LOCAL_COMMANDS = {"daemon", "serve", "batch", "apply", "import", "export"}
+
+
+def daemon_socket_path(graph_path: Path) -> Path:
+    """Socket the daemon for a graph listens on."""
+    return Path(os.environ.get("PEACHFLOW_GRAPH_SOCKET") or graph_path.with_suffix(".sock"))
+
+
+def _graph_file_signature(graph: PeachflowGraph) -> tuple:
+    """(inode, mtime, size) of the graph file and journal, to spot external edits."""
+    signature = []
+    for path in (graph.path, graph.path.with_suffix(".wal")):
+        try:
+            st = os.stat(path)
+            signature.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def serve_daemon(graph: PeachflowGraph, parser: argparse.ArgumentParser, socket_path: Path):
+    """
+    Serve CLI commands for one graph over a Unix domain socket.
+
+    Each request is one JSON line {"argv": [...], "graph": path, "color": bool}
+    and gets one JSON line {"stdout", "stderr", "code"} back. The graph stays
+    parsed in memory and is reloaded when the file's inode, mtime or size
+    changes underneath the daemon.
+    """
+    import socketserver
+
+    if socket_path.exists():
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(str(socket_path))
+            raise ValueError(f"Daemon already running on {socket_path}")
+        except (ConnectionRefusedError, FileNotFoundError):
+            socket_path.unlink()
+
+    graph_key = str(graph.path.resolve())
+    state = {"signature": _graph_file_signature(graph)}
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            # Always answer: an empty reply would make the client rerun a
+            # command the daemon may already have applied
+            try:
+                request = json.loads(self.rfile.readline())
+                if request.get("shutdown"):
+                    response = {"stdout": "", "stderr": "", "code": 0}
+                    self.server.shutdown_requested = True
+                elif request.get("graph") != graph_key:
+                    response = {"stdout": "", "stderr": "", "code": None}
+                else:
+                    response = self.run(request)
+            except Exception as e:
+                response = {"stdout": "", "stderr": f"Daemon error: {e}\n", "code": 2}
+            try:
+                self.wfile.write((json.dumps(response) + "\n").encode())
+            except OSError:
+                pass
+
+        def run(self, request: dict) -> dict:
+            signature = _graph_file_signature(graph)
+            if signature != state["signature"]:
+                graph._load()
+
+            if request.get("color"):
+                Colors.enable()
+            else:
+                Colors.disable()
+
+            stdout, stderr = io.StringIO(), io.StringIO()
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                try:
+                    args = parser.parse_args(request.get("argv", []))
+                    code = dispatch(graph, parser, args)
+                except SystemExit as e:
+                    code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                except Exception as e:
+                    print(f"Unexpected error: {e}", file=sys.stderr)
+                    code = 2
+            if code:
+                # The command may have changed the graph in memory before it
+                # failed; drop that so later requests only see what was saved
+                graph._load()
+            state["signature"] = _graph_file_signature(graph)
+            return {"stdout": stdout.getvalue(), "stderr": stderr.getvalue(), "code": code}
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(socketserver.UnixStreamServer):
+        shutdown_requested = False
+
+        def service_actions(self):
+            if self.shutdown_requested:
+                self.shutdown_requested = False
+                threading.Thread(target=self.shutdown).start()
+
+    with Server(str(socket_path), Handler) as server:
+        print(f"{Colors.GREEN}Peachflow graph daemon{Colors.RESET} serving {graph_key}")
+        print(f"Socket: {Colors.CYAN}{socket_path}{Colors.RESET}", flush=True)
+        try:
+            server.serve_forever(poll_interval=0.2)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if socket_path.exists():
+                socket_path.unlink()
+    print(f"{Colors.GRAY}Daemon stopped.{Colors.RESET}")
+
+
+def _daemon_request(socket_path: Path, request: dict) -> Optional[dict]:
+    """
+    Send one request to the daemon; None if no daemon is listening.
+
+    Once connected, a lost or garbled reply is reported as a failed
+    command rather than None: the daemon may already have run it, so
+    running it again locally could apply a mutation twice.
+    """
+    if not socket_path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with sock:
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            return None
+        try:
+            sock.sendall((json.dumps(request) + "\n").encode())
+            with sock.makefile("rb") as reply:
+                return json.loads(reply.readline())
+        except (OSError, ValueError) as e:
+            return {"stdout": "", "stderr": f"Error: no valid reply from the daemon on {socket_path} ({e})\n",
+                    "code": 1}
+
+
+# Top-level options that take a value, so the command can be found without the parser
+GLOBAL_VALUE_OPTIONS = {"--format", "-f", "--fields", "--backend"}
+
+
+def split_global_argv(argv: list) -> tuple:
+    """(command, backend) from raw argv; command is None for help or no command."""
+    command = backend = None
+    tokens = iter(argv)
+    for token in tokens:
+        option, has_value, value = token.partition("=")
+        if option in GLOBAL_VALUE_OPTIONS:
+            if not has_value:
+                value = next(tokens, None)
+            if option == "--backend":
+                backend = value
+        elif token.startswith("-"):
+            return None, backend
+        else:
+            command = token
+            break
+    return command, backend
+
+
+def forward_to_daemon(argv: list, graph_path: Path) -> Optional[int]:
+    """Run argv on a running daemon; returns its exit code, or None to run locally."""
+    response = _daemon_request(daemon_socket_path(graph_path), {
+        "argv": argv,
+        "graph": str(graph_path.resolve()),
+        "color": bool(Colors.RESET),
+    })
+    if not response or response.get("code") is None:
+        return None
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["code"]
 
 
 # === CLI Interface ===
 
+# Output formats written as JSON; ndjson streams one compact record per line
+JSON_FORMATS = ("json", "ndjson")
+OUTPUT_FORMATS = ["human", "json", "ndjson", "yaml"]
+
+
+def project(record: Any, fields: Optional[list]) -> Any:
+    """Keep only the requested top-level fields of a record."""
+    if not fields or not isinstance(record, dict):
+        return record
+    return {field: record[field] for field in fields if field in record}
+
+
+def write_json(result: Any, args: argparse.Namespace, indent: Optional[int] = 2):
+    """
+    Write a command result as json or ndjson, applying --fields.
+
+    In ndjson mode a list (or any iterable of records) is written one
+    compact line per record as it is produced, so nothing larger than a
+    single record is ever serialized at once.
+    """
+    fields = args.fields.split(",") if getattr(args, "fields", None) else None
+    if args.format != "ndjson":
+        if isinstance(result, list) or hasattr(result, "__next__"):
+            result = [project(record, fields) for record in result]
+        else:
+            result = project(result, fields)
+        print(json.dumps(result, indent=indent))
+        return
+
+    records = result if isinstance(result, list) or hasattr(result, "__next__") else [result]
+    write = sys.stdout.write
+    for record in records:
+        write(json.dumps(project(record, fields), separators=(",", ":")) + "\n")
+
+
+def write_export(path: str, chunks):
+    """Write export pieces to a file, replacing it atomically once complete."""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def _import_pyarrow():
+    """(pyarrow, pyarrow.parquet) if installed; parquet exports need them."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow, pyarrow.parquet
+
+
+def write_parquet(path: Path, columns: list, rows):
+    """Write row tuples to a Parquet file, EXPORT_BATCH_ROWS rows per row group."""
+    pa, pq = _import_pyarrow()
+    types = {"string": pa.string(), "int": pa.int64(), "float": pa.float64()}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    tmp_path = path.with_name(path.name + ".tmp")
+    writer = pq.ParquetWriter(str(tmp_path), schema)
+    try:
+        while True:
+            batch = list(islice(rows, EXPORT_BATCH_ROWS))
+            if batch:
+                arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            if len(batch) < EXPORT_BATCH_ROWS:
+                break
+    finally:
+        writer.close()
+    os.replace(tmp_path, path)
+
+
+def dot_quote(value: str) -> str:
+    """Quote a Graphviz ID or label."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
 def format_output(data: Any, format: str = "human") -> str:
     """Format output for display."""
     if format == "json":
@@ -1429,13 +4546,59 @@ def print_entity(entity: dict, entity_type: str):
     print()
 
 
+def print_context(context: dict):
+    """Print a task context bundle."""
+    task = context["task"]
+    print(f"[{task.get('tag', '?')}] {Colors.BOLD}{task['id']}{Colors.RESET}: {task.get('title', 'Untitled')}")
+    print(f"  Status: {task['status']} | Sprint: {task.get('sprintId') or '-'}")
+    print(f"  Path: {Colors.CYAN}{context['path']}{Colors.RESET}")
+    print(f"  Epic: {context['epic']['id']} - {context['epic']['title']}")
+    print(f"  Story: {context['story']['id']} - {context['story']['title']}")
+    acceptance = context["acceptance"]
+    print(f"  Acceptance: {acceptance['done']}/{acceptance['total']} done")
+    for criterion in acceptance["criteria"]:
+        if isinstance(criterion, dict):
+            print(f"    {'✓' if criterion.get('done') else '○'} {criterion.get('title', '')}")
+        else:
+            print(f"    ○ {criterion}")
+    for label, key in (("Blocked by", "blockers"), ("Unblocks", "dependents")):
+        if context[key]:
+            tasks = ", ".join(f"{task['id']} ({task['status']})" for task in context[key])
+            print(f"  {label}: {tasks}")
+    for clarification in context["clarifications"]:
+        print(f"  Clarification {clarification['id']} ({clarification['status']}): {clarification['question'][:80]}")
+        if clarification.get("answer"):
+            print(f"    Answer: {clarification['answer'][:80]}")
+    for adr in context["adrs"]:
+        print(f"  ADR {adr['id']} ({adr['status']}): {adr['title']}")
+    print()
+
+
+def print_changes(changes: dict):
+    """Print a change feed result."""
+    print(f"{Colors.BOLD}Revision {changes['revision']}{Colors.RESET} (since {changes['since']})")
+    if changes["snapshot"]:
+        total = sum(len(entities) for entities in changes["entities"].values())
+        print(f"  Revision {changes['since']} is not in the changelog; full snapshot of {total} entities")
+        return
+    markers = {"created": f"{Colors.GREEN}+", "updated": f"{Colors.YELLOW}~", "deleted": f"{Colors.RED}-"}
+    if not any(changes[op] for op in CHANGE_OPS):
+        print("  No changes")
+    for op in CHANGE_OPS:
+        for record in changes[op]:
+            entity = record.get("entity", {})
+            title = entity.get("title") or entity.get("name") or entity.get("question", "")
+            print(f"  {markers[op]} {record['id']}{Colors.RESET} {title}".rstrip())
+
+
 def print_list(entities: list, entity_type: str):
     """Print list of entities."""
+    plural = ENTITY_COLLECTIONS.get(entity_type, entity_type + "s")
     if not entities:
-        print(f"{Colors.GRAY}No {entity_type}s found.{Colors.RESET}")
+        print(f"{Colors.GRAY}No {plural} found.{Colors.RESET}")
         return
 
-    print(f"\n{Colors.BOLD}{entity_type.title()}s ({len(entities)} total){Colors.RESET}")
+    print(f"\n{Colors.BOLD}{plural.title()} ({len(entities)} total){Colors.RESET}")
     print("─" * 60)
 
     for entity in entities:
@@ -1473,9 +4636,55 @@ def print_stats(stats: dict):
     print(f"\nClarifications: {stats['clarifications']['pending']} pending / {stats['clarifications']['total']} total")
 
 
-def main():
+def read_max_parallel(graph_path: Path) -> int:
+    """maxParallelTasks from the state file next to the graph."""
+    state_path = graph_path.parent / STATE_FILE
+    try:
+        with open(state_path) as f:
+            return int(json.load(f).get("maxParallelTasks") or DEFAULT_MAX_PARALLEL)
+    except (OSError, ValueError, TypeError, AttributeError):
+        return DEFAULT_MAX_PARALLEL
+
+
+def parse_capacity(spec: str) -> dict:
+    """Parse 'FE=3,BE=2' into per-tag task limits."""
+    capacity = {}
+    for part in spec.split(","):
+        tag, _, limit = part.partition("=")
+        tag = tag.strip()
+        if tag not in TASK_TAGS or not limit.strip().isdigit():
+            raise ValueError(f"Invalid capacity: {part}. Use TAG=N with TAG one of {TASK_TAGS}")
+        capacity[tag] = int(limit)
+    return capacity
+
+
+def print_schedule(schedule: dict):
+    """Print critical-path schedule."""
+    print(f"\n{Colors.BOLD}Schedule{Colors.RESET} (finish: {schedule['finish']:g})")
+    print("─" * 60)
+    if schedule["criticalChain"]:
+        print(f"Critical chain: {Colors.RED}{' → '.join(schedule['criticalChain'])}{Colors.RESET}\n")
+
+    print(f"{'Start':>7} {'Finish':>7} {'Slack':>7}  Task")
+    for task in schedule["tasks"]:
+        color = Colors.RED if task["critical"] else ""
+        print(f"{task['earliestStart']:7g} {task['earliestFinish']:7g} {task['slack']:7g}  "
+              f"{color}[{task['tag']}] {task['id']}: {task['title']}{Colors.RESET}")
+
+    for key, label in (("quarters", "Quarter"), ("epics", "Epic")):
+        if len(schedule[key]) > 1:
+            print(f"\n{Colors.BOLD}By {label.lower()}{Colors.RESET}")
+            for group_id, group in schedule[key].items():
+                print(f"  {group_id}: finish {group['finish']:g} | {' → '.join(group['criticalChain']) or '-'}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the CLI argument parser."""
     parser = argparse.ArgumentParser(description="Peachflow Graph Management")
-    parser.add_argument("--format", "-f", choices=["human", "json", "yaml"], default="human")
+    parser.add_argument("--format", "-f", choices=OUTPUT_FORMATS, default="human")
+    parser.add_argument("--fields", help="Comma-separated fields to keep in json/ndjson output")
+    parser.add_argument("--backend", choices=["json", "sqlite"],
+                        help="Storage backend (default: sqlite for .db graph paths, json otherwise)")
     subparsers = parser.add_subparsers(dest="command", help="Command")
 
     # init
@@ -1504,6 +4713,7 @@ def main():
     task_p.add_argument("--tag", required=True, choices=TASK_TAGS)
     task_p.add_argument("--description", default="")
     task_p.add_argument("--depends-on", help="Comma-separated task IDs")
+    task_p.add_argument("--estimate", type=float, help="Estimated effort (used by schedule)")
 
     cl_p = create_sub.add_parser("clarification")
     cl_p.add_argument("--entity", required=True, dest="entity_id")
@@ -1525,7 +4735,7 @@ def main():
     # get
     get_parser = subparsers.add_parser("get", help="Get entity by ID")
     get_parser.add_argument("entity_type", choices=["epic", "story", "task", "clarification", "adr", "sprint", "quarter"])
-    get_parser.add_argument("entity_id")
+    get_parser.add_argument("entity_id", nargs="+")
 
     # update
     update_parser = subparsers.add_parser("update", help="Update entity")
@@ -1535,6 +4745,7 @@ def main():
     update_parser.add_argument("--title")
     update_parser.add_argument("--description")
     update_parser.add_argument("--priority", type=int)
+    update_parser.add_argument("--estimate", type=float)  # For tasks
     update_parser.add_argument("--answer")  # For clarifications
     update_parser.add_argument("--worktree")  # For sprints
     update_parser.add_argument("--no-cascade", action="store_true", help="Disable automatic status cascading")
@@ -1546,7 +4757,7 @@ def main():
 
     # cascade
     cascade_parser = subparsers.add_parser("cascade", help="Manually trigger cascade status check")
-    cascade_parser.add_argument("entity_type", choices=["task", "story", "epic"])
+    cascade_parser.add_argument("entity_type", choices=["task", "story", "epic", "sprint"])
     cascade_parser.add_argument("entity_id")
 
     # acceptance
@@ -1574,6 +4785,10 @@ def main():
     list_parser.add_argument("--unassigned", action="store_true")
     list_parser.add_argument("--pending", action="store_true")
     list_parser.add_argument("--entity")
+    list_parser.add_argument("--where", help='Filter expression, e.g. "status in (pending,blocked) and tag=BE"')
+    list_parser.add_argument("--order-by", help="Comma-separated fields, e.g. --order-by=-estimate,title (- for descending)")
+    list_parser.add_argument("--limit", type=int)
+    list_parser.add_argument("--offset", type=int, default=0)
 
     # depends
     depends_parser = subparsers.add_parser("depends", help="Manage dependencies")
@@ -1593,12 +4808,28 @@ def main():
     dep_blockers = depends_sub.add_parser("blockers")
     dep_blockers.add_argument("task_id")
 
+    dep_dependents = depends_sub.add_parser("dependents")
+    dep_dependents.add_argument("task_id")
+
+    dep_order = depends_sub.add_parser("order")
+    dep_order.add_argument("--quarter", choices=["Q1", "Q2", "Q3", "Q4"])
+    dep_order.add_argument("--epic")
+    dep_order.add_argument("--sprint")
+
     # ready-tasks
     ready_parser = subparsers.add_parser("ready-tasks", help="Find ready tasks")
     ready_parser.add_argument("--quarter", choices=["Q1", "Q2", "Q3", "Q4"])
     ready_parser.add_argument("--epic")
     ready_parser.add_argument("--limit", type=int)
 
+    # context
+    context_parser = subparsers.add_parser("context", help="Task, chain, blockers, clarifications and ADRs in one call")
+    context_parser.add_argument("task_ids", nargs="+")
+
+    # changes
+    changes_parser = subparsers.add_parser("changes", help="Entities created, updated or deleted since a revision")
+    changes_parser.add_argument("--since", type=int, default=0, help="Revision last seen (default: 0)")
+
     # chain
     chain_parser = subparsers.add_parser("chain", help="Get task chain")
     chain_parser.add_argument("task_id")
@@ -1613,272 +4844,586 @@ def main():
     stats_parser.add_argument("--quarter", choices=["Q1", "Q2", "Q3", "Q4"])
     stats_parser.add_argument("--epic")
 
+    # schedule
+    schedule_parser = subparsers.add_parser("schedule", help="Critical path over task estimates")
+    schedule_parser.add_argument("--quarter", choices=["Q1", "Q2", "Q3", "Q4"])
+    schedule_parser.add_argument("--epic")
+
+    # forecast
+    forecast_parser = subparsers.add_parser("forecast", help="Monte Carlo completion forecast")
+    forecast_scope = forecast_parser.add_mutually_exclusive_group()
+    forecast_scope.add_argument("--sprint")
+    forecast_scope.add_argument("--epic")
+    forecast_scope.add_argument("--quarter", choices=["Q1", "Q2", "Q3", "Q4"])
+    forecast_parser.add_argument("--simulations", type=int, default=FORECAST_SIMULATIONS)
+    forecast_parser.add_argument("--workers", type=int,
+                                 help=f"Parallel workers (default: maxParallelTasks from {STATE_FILE})")
+    forecast_parser.add_argument("--seed", type=int)
+
     # sprint operations
     sprint_create_parser = subparsers.add_parser("sprint-create", help="Auto-create sprint")
     sprint_create_parser.add_argument("--quarter", required=True, choices=["Q1", "Q2", "Q3", "Q4"])
     sprint_create_parser.add_argument("--max-tasks", type=int, default=10)
     sprint_create_parser.add_argument("--name", default="")
+    sprint_create_parser.add_argument("--capacity", help="Per-tag task limits, e.g. FE=3,BE=3,DevOps=1")
+    sprint_create_parser.add_argument("--budget", type=float, help="Maximum summed task estimates")
+    sprint_create_parser.add_argument("--dry-run", action="store_true", help="Show the selection without creating")
 
     subparsers.add_parser("sprint-active", help="Get active sprint")
 
     sprint_complete_parser = subparsers.add_parser("sprint-complete", help="Complete sprint")
     sprint_complete_parser.add_argument("sprint_id")
 
+    sprint_waves_parser = subparsers.add_parser("sprint-waves", help="Plan parallel waves for a sprint")
+    sprint_waves_parser.add_argument("sprint_id")
+    sprint_waves_parser.add_argument("--max-parallel", type=int,
+                                     help=f"Tasks per wave (default: maxParallelTasks from {STATE_FILE})")
+
     # next-id
     next_id_parser = subparsers.add_parser("next-id", help="Get next ID")
     next_id_parser.add_argument("entity_type", choices=["epic", "story", "task", "clarification", "adr", "sprint"])
 
+    # batch
+    batch_parser = subparsers.add_parser("batch", help="Run command lines in one transaction")
+    batch_parser.add_argument("--file", help="File with one command per line (default: stdin)")
+
+    # apply
+    apply_parser = subparsers.add_parser("apply", help="Apply a JSONL stream of operations")
+    apply_parser.add_argument("file", nargs="?", help="JSONL file (default: stdin)")
+    apply_policy = apply_parser.add_mutually_exclusive_group()
+    apply_policy.add_argument("--stop-on-error", dest="continue_on_error", action="store_false",
+                              help="Stop at the first failing operation (default)")
+    apply_policy.add_argument("--continue", dest="continue_on_error", action="store_true",
+                              help="Keep going after failing operations")
+    apply_parser.set_defaults(continue_on_error=False)
+
+    # daemon
+    daemon_parser = subparsers.add_parser("daemon", help="Serve commands from memory over a Unix socket")
+    daemon_parser.add_argument("--socket", help="Socket path (default: <graph>.sock)")
+    daemon_parser.add_argument("--stop", action="store_true", help="Stop a running daemon")
+
+    # verify-aggregates
+    subparsers.add_parser("verify-aggregates", help="Rebuild status counters and report drift")
+
+    # compact
+    subparsers.add_parser("compact", help="Fold the journal into the graph snapshot")
+
+    # import
+    import_parser = subparsers.add_parser("import", help="Import a JSON graph document")
+    import_parser.add_argument("file", help="JSON graph file (e.g. from 'export --format json')")
+
     # export
     export_parser = subparsers.add_parser("export", help="Export graph")
-    export_parser.add_argument("--format", choices=["json", "markdown"], default="json")
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, default="json")
+    export_parser.add_argument("--out", metavar="PATH",
+                               help="Write to PATH instead of stdout (a directory of tables for csv and parquet)")
+    export_parser.add_argument("--stream", action="store_true",
+                               help="Write json/markdown pieces as they are produced (other formats always stream)")
+    export_parser.add_argument("--table", choices=list(EXPORT_TABLES),
+                               help="Only this table for csv/parquet (csv to stdout defaults to tasks)")
+    export_selector = export_parser.add_mutually_exclusive_group()
+    export_selector.add_argument("--quarter", choices=["Q1", "Q2", "Q3", "Q4"], help="Only this quarter's subgraph")
+    export_selector.add_argument("--epic", help="Only this epic's subgraph")
+    export_selector.add_argument("--sprint", help="Only this sprint's tasks and their parents")
 
     # serve
     serve_parser = subparsers.add_parser("serve", help="Start visualization server")
     serve_parser.add_argument("--port", type=int, default=9876)
 
-    args = parser.parse_args()
-
-    if not args.command:
-        parser.print_help()
-        sys.exit(0)
+    # The command docs put --format after the subcommand; accept it there too
+    def allow_trailing_format(parent: argparse.ArgumentParser):
+        for action in parent._actions:
+            if isinstance(action, argparse._SubParsersAction):
+                for sub in action.choices.values():
+                    if "--format" not in sub._option_string_actions:
+                        sub.add_argument("--format", "-f", choices=OUTPUT_FORMATS,
+                                         default=argparse.SUPPRESS)
+                    if "--fields" not in sub._option_string_actions:
+                        sub.add_argument("--fields", default=argparse.SUPPRESS)
+                    allow_trailing_format(sub)
+
+    allow_trailing_format(parser)
+    return parser
+
+
+def run_command(graph: PeachflowGraph, args: argparse.Namespace):
+    """Execute one parsed CLI command against the graph and print its output."""
+    if args.command == "init":
+        result = graph.init()
+        if args.format in JSON_FORMATS:
+            write_json(result, args, indent=None)
+        else:
+            print(f"{Colors.GREEN}✓ Graph initialized at {result['path']}{Colors.RESET}")
+
+    elif args.command == "create":
+        if args.entity_type == "epic":
+            deliverables = args.deliverables.split(",") if args.deliverables else []
+            result = graph.create_epic(args.title, args.quarter, args.priority, args.description, deliverables)
+        elif args.entity_type == "story":
+            acceptance = args.acceptance.split(",") if args.acceptance else []
+            result = graph.create_story(args.epic_id, args.title, args.description, acceptance)
+        elif args.entity_type == "task":
+            depends = args.depends_on.split(",") if args.depends_on else []
+            result = graph.create_task(args.story_id, args.title, args.tag, args.description, depends,
+                                       args.estimate)
+        elif args.entity_type == "clarification":
+            result = graph.create_clarification(args.entity_id, args.question, args.entity_type_cl)
+        elif args.entity_type == "adr":
+            result = graph.create_adr(args.title, args.context, args.decision, args.consequences, args.entity_id)
+        elif args.entity_type == "sprint":
+            tasks = args.tasks.split(",") if args.tasks else []
+            result = graph.create_sprint(args.quarter, tasks, args.name)
+
+        if args.format in JSON_FORMATS:
+            write_json(result, args, indent=None)
+        else:
+            print(f"{Colors.GREEN}✓ Created {args.entity_type}: {result['id']}{Colors.RESET}")
+
+    elif args.command == "get":
+        result = [graph.get(args.entity_type, entity_id) for entity_id in args.entity_id]
+        if len(result) == 1:
+            result = result[0]
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        else:
+            for entity in (result if isinstance(result, list) else [result]):
+                print_entity(entity, args.entity_type)
 
-    graph = PeachflowGraph()
+    elif args.command == "context":
+        result = graph.get_context(args.task_ids)
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        else:
+            for context in result:
+                print_context(context)
 
-    try:
-        if args.command == "init":
-            result = graph.init()
-            if args.format == "json":
-                print(json.dumps(result))
+    elif args.command == "changes":
+        result = graph.get_changes(args.since)
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        else:
+            print_changes(result)
+
+    elif args.command == "update":
+        updates = {}
+        for flag, field in UPDATE_FIELDS.items():
+            val = getattr(args, flag, None)
+            if val is not None:
+                updates[field] = val
+
+        cascade = not getattr(args, 'no_cascade', False)
+        result = graph.update(args.entity_type, args.entity_id, cascade=cascade, **updates)
+        if args.format in JSON_FORMATS:
+            write_json(result, args, indent=None)
+        else:
+            print(f"{Colors.GREEN}✓ Updated {args.entity_id}{Colors.RESET}")
+            if result.get("_cascaded"):
+                print(f"  Cascaded status changes:")
+                for eid, status in result["_cascaded"].items():
+                    print(f"    {eid} → {status}")
+
+    elif args.command == "cascade":
+        result = graph.cascade_status_check(args.entity_type, args.entity_id)
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        else:
+            if result:
+                print(f"{Colors.GREEN}Status changes cascaded:{Colors.RESET}")
+                for entity_id, new_status in result.items():
+                    print(f"  {entity_id} → {new_status}")
             else:
-                print(f"{Colors.GREEN}✓ Graph initialized at {result['path']}{Colors.RESET}")
-
-        elif args.command == "create":
-            if args.entity_type == "epic":
-                deliverables = args.deliverables.split(",") if args.deliverables else []
-                result = graph.create_epic(args.title, args.quarter, args.priority, args.description, deliverables)
-            elif args.entity_type == "story":
-                acceptance = args.acceptance.split(",") if args.acceptance else []
-                result = graph.create_story(args.epic_id, args.title, args.description, acceptance)
-            elif args.entity_type == "task":
-                depends = args.depends_on.split(",") if args.depends_on else []
-                result = graph.create_task(args.story_id, args.title, args.tag, args.description, depends)
-            elif args.entity_type == "clarification":
-                result = graph.create_clarification(args.entity_id, args.question, args.entity_type_cl)
-            elif args.entity_type == "adr":
-                result = graph.create_adr(args.title, args.context, args.decision, args.consequences, args.entity_id)
-            elif args.entity_type == "sprint":
-                tasks = args.tasks.split(",") if args.tasks else []
-                result = graph.create_sprint(args.quarter, tasks, args.name)
-
-            if args.format == "json":
-                print(json.dumps(result))
+                print(f"{Colors.GRAY}No status changes needed.{Colors.RESET}")
+
+    elif args.command == "acceptance":
+        if args.acceptance_action == "update":
+            if args.done and args.not_done:
+                print(f"{Colors.RED}Error: Cannot specify both --done and --not-done{Colors.RESET}")
+                sys.exit(1)
+            done = args.done if args.done else not args.not_done
+            result = graph.update_acceptance_criterion(args.story_id, args.index, done)
+            if args.format in JSON_FORMATS:
+                write_json(result, args, indent=None)
             else:
-                print(f"{Colors.GREEN}✓ Created {args.entity_type}: {result['id']}{Colors.RESET}")
+                status = "done" if done else "not done"
+                print(f"{Colors.GREEN}✓ Updated criterion {args.index} for {args.story_id} → {status}{Colors.RESET}")
 
-        elif args.command == "get":
-            result = graph.get(args.entity_type, args.entity_id)
-            if args.format == "json":
-                print(json.dumps(result, indent=2))
+        elif args.acceptance_action == "progress":
+            result = graph.get_acceptance_progress(args.story_id)
+            if args.format in JSON_FORMATS:
+                write_json(result, args)
             else:
-                print_entity(result, args.entity_type)
-
-        elif args.command == "update":
-            updates = {}
-            for field in ["status", "title", "description", "priority", "answer", "worktree"]:
-                val = getattr(args, field, None)
-                if val is not None:
-                    if field == "worktree":
-                        updates["worktreePath"] = val
+                progress_pct = result["progress"] * 100
+                print(f"\n{Colors.BOLD}Acceptance Criteria: {args.story_id}{Colors.RESET}")
+                print(f"Progress: {result['done']}/{result['total']} ({progress_pct:.0f}%)")
+                for i, c in enumerate(result["criteria"]):
+                    if isinstance(c, dict):
+                        icon = f"{Colors.GREEN}✓{Colors.RESET}" if c.get("done") else "○"
+                        print(f"  [{i}] {icon} {c.get('title', c)}")
                     else:
-                        updates[field] = val
+                        print(f"  [{i}] ○ {c}")
+        else:
+            print(f"{Colors.RED}Error: acceptance action required (update or progress){Colors.RESET}")
+            sys.exit(1)
 
-            cascade = not getattr(args, 'no_cascade', False)
-            result = graph.update(args.entity_type, args.entity_id, cascade=cascade, **updates)
-            if args.format == "json":
-                print(json.dumps(result))
-            else:
-                print(f"{Colors.GREEN}✓ Updated {args.entity_id}{Colors.RESET}")
-                if result.get("_cascaded"):
-                    print(f"  Cascaded status changes:")
-                    for eid, status in result["_cascaded"].items():
-                        print(f"    {eid} → {status}")
-
-        elif args.command == "cascade":
-            result = graph.cascade_status_check(args.entity_type, args.entity_id)
-            if args.format == "json":
-                print(json.dumps(result, indent=2))
-            else:
-                if result:
-                    print(f"{Colors.GREEN}Status changes cascaded:{Colors.RESET}")
-                    for entity_id, new_status in result.items():
-                        print(f"  {entity_id} → {new_status}")
-                else:
-                    print(f"{Colors.GRAY}No status changes needed.{Colors.RESET}")
-
-        elif args.command == "acceptance":
-            if args.acceptance_action == "update":
-                if args.done and args.not_done:
-                    print(f"{Colors.RED}Error: Cannot specify both --done and --not-done{Colors.RESET}")
-                    sys.exit(1)
-                done = args.done if args.done else not args.not_done
-                result = graph.update_acceptance_criterion(args.story_id, args.index, done)
-                if args.format == "json":
-                    print(json.dumps(result))
-                else:
-                    status = "done" if done else "not done"
-                    print(f"{Colors.GREEN}✓ Updated criterion {args.index} for {args.story_id} → {status}{Colors.RESET}")
+    elif args.command == "delete":
+        result = graph.delete(args.entity_type, args.entity_id)
+        if args.format in JSON_FORMATS:
+            write_json(result, args, indent=None)
+        else:
+            print(f"{Colors.YELLOW}✓ Deleted {args.entity_id}{Colors.RESET}")
+            if result.get("removed"):
+                print(f"  Also removed: {', '.join(result['removed'])}")
+            if result.get("_cascaded"):
+                print(f"  Cascaded status changes:")
+                for eid, status in result["_cascaded"].items():
+                    print(f"    {eid} → {status}")
+
+    elif args.command == "list":
+        entity_type = {collection: singular for singular, collection in ENTITY_COLLECTIONS.items()}[args.entity_type]
+        filters = {
+            "quarter": args.quarter,
+            "epic": args.epic,
+            "story": args.story,
+            "status": args.status,
+            "tag": args.tag,
+            "sprint": args.sprint,
+            "unassigned": args.unassigned,
+            "pending": args.pending,
+            "entity": args.entity,
+        }
+        result = graph.iter_entities(entity_type, args.where, args.order_by, args.limit, args.offset,
+                                     **{k: v for k, v in filters.items() if v})
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        else:
+            print_list(list(result), entity_type)
+
+    elif args.command == "depends":
+        if args.depends_action == "add":
+            result = graph.add_dependency(args.task_id, args.depends_on)
+        elif args.depends_action == "remove":
+            result = graph.remove_dependency(args.task_id, args.depends_on)
+        elif args.depends_action == "list":
+            result = graph.get_dependencies(args.task_id)
+        elif args.depends_action == "blockers":
+            result = graph.get_blockers(args.task_id)
+        elif args.depends_action == "dependents":
+            result = graph.get_dependents(args.task_id)
+        elif args.depends_action == "order":
+            result = graph.topological_order(args.quarter, args.epic, args.sprint)
+
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        elif args.depends_action == "order":
+            print_list(result, "task")
+        else:
+            print(result)
 
-            elif args.acceptance_action == "progress":
-                result = graph.get_acceptance_progress(args.story_id)
-                if args.format == "json":
-                    print(json.dumps(result, indent=2))
-                else:
-                    progress_pct = result["progress"] * 100
-                    print(f"\n{Colors.BOLD}Acceptance Criteria: {args.story_id}{Colors.RESET}")
-                    print(f"Progress: {result['done']}/{result['total']} ({progress_pct:.0f}%)")
-                    for i, c in enumerate(result["criteria"]):
-                        if isinstance(c, dict):
-                            icon = f"{Colors.GREEN}✓{Colors.RESET}" if c.get("done") else "○"
-                            print(f"  [{i}] {icon} {c.get('title', c)}")
-                        else:
-                            print(f"  [{i}] ○ {c}")
-            else:
-                print(f"{Colors.RED}Error: acceptance action required (update or progress){Colors.RESET}")
-                sys.exit(1)
+    elif args.command == "ready-tasks":
+        result = graph.get_ready_tasks(args.quarter, args.epic, args.limit)
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        else:
+            print_list(result, "task")
 
-        elif args.command == "delete":
-            result = graph.delete(args.entity_type, args.entity_id)
-            if args.format == "json":
-                print(json.dumps(result))
-            else:
-                print(f"{Colors.YELLOW}✓ Deleted {args.entity_id}{Colors.RESET}")
-
-        elif args.command == "list":
-            entity_type = args.entity_type.rstrip("s")  # Remove plural
-            filters = {
-                "quarter": args.quarter,
-                "epic": args.epic,
-                "story": args.story,
-                "status": args.status,
-                "tag": args.tag,
-                "sprint": args.sprint,
-                "unassigned": args.unassigned,
-                "pending": args.pending,
-                "entity": args.entity,
-            }
-            result = graph.list_entities(entity_type, **{k: v for k, v in filters.items() if v})
-            if args.format == "json":
-                print(json.dumps(result, indent=2))
-            else:
-                print_list(result, entity_type)
-
-        elif args.command == "depends":
-            if args.depends_action == "add":
-                result = graph.add_dependency(args.task_id, args.depends_on)
-            elif args.depends_action == "remove":
-                result = graph.remove_dependency(args.task_id, args.depends_on)
-            elif args.depends_action == "list":
-                result = graph.get_dependencies(args.task_id)
-            elif args.depends_action == "blockers":
-                result = graph.get_blockers(args.task_id)
-
-            if args.format == "json":
-                print(json.dumps(result, indent=2))
-            else:
-                print(result)
+    elif args.command == "chain":
+        result = graph.get_chain(args.task_id)
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        else:
+            print(f"\n{Colors.BOLD}Task Chain{Colors.RESET}")
+            print(f"Path: {Colors.CYAN}{result['path']}{Colors.RESET}")
+            print(f"\nQuarter: {result['quarter']}")
+            print(f"Epic: {result['epic']['id']} - {result['epic']['title']}")
+            print(f"Story: {result['story']['id']} - {result['story']['title']}")
+            print(f"Task: {result['task']['id']} - {result['task']['title']}")
+
+    elif args.command == "descendants":
+        result = graph.get_descendants(args.entity_type, args.entity_id)
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        else:
+            print(f"\n{Colors.BOLD}Descendants of {args.entity_id}{Colors.RESET}")
+            if result["epics"]:
+                print(f"\nEpics: {len(result['epics'])}")
+            if result["stories"]:
+                print(f"Stories: {len(result['stories'])}")
+            if result["tasks"]:
+                print(f"Tasks: {len(result['tasks'])}")
+
+    elif args.command == "stats":
+        result = graph.get_stats(args.quarter, args.epic)
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        else:
+            print_stats(result)
 
-        elif args.command == "ready-tasks":
-            result = graph.get_ready_tasks(args.quarter, args.epic, args.limit)
-            if args.format == "json":
-                print(json.dumps(result, indent=2))
-            else:
-                print_list(result, "task")
+    elif args.command == "schedule":
+        result = graph.get_schedule(args.quarter, args.epic)
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        else:
+            print_schedule(result)
 
-        elif args.command == "chain":
-            result = graph.get_chain(args.task_id)
-            if args.format == "json":
-                print(json.dumps(result, indent=2))
-            else:
-                print(f"\n{Colors.BOLD}Task Chain{Colors.RESET}")
-                print(f"Path: {Colors.CYAN}{result['path']}{Colors.RESET}")
-                print(f"\nQuarter: {result['quarter']}")
-                print(f"Epic: {result['epic']['id']} - {result['epic']['title']}")
-                print(f"Story: {result['story']['id']} - {result['story']['title']}")
-                print(f"Task: {result['task']['id']} - {result['task']['title']}")
-
-        elif args.command == "descendants":
-            result = graph.get_descendants(args.entity_type, args.entity_id)
-            if args.format == "json":
-                print(json.dumps(result, indent=2))
+    elif args.command == "forecast":
+        workers = read_max_parallel(graph.path) if args.workers is None else args.workers
+        result = graph.forecast(args.sprint, args.epic, args.quarter, args.simulations, workers, args.seed)
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        else:
+            scope = ", ".join(f"{key} {value}" for key, value in result["scope"].items()) or "all tasks"
+            print(f"\n{Colors.BOLD}Forecast{Colors.RESET} ({scope})")
+            print("─" * 40)
+            print(f"Open tasks: {result['openTasks']} ({result['simulatedTasks']} incl. outside blockers)")
+            print(f"Simulations: {result['simulations']} on {result['workers']} workers [{result['engine']}]")
+            for key, value in result["dates"].items():
+                print(f"  {key.upper()}: {value} ({result['days'][key]:g} days)")
+
+    elif args.command == "sprint-create":
+        capacity = parse_capacity(args.capacity) if args.capacity else None
+        result = graph.auto_create_sprint(args.quarter, args.max_tasks, args.name,
+                                          capacity, args.budget, args.dry_run)
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        else:
+            if result.get("error"):
+                print(f"{Colors.YELLOW}{result['error']}{Colors.RESET}")
+            elif result["sprint"]:
+                sprint = result["sprint"]
+                print(f"{Colors.GREEN}✓ Created {sprint['id']}: {sprint['name']}{Colors.RESET}")
+                print(f"  Tasks: {', '.join(sprint['taskIds'])}")
             else:
-                print(f"\n{Colors.BOLD}Descendants of {args.entity_id}{Colors.RESET}")
-                if result["epics"]:
-                    print(f"\nEpics: {len(result['epics'])}")
-                if result["stories"]:
-                    print(f"Stories: {len(result['stories'])}")
-                if result["tasks"]:
-                    print(f"Tasks: {len(result['tasks'])}")
-
-        elif args.command == "stats":
-            result = graph.get_stats(args.quarter, args.epic)
-            if args.format == "json":
-                print(json.dumps(result, indent=2))
+                print(f"{Colors.BOLD}Sprint selection (dry run){Colors.RESET}")
+            for entry in result["explanation"]:
+                mark = f"{Colors.GREEN}+" if entry["picked"] else f"{Colors.GRAY}-"
+                print(f"  {mark} {entry['id']}: {entry['reason']}{Colors.RESET}")
+
+    elif args.command == "sprint-waves":
+        max_parallel = args.max_parallel or read_max_parallel(graph.path)
+        result = graph.get_sprint_waves(args.sprint_id, max_parallel)
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        else:
+            print(f"\n{Colors.BOLD}Sprint {result['sprint']}{Colors.RESET} (max {result['maxParallel']} in parallel)")
+            print("─" * 60)
+            for wave in result["waves"]:
+                print(f"Wave {wave['wave']}:")
+                for task in wave["tasks"]:
+                    print(f"  [{task['tag']}] {task['id']}: {task['title']}")
+            for task in result["blocked"]:
+                print(f"{Colors.RED}Blocked {task['id']}{Colors.RESET}: waiting on {', '.join(task['waitingOn'])}")
+
+    elif args.command == "sprint-active":
+        result = graph.get_active_sprint()
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        else:
+            if result:
+                print_entity(result, "sprint")
             else:
-                print_stats(result)
+                print(f"{Colors.GRAY}No active sprint.{Colors.RESET}")
 
-        elif args.command == "sprint-create":
-            result = graph.auto_create_sprint(args.quarter, args.max_tasks, args.name)
-            if args.format == "json":
-                print(json.dumps(result, indent=2))
-            else:
-                if result.get("error"):
-                    print(f"{Colors.YELLOW}{result['error']}{Colors.RESET}")
-                else:
-                    sprint = result["sprint"]
-                    print(f"{Colors.GREEN}✓ Created {sprint['id']}: {sprint['name']}{Colors.RESET}")
-                    print(f"  Tasks: {', '.join(sprint['taskIds'])}")
-
-        elif args.command == "sprint-active":
-            result = graph.get_active_sprint()
-            if args.format == "json":
-                print(json.dumps(result, indent=2))
-            else:
-                if result:
-                    print_entity(result, "sprint")
-                else:
-                    print(f"{Colors.GRAY}No active sprint.{Colors.RESET}")
+    elif args.command == "sprint-complete":
+        result = graph.complete_sprint(args.sprint_id)
+        if args.format in JSON_FORMATS:
+            write_json(result, args, indent=None)
+        else:
+            print(f"{Colors.GREEN}✓ Completed {args.sprint_id}{Colors.RESET}")
+
+    elif args.command == "next-id":
+        # Don't actually increment, just show what would be next
+        graph._ensure_loaded()
+        current = graph.data["counters"].get(args.entity_type, 0)
+        prefix = ID_PATTERNS.get(args.entity_type, "")
+        if args.entity_type == "adr":
+            next_id = f"{prefix}{current + 1:04d}"
+        else:
+            next_id = f"{prefix}{current + 1:03d}"
+        print(next_id)
+
+    elif args.command == "verify-aggregates":
+        result = graph.verify_aggregates()
+        if args.format in JSON_FORMATS:
+            write_json(result, args)
+        elif result["drift"]:
+            print(f"{Colors.YELLOW}Repaired {len(result['drift'])} drifted counters:{Colors.RESET}")
+            for d in result["drift"]:
+                print(f"  {d['counter']}[{d['parent']}]: {d['stored']} → {d['actual']}")
+        else:
+            print(f"{Colors.GREEN}✓ Status counters match the graph{Colors.RESET}")
 
-        elif args.command == "sprint-complete":
-            result = graph.complete_sprint(args.sprint_id)
-            if args.format == "json":
-                print(json.dumps(result))
-            else:
-                print(f"{Colors.GREEN}✓ Completed {args.sprint_id}{Colors.RESET}")
-
-        elif args.command == "next-id":
-            # Don't actually increment, just show what would be next
-            graph._ensure_loaded()
-            current = graph.data["counters"].get(args.entity_type, 0)
-            prefix = ID_PATTERNS.get(args.entity_type, "")
-            if args.entity_type == "adr":
-                next_id = f"{prefix}{current + 1:04d}"
+    elif args.command == "compact":
+        result = graph.compact()
+        if args.format in JSON_FORMATS:
+            write_json(result, args, indent=None)
+        else:
+            print(f"{Colors.GREEN}✓ Compacted {result['compacted']} journal records into {result['path']}{Colors.RESET}")
+
+    elif args.command == "import":
+        with open(args.file, "r") as f:
+            result = graph.import_document(json.load(f))
+        if args.format in JSON_FORMATS:
+            write_json(result, args, indent=None)
+        else:
+            print(f"{Colors.GREEN}✓ Imported {result['imported']} entities into {result['path']} ({result['backend']}){Colors.RESET}")
+
+    elif args.command == "export":
+        subgraph = {"quarter": args.quarter, "epic": args.epic, "sprint": args.sprint}
+        if args.format == "parquet" or (args.format == "csv" and args.out):
+            result = graph.export_tables(args.format, args.out, [args.table] if args.table else None, **subgraph)
+            print(f"Exported {args.format} to {result['path']}: "
+                  + ", ".join(Path(path).name for path in result["tables"]))
+        else:
+            chunks = graph.iter_export(args.format, table=args.table, **subgraph)
+            if not args.stream and args.format in ("json", "markdown"):
+                chunks = ["".join(chunks)]
+            if args.out:
+                write_export(args.out, chunks)
+                print(f"Exported {args.format} to {args.out}")
             else:
-                next_id = f"{prefix}{current + 1:03d}"
-            print(next_id)
+                for chunk in chunks:
+                    sys.stdout.write(chunk)
 
-        elif args.command == "export":
-            result = graph.export(args.format)
-            print(result)
+    elif args.command == "serve":
+        serve_visualization(graph, args.port)
+
+    else:
+        raise ValueError(f"'{args.command}' is not a graph command")
+
+
+# Commands that manage their own saves, files or processes can't join a batch transaction
+BATCH_EXCLUDED_COMMANDS = {None, "batch", "apply", "daemon", "init", "import", "export", "compact", "serve"}
+
+
+def run_batch(graph: PeachflowGraph, parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """Run CLI command lines from a file or stdin inside a single transaction."""
+    source = open(args.file, "r") if args.file else sys.stdin
+    with source:
+        lines = [line.strip() for line in source]
+
+    try:
+        with graph.transaction() as txn:
+            for line_no, line in enumerate(lines, 1):
+                if not line or line.startswith("#"):
+                    continue
+                defaults = argparse.Namespace(format=args.format, backend=args.backend)
+                try:
+                    line_args = parser.parse_args(shlex.split(line), namespace=defaults)
+                except SystemExit:
+                    raise ValueError(f"line {line_no}: invalid command: {line}")
+                if line_args.command in BATCH_EXCLUDED_COMMANDS:
+                    raise ValueError(f"line {line_no}: '{line_args.command}' cannot run inside a batch")
+                try:
+                    run_command(graph, line_args)
+                except SystemExit:
+                    raise ValueError(f"line {line_no}: command failed: {line}")
+                except ValueError as e:
+                    raise ValueError(f"line {line_no}: {e}")
+    except ValueError:
+        print(f"{Colors.YELLOW}Batch rolled back; no changes were saved.{Colors.RESET}", file=sys.stderr)
+        raise
+
+    if args.format in JSON_FORMATS:
+        write_json({"committed": True, "_cascaded": txn["cascaded"]}, args, indent=None)
+    else:
+        print(f"{Colors.GREEN}✓ Batch committed{Colors.RESET}")
+        for eid, status in txn["cascaded"].items():
+            print(f"    {eid} → {status}")
+
+
+def run_apply(graph: PeachflowGraph, args: argparse.Namespace):
+    """Execute a JSONL operation stream, emitting one NDJSON result per line."""
+    source = open(args.file, "r") if args.file and args.file != "-" else sys.stdin
+    bindings = {}
+    applied = failed = 0
+
+    with source, graph.transaction() as txn:
+        for line_no, line in enumerate(source, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                result = graph.apply_operation(json.loads(line), bindings)
+                record = {"line": line_no, "ok": True, "result": result}
+                applied += 1
+            except (ValueError, KeyError, TypeError) as e:
+                if isinstance(e, KeyError):
+                    e = f"missing field {e}"
+                record = {"line": line_no, "ok": False, "error": str(e)}
+                failed += 1
+            print(json.dumps(record), flush=True)
+            if not record["ok"] and not args.continue_on_error:
+                break
+
+    print(json.dumps({
+        "committed": True,
+        "applied": applied,
+        "failed": failed,
+        "bindings": bindings,
+        "_cascaded": txn["cascaded"],
+    }))
+    if failed:
+        sys.exit(1)
 
-        elif args.command == "serve":
-            serve_visualization(graph, args.port)
 
+def dispatch(graph: PeachflowGraph, parser: argparse.ArgumentParser, args: argparse.Namespace) -> int:
+    """Run a parsed command, reporting errors the CLI way; returns the exit code."""
+    try:
+        if args.command == "batch":
+            run_batch(graph, parser, args)
+        elif args.command == "apply":
+            run_apply(graph, args)
+        elif args.command == "daemon":
+            socket_path = Path(args.socket) if args.socket else daemon_socket_path(graph.path)
+            if args.stop:
+                stopped = _daemon_request(socket_path, {"shutdown": True}) is not None
+                print("stopped" if stopped else f"No daemon running on {socket_path}")
+            else:
+                graph._ensure_in_memory()
+                serve_daemon(graph, parser, socket_path)
+        else:
+            run_command(graph, args)
     except ValueError as e:
         print(f"{Colors.RED}Error: {e}{Colors.RESET}", file=sys.stderr)
-        sys.exit(1)
+        return 1
+    except BrokenPipeError:
+        raise
     except Exception as e:
         print(f"{Colors.RED}Unexpected error: {e}{Colors.RESET}", file=sys.stderr)
-        sys.exit(2)
+        return 2
+    return 0
+
+
+def main():
+    try:
+        run_main()
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); stop quietly. Point stdout at
+        # devnull so the interpreter's final flush doesn't fail again.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
+
+
+def run_main():
+    # Forward before building the parser, so a daemon-served command only pays
+    # for interpreter startup; the daemon parses and validates argv itself
+    command, backend = split_global_argv(sys.argv[1:])
+    if command and command not in DAEMON_LOCAL_COMMANDS and not os.environ.get("PEACHFLOW_NO_DAEMON"):
+        code = forward_to_daemon(sys.argv[1:], resolve_graph_path(backend=backend))
+        if code is not None:
+            sys.exit(code)
+
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if not args.command:
+        parser.print_help()
+        sys.exit(0)
+
+    graph = PeachflowGraph(backend=args.backend)
+    code = dispatch(graph, parser, args)
+    if code:
+        sys.exit(code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,624 @@
+"""Tests for scripts/peachflow-graph.py."""
+
+import contextlib
+import importlib.util
+import io
+import json
+import shutil
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "peachflow-graph.py"
+
+
+def _load_module():
+    spec = importlib.util.spec_from_file_location("peachflow_graph", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["peachflow_graph"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+pg = _load_module()
+
+
+@pytest.fixture(autouse=True)
+def _no_daemon(monkeypatch):
+    monkeypatch.setenv("PEACHFLOW_NO_DAEMON", "1")
+    monkeypatch.delenv("PEACHFLOW_GRAPH_PATH", raising=False)
+    monkeypatch.delenv("PEACHFLOW_GRAPH_JOURNAL", raising=False)
+    monkeypatch.delenv("PEACHFLOW_GRAPH_SOCKET", raising=False)
+
+
+def new_graph(tmp_path, name=".peachflow-graph.json", **kwargs):
+    graph = pg.PeachflowGraph(str(tmp_path / name), **kwargs)
+    graph.init()
+    return graph
+
+
+def small_plan(graph):
+    """One epic in Q1 with a story, two tasks and a sprint holding the first task."""
+    graph.create_epic("Auth", "Q1")
+    graph.create_story("E-001", "Login")
+    graph.create_task("US-001", "API", "BE")
+    graph.create_task("US-001", "Form", "FE")
+    graph.create_sprint("Q1", ["T-001"], "auth")
+
+
+# === apply ===
+
+def test_apply_update_rejects_epic_quarter(tmp_path):
+    graph = new_graph(tmp_path)
+    small_plan(graph)
+    with pytest.raises(ValueError, match="Cannot update quarter"):
+        graph.apply_operation({"op": "update", "type": "epic", "id": "E-001", "quarter": "Q3"}, {})
+
+    reloaded = pg.PeachflowGraph(str(graph.path))
+    assert [epic["id"] for epic in reloaded.list_entities("epic", quarter="Q1")] == ["E-001"]
+    assert reloaded.verify_aggregates()["drift"] == []
+
+
+def test_apply_update_rejects_task_relationship_fields(tmp_path):
+    graph = new_graph(tmp_path)
+    small_plan(graph)
+    op = {"op": "update", "type": "task", "id": "T-001", "storyId": "US-999", "sprintId": "S-777"}
+    with pytest.raises(ValueError, match="sprintId, storyId"):
+        graph.apply_operation(op, {})
+
+    reloaded = pg.PeachflowGraph(str(graph.path))
+    assert reloaded.get_chain("T-001")["story"]["id"] == "US-001"
+    assert reloaded.get("task", "T-001")["sprintId"] == "S-001"
+
+
+def test_apply_update_maps_worktree(tmp_path):
+    graph = new_graph(tmp_path)
+    small_plan(graph)
+    graph.apply_operation({"op": "update", "type": "sprint", "id": "S-001", "worktree": "../wt"}, {})
+    assert graph.get("sprint", "S-001")["worktreePath"] == "../wt"
+
+
+# === Journal ===
+
+def test_journal_recovers_from_torn_append(tmp_path, capsys):
+    graph = new_graph(tmp_path, journal=True)
+    small_plan(graph)
+    graph.update("task", "T-001", title="before crash")
+    with open(graph.storage.wal_path, "ab") as f:
+        f.write(b'[[["entities","tasks","T-002","title"],"half')  # Interrupted append
+
+    after_crash = pg.PeachflowGraph(str(graph.path), journal=True)
+    assert after_crash.get("task", "T-001")["title"] == "before crash"
+    assert "interrupted write" in capsys.readouterr().err
+    after_crash.update("task", "T-002", title="after crash")
+    after_crash.update("task", "T-001", status="in_progress")
+
+    reloaded = pg.PeachflowGraph(str(graph.path), journal=True)
+    assert reloaded.get("task", "T-002")["title"] == "after crash"
+    assert reloaded.get("task", "T-001")["status"] == "in_progress"
+    assert reloaded.get("task", "T-001")["title"] == "before crash"
+    assert capsys.readouterr().err.count("skipped") == 0
+
+
+def test_journal_skips_only_a_corrupt_line(tmp_path, capsys):
+    graph = new_graph(tmp_path, journal=True)
+    small_plan(graph)
+    with open(graph.storage.wal_path, "ab") as f:
+        f.write(b"not json\n")
+    graph.update("task", "T-002", title="later")
+
+    reloaded = pg.PeachflowGraph(str(graph.path), journal=True)
+    assert reloaded.get("task", "T-002")["title"] == "later"
+    assert "corrupt record" in capsys.readouterr().err
+
+
+# === Change feed ===
+
+def test_sqlite_changelog_trim_leaves_no_tombstones(tmp_path):
+    graph = new_graph(tmp_path, name="graph.db")
+    small_plan(graph)
+    for i in range(pg.CHANGELOG_MAX_REVISIONS + 100):
+        graph.update("task", "T-001", title=f"t{i}")
+
+    conn = graph.storage._connect()
+    rows, tombstones = conn.execute("SELECT COUNT(*), SUM(deleted) FROM documents").fetchone()
+    assert tombstones == 0
+    assert rows <= pg.CHANGELOG_MAX_REVISIONS + 10
+
+    reloaded = pg.PeachflowGraph(str(graph.path))
+    assert len(reloaded.data["changelog"]) == pg.CHANGELOG_MAX_REVISIONS
+    assert reloaded.data["changelog"] == graph.data["changelog"]
+    since = reloaded.data["revision"] - 3
+    assert [r["id"] for r in reloaded.get_changes(since)["updated"]] == ["T-001"]
+
+
+# === Filters ===
+
+@pytest.mark.parametrize("filters", [
+    {"entity_type": "task"},
+    {"entity_type": "task", "tag": "BE"},
+    {"entity_type": "task", "story": "US-002", "status": "pending"},
+    {"entity_type": "task", "unassigned": True},
+    {"entity_type": "epic", "story": "US-001"},  # story doesn't apply to epics and is ignored
+])
+def test_filters_match_across_backends_past_id_999(tmp_path, filters):
+    results = []
+    for name in (".peachflow-graph.json", "graph.db"):
+        graph = new_graph(tmp_path, name=name)
+        with graph.transaction():
+            graph.create_epic("Big", "Q1")
+            graph.create_story("E-001", "One")
+            graph.create_story("E-001", "Two")
+            for i in range(1050):
+                graph.create_task(f"US-00{i % 2 + 1}", f"t{i}", "BE" if i % 3 else "FE")
+            graph.create_sprint("Q1", ["T-005", "T-1001"], "s")
+        reloaded = pg.PeachflowGraph(str(graph.path))
+        results.append([entity["id"] for entity in reloaded.list_entities(**filters)])
+    json_ids, sqlite_ids = results
+    assert json_ids == sqlite_ids
+    assert json_ids == sorted(json_ids, key=pg.natural_id_key)
+
+
+# === Daemon requests ===
+
+@pytest.fixture
+def daemon(tmp_path):
+    """A daemon for a small-plan graph, served from a thread; yields (graph, send)."""
+    graph = new_graph(tmp_path)
+    small_plan(graph)
+    socket_path = pg.daemon_socket_path(graph.path)
+    thread = threading.Thread(target=pg.serve_daemon, args=(graph, pg.build_parser(), socket_path), daemon=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        thread.start()
+        for _ in range(100):
+            if socket_path.exists():
+                break
+            time.sleep(0.01)
+
+    def send(*argv):
+        return pg._daemon_request(socket_path, {"argv": list(argv), "graph": str(graph.path.resolve())})
+
+    yield graph, send
+    pg._daemon_request(socket_path, {"shutdown": True})
+    thread.join(timeout=5)
+
+
+def test_daemon_drops_changes_of_a_failed_command(daemon, monkeypatch):
+    graph, send = daemon
+    save = graph.storage.save
+
+    def failing_save(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(graph.storage, "save", failing_save)
+    assert send("update", "epic", "E-001", "--title", "PHANTOM")["code"] == 2
+    monkeypatch.setattr(graph.storage, "save", save)
+
+    assert "PHANTOM" not in send("-f", "json", "get", "epic", "E-001")["stdout"]
+    assert send("create", "epic", "--title", "Next", "--quarter", "Q2")["code"] == 0
+    assert pg.PeachflowGraph(str(graph.path)).get("epic", "E-001")["title"] == "Auth"
+
+
+def test_daemon_replies_when_a_command_raises_past_dispatch(daemon, monkeypatch):
+    graph, send = daemon
+
+    def broken_pipe(graph, args):
+        graph.update("epic", "E-001", title="Applied")
+        raise BrokenPipeError
+
+    monkeypatch.setattr(pg, "run_command", broken_pipe)
+    response = send("update", "epic", "E-001", "--title", "Applied")
+    assert response["code"] == 2
+    assert pg.forward_to_daemon(["stats"], graph.path) == 2
+
+
+def test_lost_daemon_reply_is_an_error_not_a_local_rerun(tmp_path):
+    socket_path = tmp_path / "graph.sock"
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(socket_path))
+    server.listen()
+
+    def hang_up():
+        connection, _ = server.accept()
+        connection.recv(4096)
+        connection.close()
+
+    thread = threading.Thread(target=hang_up, daemon=True)
+    thread.start()
+    response = pg._daemon_request(socket_path, {"argv": ["stats"]})
+    thread.join(timeout=5)
+    server.close()
+    assert response["code"] == 1 and "no valid reply" in response["stderr"]
+    socket_path.unlink()
+    assert pg._daemon_request(socket_path, {"argv": ["stats"]}) is None
+
+
+# === Markdown export ===
+
+def _markdown(graph_path, monkeypatch):
+    """(markdown export of a freshly opened graph, epics it rendered)."""
+    rendered = []
+    render = pg.PeachflowGraph._render_epic_markdown
+    monkeypatch.setattr(pg.PeachflowGraph, "_render_epic_markdown",
+                        lambda self, epic_id: rendered.append(epic_id) or render(self, epic_id))
+    return "".join(pg.PeachflowGraph(str(graph_path))._export_markdown()), rendered
+
+
+def test_markdown_export_renders_only_changed_epics(tmp_path, monkeypatch):
+    graph = new_graph(tmp_path)
+    small_plan(graph)
+    graph.create_epic("Billing", "Q2")
+    graph.create_story("E-002", "Invoices")
+    graph.create_task("US-002", "PDF", "BE")
+    first, rendered = _markdown(graph.path, monkeypatch)
+    assert rendered == ["E-001", "E-002"]
+    assert _markdown(graph.path, monkeypatch) == (first, [])
+
+    pg.PeachflowGraph(str(graph.path)).update("task", "T-003", status="completed")
+    text, rendered = _markdown(graph.path, monkeypatch)
+    assert rendered == ["E-002"]
+    assert "✅ [BE] T-003" in text
+    shutil.rmtree(tmp_path / pg.CACHE_DIR)
+    assert _markdown(graph.path, monkeypatch)[0] == text
+
+    # A removed story no longer says which epic it was in: render everything
+    pg.PeachflowGraph(str(graph.path)).delete("story", "US-002")
+    text, rendered = _markdown(graph.path, monkeypatch)
+    assert rendered == ["E-001", "E-002"] and "US-002" not in text
+
+
+# === Status cascade ===
+
+def test_status_update_and_cascade_save_once(tmp_path, monkeypatch):
+    graph = new_graph(tmp_path)
+    small_plan(graph)
+    saves = []
+    save = graph.storage.save
+    monkeypatch.setattr(graph.storage, "save", lambda *args: saves.append(1) or save(*args))
+
+    result = graph.update("task", "T-001", status="completed")
+    assert result["_cascaded"]["US-001"] == "in_progress"
+    assert len(saves) == 1
+
+
+def test_failed_save_rolls_back_status_update_and_cascade(tmp_path, monkeypatch):
+    graph = new_graph(tmp_path)
+    small_plan(graph)
+
+    def failing_save(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(graph.storage, "save", failing_save)
+    with pytest.raises(OSError):
+        graph.update("task", "T-001", status="completed")
+    assert graph.get("task", "T-001")["status"] == "pending"
+    assert pg.PeachflowGraph(str(graph.path)).get("task", "T-001")["status"] == "pending"
+
+
+# === Dependencies ===
+
+def test_topological_order_after_legacy_cycle(tmp_path):
+    graph = new_graph(tmp_path)
+    graph.create_epic("Core", "Q1")
+    graph.create_story("E-001", "Loop")
+    graph.create_epic("Later", "Q2")
+    graph.create_story("E-002", "After")
+    for story_id, title in (("US-001", "a"), ("US-001", "b"), ("US-002", "c"), ("US-002", "d"), ("US-002", "e")):
+        graph.create_task(story_id, title, "BE")
+    # Written by a version that did not reject cycles yet
+    document = json.loads(graph.path.read_text())
+    document["relationships"]["task_dependencies"] = {
+        "T-001": ["T-002"], "T-002": ["T-001"], "T-005": ["T-002"], "T-003": ["T-005"],
+    }
+    graph.path.write_text(json.dumps(document))
+
+    graph = pg.PeachflowGraph(str(graph.path))
+    assert [task["id"] for task in graph.topological_order(epic="E-002")] == ["T-004", "T-005", "T-003"]
+    with pytest.raises(ValueError, match="T-001, T-002"):
+        graph.topological_order(epic="E-001")
+
+
+@pytest.mark.parametrize("estimate", ["inf", "-inf", "nan", "1e400", -1, "two"])
+def test_estimate_must_be_finite_and_non_negative(tmp_path, estimate):
+    graph = new_graph(tmp_path)
+    small_plan(graph)
+    before = graph.get("task", "T-001")["estimate"]
+    with pytest.raises(ValueError, match="Invalid estimate"):
+        graph.create_task("US-001", "Docs", "BE", estimate=estimate)
+    with pytest.raises(ValueError, match="Invalid estimate"):
+        graph.update("task", "T-001", estimate=estimate)
+    assert pg.PeachflowGraph(str(graph.path)).get("task", "T-001")["estimate"] == before
+
+
+# === Sprint packing ===
+
+def packing_plan(graph):
+    """Unassigned Q1 tasks: T-001 BE 3d, T-002 BE 2d, T-003 FE 5d, T-004 FE 1d after T-001."""
+    graph.create_epic("Auth", "Q1")
+    graph.create_story("E-001", "Login")
+    graph.create_task("US-001", "API", "BE", estimate=3)
+    graph.create_task("US-001", "DB", "BE", estimate=2)
+    graph.create_task("US-001", "Form", "FE", estimate=5)
+    graph.create_task("US-001", "Wire", "FE", depends_on=["T-001"], estimate=1)
+
+
+def reasons(packed):
+    return {entry["id"]: (entry["picked"], entry["reason"]) for entry in packed["explanation"]}
+
+
+def test_pack_sprint_caps_tags_and_pulls_in_unblocked_dependents(tmp_path):
+    graph = new_graph(tmp_path)
+    packing_plan(graph)
+    packed = graph.pack_sprint("Q1", capacity={"BE": 1})
+
+    assert [task["id"] for task in packed["tasks"]] == ["T-003", "T-001", "T-004"]
+    assert reasons(packed) == {
+        "T-003": (True, "ready"),
+        "T-001": (True, "ready"),
+        "T-004": (True, "unblocked by T-001 in this sprint"),
+        "T-002": (False, "BE capacity reached (1)"),
+    }
+    assert packed["usage"]["tags"] == {"FE": 2, "BE": 1}
+    assert packed["usage"]["estimate"] == 9
+
+
+def test_pack_sprint_stays_within_the_estimate_budget(tmp_path):
+    graph = new_graph(tmp_path)
+    packing_plan(graph)
+    packed = graph.pack_sprint("Q1", budget=8)
+
+    assert [task["id"] for task in packed["tasks"]] == ["T-003", "T-001"]
+    assert reasons(packed)["T-002"] == (False, "over estimate budget (8 + 2 > 8)")
+    assert reasons(packed)["T-004"] == (False, "over estimate budget (8 + 1 > 8)")
+    assert packed["usage"]["estimate"] == 8
+
+
+def test_pack_sprint_explains_tasks_left_waiting(tmp_path):
+    graph = new_graph(tmp_path)
+    packing_plan(graph)
+    packed = graph.pack_sprint("Q1", max_tasks=1)
+
+    assert [task["id"] for task in packed["tasks"]] == ["T-003"]
+    assert reasons(packed) == {
+        "T-003": (True, "ready"),
+        "T-001": (False, "sprint full (1 tasks)"),
+        "T-002": (False, "sprint full (1 tasks)"),
+        "T-004": (False, "waiting on T-001 outside this sprint"),
+    }
+
+
+# === Forecast ===
+
+def test_forecast_rejects_zero_workers(tmp_path, capsys):
+    graph = new_graph(tmp_path)
+    small_plan(graph)
+    parser = pg.build_parser()
+    args = parser.parse_args(["forecast", "--workers", "0"])
+    assert pg.dispatch(graph, parser, args) == 1
+    assert "must be at least 1" in capsys.readouterr().err
+
+
+def forecast_plan(graph, be_days, fe_days=()):
+    """Completed tasks with the given cycle times, then open T-A (BE), T-B (BE, after T-A), T-C (FE)."""
+    graph.create_epic("Auth", "Q1")
+    graph.create_story("E-001", "Login")
+    created = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for tag, samples in (("BE", be_days), ("FE", fe_days)):
+        for days in samples:
+            task = graph.create_task("US-001", f"done {days}", tag)
+            graph.update("task", task["id"], status="completed", cascade=False)
+            entity = graph.data["entities"]["tasks"][task["id"]]
+            entity["createdAt"] = created.isoformat()
+            entity["completedAt"] = (created + timedelta(days=days)).isoformat()
+    first = graph.create_task("US-001", "A", "BE")["id"]
+    graph.create_task("US-001", "B", "BE", depends_on=[first])
+    graph.create_task("US-001", "C", "FE")
+
+
+@pytest.fixture(params=["numpy", "python"])
+def engine(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(pg, "_import_numpy", lambda: None)
+    return request.param
+
+
+def test_forecast_is_critical_path_or_total_work_per_worker(tmp_path, engine):
+    graph = new_graph(tmp_path)
+    forecast_plan(graph, be_days=[2], fe_days=[5])
+
+    one = graph.forecast(epic="E-001", simulations=50, workers=1, seed=1)
+    assert one["engine"] == engine
+    assert one["openTasks"] == 3 and one["history"] == {"BE": 1, "FE": 1}
+    assert one["days"] == {"p50": 9.0, "p85": 9.0, "p95": 9.0}
+    # Three workers: the 5-day FE task outlasts the 2+2-day BE chain
+    assert graph.forecast(epic="E-001", simulations=50, workers=3, seed=1)["days"]["p95"] == 5.0
+
+
+def test_forecast_percentiles_are_seeded(tmp_path, engine):
+    graph = new_graph(tmp_path)
+    # No FE history: the FE task draws from every completed task
+    forecast_plan(graph, be_days=[1, 2, 3])
+
+    result = graph.forecast(epic="E-001", simulations=4000, workers=3, seed=7)
+    assert result == graph.forecast(epic="E-001", simulations=4000, workers=3, seed=7)
+    # The BE chain of two 1-3 day draws dominates: 4 has P(<=) 6/9, 5 has 8/9
+    assert result["days"] == {"p50": 4.0, "p85": 5.0, "p95": 6.0}
+
+
+def test_forecast_needs_completed_history(tmp_path):
+    graph = new_graph(tmp_path)
+    small_plan(graph)
+    with pytest.raises(ValueError, match="No completed tasks"):
+        graph.forecast(sprint="S-001")
+
+
+# === Where expressions ===
+
+def test_parse_where_precedence():
+    assert pg.parse_where("a = 1 or b = 2 and not c = 3") == ("or", [
+        ("cmp", "a", "=", "1"),
+        ("and", [("cmp", "b", "=", "2"), ("not", ("cmp", "c", "=", "3"))]),
+    ])
+    assert pg.parse_where("(a = 1 or b = 2) and c == 3") == ("and", [
+        ("or", [("cmp", "a", "=", "1"), ("cmp", "b", "=", "2")]),
+        ("cmp", "c", "=", "3"),
+    ])
+
+
+def test_parse_where_in_not_and_null():
+    assert pg.parse_where("tag not in (BE, 'Full stack')") == ("in", "tag", ["BE", "Full stack"], True)
+    assert pg.parse_where('title ~ "log in"') == ("cmp", "title", "~", "log in")
+    assert pg.parse_where("sprint = null") == ("cmp", "sprint", "=", None)
+
+
+@pytest.mark.parametrize("text", ["status =", "status pending", "(status = pending", "tag not (BE)", "a = 1 b"])
+def test_parse_where_rejects_malformed_expressions(text):
+    with pytest.raises(ValueError, match="Invalid --where"):
+        pg.parse_where(text)
+
+
+@pytest.mark.parametrize("where,expected", [
+    ("title ~ FORM", ["T-003"]),
+    ("estimate >= 3", ["T-001", "T-003"]),
+    ("not tag = BE", ["T-003", "T-004"]),
+    ("tag in (BE) or title ~ wire", ["T-001", "T-002", "T-004"]),
+    ("status = pending and tag not in (FE)", ["T-001", "T-002"]),
+])
+def test_where_filters_tasks(tmp_path, where, expected):
+    graph = new_graph(tmp_path)
+    packing_plan(graph)
+    assert [task["id"] for task in graph.find_entities("task", where=where)] == expected
+
+
+@pytest.mark.parametrize("where,index_sets,residual", [
+    ("status = pending and tag in (BE, FE)", 2, 0),
+    ("status = pending and title ~ api", 1, 1),
+    ("status = pending or tag = BE", 0, 1),
+    ("tag not in (FE)", 0, 1),
+])
+def test_where_uses_indexes_only_for_top_level_equality(tmp_path, monkeypatch, where, index_sets, residual):
+    graph = new_graph(tmp_path)
+    packing_plan(graph)
+    plan = {}
+    ids_in_order, compile_where = pg.PeachflowGraph._ids_in_order, pg.compile_where
+
+    def spy_ids(self, collection, sets):
+        plan["sets"] = len(sets)
+        return ids_in_order(self, collection, sets)
+
+    def spy_compile(tree, lookup):
+        plan.setdefault("residual", len(tree[1]))
+        return compile_where(tree, lookup)
+
+    monkeypatch.setattr(pg.PeachflowGraph, "_ids_in_order", spy_ids)
+    monkeypatch.setattr(pg, "compile_where", spy_compile)
+    graph.find_entities("task", where=where)
+    assert plan == {"sets": index_sets, "residual": residual}
+
+
+# === batch ===
+
+@pytest.mark.parametrize("line", ["apply", "daemon --stop", "export --format csv", "compact"])
+def test_batch_rolls_back_on_commands_it_cannot_run(tmp_path, monkeypatch, capsys, line):
+    graph = new_graph(tmp_path)
+    small_plan(graph)
+    batch_file = tmp_path / "cmds.txt"
+    batch_file.write_text(f"update task T-001 --title changed\n{line}\n")
+    parser = pg.build_parser()
+    args = parser.parse_args(["batch", "--file", str(batch_file)])
+
+    assert pg.dispatch(graph, parser, args) == 1
+    assert "cannot run inside a batch" in capsys.readouterr().err
+    assert pg.PeachflowGraph(str(graph.path)).get("task", "T-001")["title"] == "API"
+
+
+# === Daemon ===
+
+@pytest.mark.parametrize("argv,expected", [
+    (["get", "task", "T-001"], ("get", None)),
+    (["-f", "json", "--backend", "sqlite", "list", "tasks"], ("list", "sqlite")),
+    (["--format=json", "--backend=json", "status"], ("status", "json")),
+    (["--help"], (None, None)),
+    ([], (None, None)),
+])
+def test_split_global_argv(argv, expected):
+    assert pg.split_global_argv(argv) == expected
+
+
+def test_forwarding_happens_before_the_parser_is_built(monkeypatch):
+    monkeypatch.delenv("PEACHFLOW_NO_DAEMON")
+    monkeypatch.setattr(sys, "argv", ["peachflow-graph.py", "--backend", "sqlite", "get", "task", "T-001"])
+    forwarded = []
+    monkeypatch.setattr(pg, "forward_to_daemon", lambda argv, path: forwarded.append((argv, path)) or 0)
+    monkeypatch.setattr(pg, "build_parser", lambda: pytest.fail("parser built for a forwarded command"))
+
+    with pytest.raises(SystemExit) as exit_info:
+        pg.run_main()
+    assert exit_info.value.code == 0
+    assert forwarded == [(["--backend", "sqlite", "get", "task", "T-001"], Path(pg.DEFAULT_GRAPH_PATH).with_suffix(".db"))]
+
+
+# === Visualization ===
+
+def test_views_place_tasks_added_after_the_layout(tmp_path):
+    graph = new_graph(tmp_path)
+    small_plan(graph)
+    layout = pg.graph_layout(graph.data)
+    graph.create_task("US-001", "Docs", "BE")
+
+    nodes = {node["id"]: node for node in pg.graph_view(graph, layout)["nodes"]}
+    assert "x" in nodes["T-003"] and nodes["T-003"]["y"] != nodes["T-001"]["y"]
+    clusters = {node["id"]: node for node in pg.cluster_view(graph, layout, {"Q1", "E-001"})["nodes"]}
+    assert clusters["US-001"]["size"] == 3
+
+
+def test_views_place_tasks_their_story_does_not_list(tmp_path):
+    graph = new_graph(tmp_path)
+    small_plan(graph)
+    graph.data["relationships"]["story_tasks"]["US-001"].remove("T-002")
+    layout = pg.graph_layout(graph.data)
+
+    assert "T-002" in layout["positions"]
+    assert "T-002" in {node["id"] for node in pg.graph_view(graph, layout)["nodes"]}
+    assert "T-002" in {node["id"] for node in pg.cluster_view(graph, layout, set())["nodes"]}
+
+
+def test_server_keeps_serving_while_the_graph_file_is_unreadable(tmp_path, monkeypatch, capsys):
+    import urllib.request
+    import webbrowser
+
+    monkeypatch.setattr(webbrowser, "open", lambda url: None)
+    graph = new_graph(tmp_path)
+    small_plan(graph)
+    with socket.socket() as probe:
+        probe.bind(("localhost", 0))
+        port = probe.getsockname()[1]
+    threading.Thread(target=pg.serve_visualization, args=(graph, port), daemon=True).start()
+
+    def task_ids():
+        for _ in range(100):
+            try:
+                with urllib.request.urlopen(f"http://localhost:{port}/api/graph") as reply:
+                    return {node["id"] for node in json.load(reply)["nodes"] if node["type"] == "task"}
+            except OSError:
+                time.sleep(0.02)
+        raise AssertionError("server did not answer")
+
+    assert task_ids() == {"T-001", "T-002"}
+    document = graph.path.read_text()
+    graph.path.write_text(document[:len(document) // 2])
+    assert task_ids() == {"T-001", "T-002"}
+    assert task_ids() == {"T-001", "T-002"}
+    assert capsys.readouterr().err.count("Could not reload") == 1
+
+    graph.path.write_text(document)
+    pg.PeachflowGraph(str(graph.path)).create_task("US-001", "Docs", "BE")
+    assert task_ids() == {"T-001", "T-002", "T-003"}
+